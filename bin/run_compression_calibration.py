@@ -0,0 +1,13 @@
+"""
+Benchmark compression settings of a formatted h5 file
+"""
+
+import sys
+from pathlib import Path
+
+run_path = Path(__file__).parent.resolve().parent
+sys.path.insert(0, str(run_path))
+
+from marmot.formatters.formatcompression import main
+
+main()
@@ -4,12 +4,40 @@ Inherited by all model specific Process classes
 @author: Daniel Levie
 """
 
+import os
 import re
 import logging
 import pandas as pd
 from pathlib import Path
+from typing import Iterator
+
+import marmot.utils.mconfig as mconfig
+from marmot.formatters.formatoutput import FormattedH5Session
+from marmot.formatters.formatcache import ProcessedDataCache
 
 logger = logging.getLogger("formatter." + __name__)
+formatter_settings = mconfig.parser("formatter_settings")
+
+
+def available_memory() -> int:
+    """Gets the available system memory.
+
+    Uses psutil if it is installed, otherwise the available physical pages
+    reported by the os. Where neither can be found, 1 GB is assumed.
+
+    Returns:
+        int: available memory in bytes
+    """
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 1024**3
 
 
 class Process:
@@ -24,6 +52,11 @@ class Process:
     # property names and methods used to create it.
     EXTRA_MARMOT_PROPERTIES: dict = {}
     """Dictionary of Extra custom properties that are created based off existing properties."""
+    # Other formatted properties read by an extra property, in addition to the
+    # property it is created from. The dictionary keys are the extra properties and
+    # the values are the formatted property names they read.
+    EXTRA_PROPERTY_INPUTS: dict = {}
+    """Dictionary of formatted properties used as additional inputs to extra properties."""
     # Conversion units dict, key values is a tuple of new unit name and
     # conversion multiplier
     UNITS_CONVERSION: dict = {
@@ -68,6 +101,7 @@ class Process:
         *_,
         Region_Mapping : pd.DataFrame = pd.DataFrame(),
         emit_names : pd.DataFrame = pd.DataFrame(),
+        processed_data_cache: ProcessedDataCache = None,
         **__,
     ):
         """
@@ -80,11 +114,15 @@ class Process:
             emit_names (pd.DataFrame, optional): DataFrame with 2 columns to rename
                 emission names.
                 Defaults to pd.DataFrame().
+            processed_data_cache (ProcessedDataCache, optional): Cache of
+                get_processed_data results.
+                Defaults to None, results are not cached.
         """
         self.input_folder = input_folder
         self.output_file_path = output_file_path
         self.Region_Mapping = Region_Mapping
         self.emit_names = emit_names
+        self.processed_data_cache = processed_data_cache
 
         if not self.emit_names.empty:
             self.emit_names_dict = (
@@ -104,10 +142,32 @@ class Process:
 
     @input_folder.setter
     def input_folder(self, value):
-        self._get_input_files = None
-        self._file_collection = None
+        self.refresh_input_files()
         self._input_folder = Path(value)
 
+    def refresh_input_files(self, input_files: list = None) -> None:
+        """Resets the input files, so files added since get_input_files was
+        first called are found.
+
+        Args:
+            input_files (list, optional): Input filenames to use, in alpha numeric
+                order, instead of all files in the input folder.
+                Defaults to None, the input folder is read again.
+        """
+        self._get_input_files = input_files
+        self._file_collection = None
+
+    @property
+    def processed_data_cache_key(self) -> tuple:
+        """Identifies the results of this instance in the processed_data_cache.
+
+        Should include any settings which change the results of get_processed_data.
+
+        Returns:
+            tuple: cache key prefix
+        """
+        return (type(self).__name__, str(self.input_folder))
+
     @property
     def get_input_files(self) -> list:
         """Gets a list of input files within the scenario folders
@@ -124,6 +184,17 @@ class Process:
             self._get_input_files = sorted(files, key=lambda x: int(re.sub("\D", "0", x)))
         return self._get_input_files 
 
+    def input_file_path(self, filename: str) -> Path:
+        """Gets the full path of an input file.
+
+        Args:
+            filename (str): input filename, as returned by get_input_files
+
+        Returns:
+            Path: path to input file
+        """
+        return self.input_folder.joinpath(filename)
+
     @property
     def file_collection(self) -> dict:
         """Dictionary input file names to full filename path 
@@ -137,14 +208,31 @@ class Process:
                 self._file_collection[file] = str(self.input_folder.joinpath(file))
         return self._file_collection
 
-    def output_metadata(self, files_list: list) -> None:
+    def output_metadata(
+        self, files_list: list, output_session: FormattedH5Session = None
+    ) -> None:
         """method template for output_metadata
 
         Args:
             files_list (list): list of string files or filenames
+            output_session (FormattedH5Session, optional): Open session of the
+                formatted h5 file to save metadata to.
+                Defaults to None, which opens the output_file_path.
         """
         raise NotImplementedError("No default implementation of this functionality")
 
+    def register_properties(self, property_rows: list) -> None:
+        """Registers the properties a run will process, before any are processed.
+
+        Used by Process classes which can read the data of several properties
+        in a single pass of each input file. Properties which are not registered
+        can still be processed.
+
+        Args:
+            property_rows (list): Properties_File rows of the properties to process.
+        """
+        pass
+
     def get_processed_data(
         self, prop_class: str, property: str, timescale: str, model_filename: str
     ) -> pd.DataFrame:
@@ -161,6 +249,54 @@ class Process:
         """
         raise NotImplementedError("No default implementation of this functionality")
 
+    def iter_partition_chunks(
+        self, prop_class: str, property: str, timescale: str, model_filename: str
+    ) -> Iterator[pd.DataFrame]:
+        """Gets the processed data of a partition in one or more chunks of time.
+
+        Used when partitions are appended to the formatted file one at a time.
+        Chunks are yielded in timestamp order. By default the whole partition is
+        a single chunk, Process classes which can read part of an input file
+        override this to limit the memory used by very large properties.
+
+        Args:
+            prop_class (str): class e.g Region, Generator, Zone etc
+            property (str): Property e.g gen_out, cap_out etc.
+            timescale (str): Data timescale, e.g interval, summary.
+            model_filename (str): name of model to process.
+
+        Yields:
+            Iterator[pd.DataFrame]: processed data of each chunk.
+        """
+        yield self.get_processed_data(prop_class, property, timescale, model_filename)
+
+    def get_partition_data(
+        self, prop_class: str, property: str, timescale: str, files_list: list
+    ) -> list:
+        """Gets the processed data of a property for each partition in files_list.
+
+        Partitions are processed in order, processing stops at the first
+        partition which returns an empty DataFrame.
+
+        Args:
+            prop_class (str): class e.g Region, Generator, Zone etc
+            property (str): Property e.g gen_out, cap_out etc.
+            timescale (str): Data timescale, e.g interval, summary.
+            files_list (list): list of model filenames to process.
+
+        Returns:
+            list: list of processed dataframes in partition order.
+        """
+        data_chunks = []
+        for model_filename in files_list:
+            processed_data = self.get_processed_data(
+                prop_class, property, timescale, model_filename
+            )
+            data_chunks.append(processed_data)
+            if processed_data.empty is True:
+                break
+        return data_chunks
+
     def report_prop_error(self, property: str, prop_class: str) -> pd.DataFrame:
         """Outputs a warning message when the get_processed_data method
         cannot find the specified property in the simulation model solution files.
@@ -179,26 +315,95 @@ class Process:
         df = pd.DataFrame()
         return df
 
-    def combine_models(self, model_list: list, 
-        drop_duplicates: bool = True) -> pd.DataFrame:
+    def trim_partition_overlap(
+        self, df: pd.DataFrame, last_timestamp: pd.Timestamp = None
+    ) -> pd.DataFrame:
+        """Removes data from a partition which overlaps with the previous partition.
+
+        Partitions can include look-ahead periods which overlap with the start of
+        the next partition. All rows with a timestamp at or before the last
+        timestamp of the previous partition are removed, keeping the data from
+        the first partition it appears in.
+
+        The overlap is found with a slice of the sorted timestamp index level,
+        so no work is done on the rows of partitions that do not overlap.
+
+        Args:
+            df (pd.DataFrame): Processed partition data with a timestamp index level.
+            last_timestamp (pd.Timestamp, optional): Last timestamp of the
+                previous partition. If None nothing is removed.
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: Partition data with overlap removed.
+        """
+        if last_timestamp is None or df.empty:
+            return df
+
+        if isinstance(df.index, pd.MultiIndex):
+            level_num = df.index.names.index("timestamp")
+            timestamp_level = df.index.levels[level_num]
+            if timestamp_level.is_monotonic_increasing:
+                # Number of unique timestamps at or before last_timestamp
+                overlap_len = timestamp_level.searchsorted(last_timestamp, side="right")
+                if overlap_len == 0:
+                    return df
+                if overlap_len == len(timestamp_level):
+                    return df.iloc[0:0]
+                return df.loc[df.index.codes[level_num] >= overlap_len]
+
+        timestamps = df.index.get_level_values("timestamp")
+        return df.loc[timestamps > last_timestamp]
+
+    def combine_models(
+        self,
+        model_list: list,
+        drop_duplicates: bool = True,
+        validate_duplicates: bool = None,
+    ) -> pd.DataFrame:
         """Combine temporally disaggregated model results.
 
         Will drop duplicate index entries by default.
+        Duplicates can only come from the overlap between consecutive partitions,
+        so these are removed by trimming the start of each partition to after the
+        last timestamp of the previous partition.
 
         Args:
-            model_list (list): list of df models to combine.
+            model_list (list): list of df models to combine, in partition order.
             drop_duplicates (bool, optional): Drop duplicate index entries.
                 Defaults to True.
+            validate_duplicates (bool, optional): Also check the full index
+                of the combined df for duplicates, keeping the first entry.
+                Defaults to None, which uses the
+                formatter_settings 'validate_partition_duplicates' value.
 
         Returns:
             pd.DataFrame: Combined df
         """
-        df = pd.concat(model_list, copy=False)
-        if drop_duplicates:
-            origsize = df.size
+        if not drop_duplicates:
+            return pd.concat(model_list, copy=False)
+
+        if validate_duplicates is None:
+            validate_duplicates = formatter_settings["validate_partition_duplicates"]
+
+        trimmed_list = []
+        last_timestamp = None
+        for df in model_list:
+            if not df.empty and "timestamp" in df.index.names:
+                df = self.trim_partition_overlap(df, last_timestamp)
+                if not df.empty:
+                    partition_end = df.index.get_level_values("timestamp").max()
+                    if last_timestamp is None or partition_end > last_timestamp:
+                        last_timestamp = partition_end
+            trimmed_list.append(df)
+
+        origsize = sum(df.size for df in model_list)
+        df = pd.concat(trimmed_list, copy=False)
+        del trimmed_list
+        if validate_duplicates or "timestamp" not in df.index.names:
             # Remove duplicates; keep first entry
             df = df.loc[~df.index.duplicated(keep="first")]
 
-            if (origsize - df.size) > 0:
-                logger.info(f"Drop duplicates removed {origsize-df.size} rows")
-        return df
\ No newline at end of file
+        if (origsize - df.size) > 0:
+            logger.info(f"Drop duplicates removed {origsize-df.size} rows")
+        return df
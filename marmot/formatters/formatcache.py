@@ -0,0 +1,208 @@
+"""Caches the results of Process.get_processed_data.
+
+get_processed_data is a pure function of its arguments for a given Process
+instance, so results can be reused by every later request for the same
+property and partition, e.g by ExtraProperties methods or when formatting
+the same PLEXOS block again.
+"""
+
+import os
+import shutil
+import pickle
+import hashlib
+import logging
+import tempfile
+import functools
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, Union
+
+import pandas as pd
+
+logger = logging.getLogger("formatter." + __name__)
+
+
+class ProcessedDataCache:
+    """Least recently used cache of processed dataframes, bounded by size in bytes.
+
+    When the cache is full the least recently used dataframes are evicted.
+    If a spill_directory is set, evicted dataframes are saved to disk and read
+    back when requested again, instead of being processed again from the
+    simulation model files. Spilled files are removed once the cache
+    is garbage collected.
+
+    Cached dataframes are shared with the caller and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes: int, spill_directory: Union[str, Path] = None):
+        """
+        Args:
+            max_bytes (int): Max size of dataframes held in memory.
+            spill_directory (Union[str, Path], optional): Directory to save
+                evicted dataframes to.
+                Defaults to None, evicted dataframes are discarded.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._spill_path = None
+        if spill_directory is not None:
+            Path(spill_directory).mkdir(parents=True, exist_ok=True)
+            self._spill_path = Path(
+                tempfile.mkdtemp(prefix="marmot_cache_", dir=spill_directory)
+            )
+            weakref.finalize(self, shutil.rmtree, self._spill_path, True)
+
+    def __getstate__(self) -> dict:
+        # Only settings and the spill directory are passed to worker processes,
+        # dataframes held in memory stay with the owner
+        state = self.__dict__.copy()
+        state["_data"] = OrderedDict()
+        state["current_bytes"] = 0
+        return state
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data or (
+            self._spill_path is not None and self._spill_file(key).is_file()
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> pd.DataFrame:
+        """Gets a cached dataframe.
+
+        Args:
+            key (Hashable): cache key
+
+        Returns:
+            pd.DataFrame: cached dataframe, None if not in the cache.
+        """
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+        if self._spill_path is not None:
+            spill_file = self._spill_file(key)
+            if spill_file.is_file():
+                df = pd.read_pickle(spill_file)
+                self.hits += 1
+                self._add(key, df, spill=False)
+                return df
+
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        """Adds a dataframe to the cache, evicting the least recently used
+        dataframes if the cache is full.
+
+        Args:
+            key (Hashable): cache key
+            df (pd.DataFrame): dataframe to cache
+        """
+        if key in self._data:
+            self.current_bytes -= self._data.pop(key)[1]
+        self._add(key, df, spill=True)
+
+    def clear(self) -> None:
+        """Removes all dataframes from memory and disk."""
+        self._data.clear()
+        self.current_bytes = 0
+        if self._spill_path is not None:
+            for spill_file in self._spill_path.iterdir():
+                spill_file.unlink()
+
+    def _add(self, key: Hashable, df: pd.DataFrame, spill: bool) -> None:
+        """Adds a dataframe to memory, or to disk if larger than max_bytes.
+
+        Args:
+            key (Hashable): cache key
+            df (pd.DataFrame): dataframe to cache
+            spill (bool): Save to the spill directory if the dataframe is
+                too large to hold in memory.
+        """
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            if spill:
+                self._spill(key, df)
+            return
+        self._data[key] = (df, nbytes)
+        self.current_bytes += nbytes
+        while self.current_bytes > self.max_bytes:
+            evict_key, (evict_df, evict_bytes) = self._data.popitem(last=False)
+            self.current_bytes -= evict_bytes
+            self._spill(evict_key, evict_df)
+
+    def _spill(self, key: Hashable, df: pd.DataFrame) -> None:
+        """Saves an evicted dataframe to the spill directory, if set.
+
+        Args:
+            key (Hashable): cache key
+            df (pd.DataFrame): dataframe to save
+        """
+        if self._spill_path is None:
+            return
+        spill_file = self._spill_file(key)
+        if spill_file.is_file():
+            return
+        # Write to a temporary file first, the spill directory can be shared by
+        # several worker processes
+        tmp_file = spill_file.with_suffix(f".{os.getpid()}.tmp")
+        df.to_pickle(tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, spill_file)
+
+    def _spill_file(self, key: Hashable) -> Path:
+        """Gets the spill file name of a key.
+
+        Args:
+            key (Hashable): cache key
+
+        Returns:
+            Path: path of spill file
+        """
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return self._spill_path.joinpath(f"{digest}.pkl")
+
+
+def cache_processed_data(method: Callable) -> Callable:
+    """Decorator which caches the results of a Process get_processed_data method.
+
+    Results are cached in the Process processed_data_cache, keyed on the
+    Process processed_data_cache_key and the method arguments. If the Process
+    has no processed_data_cache the method is called as normal.
+
+    Args:
+        method (Callable): get_processed_data method
+
+    Returns:
+        Callable: wrapped method
+    """
+
+    @functools.wraps(method)
+    def wrapper(
+        self, prop_class: str, prop: str, timescale: str, model_filename: str
+    ) -> pd.DataFrame:
+        if self.processed_data_cache is None:
+            return method(self, prop_class, prop, timescale, model_filename)
+
+        key = (
+            *self.processed_data_cache_key,
+            prop_class,
+            prop,
+            timescale,
+            model_filename,
+        )
+        df = self.processed_data_cache.get(key)
+        if df is None:
+            df = method(self, prop_class, prop, timescale, model_filename)
+            self.processed_data_cache.put(key, df)
+        else:
+            logger.info(f"      {model_filename} {prop} (cached)")
+        return df
+
+    return wrapper
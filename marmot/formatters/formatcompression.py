@@ -0,0 +1,277 @@
+"""Benchmarks compression settings of the formatted h5 file on this machine.
+
+A sample of a formatted property is saved and read back with each
+compression setting. The time taken and the size of the saved data are used
+to recommend the best setting, which can be saved to the config.yml file.
+"""
+
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import pandas as pd
+import tables
+
+import marmot.utils.mconfig as mconfig
+from marmot.formatters.formatoutput import FormattedH5Session
+
+logger = logging.getLogger("formatter." + __name__)
+
+DEFAULT_CODECS: List[Tuple[str, int, bool]] = [
+    (complib, complevel, shuffle)
+    for complib, complevels in (
+        ("blosc:lz4", (1, 5, 9)),
+        ("blosc:lz4hc", (5, 9)),
+        ("blosc:zstd", (1, 5, 9)),
+        ("blosc:zlib", (1, 5, 9)),
+        ("zlib", (1, 5, 9)),
+    )
+    for complevel in complevels
+    for shuffle in (True, False)
+]
+"""(complib, complevel, shuffle) settings tested by calibrate_compression"""
+
+
+def _available_codecs(codecs: List[Tuple[str, int, bool]]) -> list:
+    """Removes compression libraries that are not supported by PyTables.
+
+    Args:
+        codecs (List[Tuple[str, int, bool]]): list of (complib, complevel, shuffle)
+
+    Returns:
+        list: supported codecs
+    """
+    blosc_compressors = tables.blosc_compressor_list()
+    available = []
+    for complib, complevel, shuffle in codecs:
+        library = complib.split(":")[0]
+        if tables.which_lib_version(library) is None:
+            continue
+        if ":" in complib and complib.split(":")[1] not in blosc_compressors:
+            continue
+        available.append((complib, complevel, shuffle))
+    return available
+
+
+def _leaf_size(leaf: tables.Leaf) -> int:
+    """Gets the size of a saved dataset in bytes.
+
+    Args:
+        leaf (tables.Leaf): pytables dataset
+
+    Returns:
+        int: size on disk, or size in memory of variable length arrays
+    """
+    try:
+        return leaf.size_on_disk
+    except NotImplementedError:
+        return leaf.size_in_memory
+
+
+def _time_codec(
+    df: pd.DataFrame,
+    file_name: Path,
+    complevel: int,
+    complib: str,
+    shuffle: bool,
+    repeats: int,
+) -> Tuple[float, float, int]:
+    """Saves and reads a dataframe with a compression setting.
+
+    Args:
+        df (pd.DataFrame): sample data
+        file_name (Path): temporary h5 file
+        complevel (int): compression level
+        complib (str): compression library
+        shuffle (bool): byte shuffle data before compression
+        repeats (int): Number of times to repeat the test, the fastest
+            time is used.
+
+    Returns:
+        Tuple[float, float, int]: write seconds, read seconds and file size in bytes
+    """
+    write_time = read_time = float("inf")
+    for _ in range(repeats):
+        file_name.unlink(missing_ok=True)
+        start = time.perf_counter()
+        with FormattedH5Session(
+            file_name, mode="w", complevel=complevel, complib=complib, shuffle=shuffle
+        ) as session:
+            session.put(df, key="sample")
+        write_time = min(write_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pd.read_hdf(file_name, key="sample")
+        read_time = min(read_time, time.perf_counter() - start)
+    return write_time, read_time, file_name.stat().st_size
+
+
+def calibrate_compression(
+    file_name: Union[str, Path],
+    key: str = None,
+    sample_rows: int = 1000000,
+    codecs: List[Tuple[str, int, bool]] = None,
+    reads_per_write: float = 10,
+    min_ratio: float = 0.8,
+    repeats: int = 3,
+) -> pd.DataFrame:
+    """Measures the write and read throughput and compression ratio of
+    compression settings, using a sample of a formatted property.
+
+    Settings are scored by the time to save the sample once and read it
+    reads_per_write times, as formatted files are read by the plotter many
+    more times than they are written. The recommended setting is the lowest
+    scoring setting whose compression ratio is at least min_ratio of the
+    best compression ratio.
+
+    Args:
+        file_name (Union[str, Path]): formatted h5 file to sample.
+        key (str, optional): formatted property to sample,
+            e.g generator_Generation.
+            Defaults to None, which uses the largest property in the file.
+        sample_rows (int, optional): Max number of rows to sample.
+            Defaults to 1000000.
+        codecs (List[Tuple[str, int, bool]], optional): (complib, complevel, shuffle)
+            settings to test.
+            Defaults to None, which tests DEFAULT_CODECS.
+        reads_per_write (float, optional): Expected number of reads of each
+            saved property.
+            Defaults to 10.
+        min_ratio (float, optional): Min fraction of the best compression ratio
+            of the recommended setting.
+            Defaults to 0.8.
+        repeats (int, optional): Number of times to repeat each test.
+            Defaults to 3.
+
+    Returns:
+        pd.DataFrame: Results of each setting, sorted by score. The recommended
+        setting is the first row.
+    """
+    file_name = Path(file_name)
+    if key is None:
+        with tables.open_file(file_name, "r") as f:
+            sizes = {}
+            for name, node in f.root._v_children.items():
+                if name in ("metadata", "manifest") or not isinstance(
+                    node, tables.Group
+                ):
+                    continue
+                sizes[name] = sum(
+                    _leaf_size(leaf) for leaf in f.walk_nodes(node, "Leaf")
+                )
+        if not sizes:
+            raise ValueError(f"No formatted properties found in {file_name}")
+        key = max(sizes, key=sizes.get)
+
+    logger.info(f"Sampling {key} from {file_name.name}")
+    with FormattedH5Session(file_name, mode="r") as session:
+        if session.is_wide(key):
+            # Sampled in the long layout, as saved when wide_layout is off
+            df = session.get(key).iloc[:sample_rows]
+        elif session.is_table(key):
+            df = pd.read_hdf(file_name, key, stop=sample_rows)
+        else:
+            df = session.get(key).iloc[:sample_rows]
+    data_bytes = int(df.memory_usage(index=True, deep=True).sum())
+
+    if codecs is None:
+        codecs = DEFAULT_CODECS
+    codecs = _available_codecs(codecs)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="marmot_compression_") as tmp_dir:
+        tmp_file = Path(tmp_dir).joinpath("sample.h5")
+        _, _, uncompressed_size = _time_codec(df, tmp_file, 0, None, False, 1)
+        for complib, complevel, shuffle in [(None, 0, False)] + codecs:
+            write_time, read_time, file_size = _time_codec(
+                df, tmp_file, complevel, complib, shuffle, repeats
+            )
+            results.append(
+                {
+                    "complib": complib,
+                    "complevel": complevel,
+                    "shuffle": shuffle,
+                    "write_MB/s": data_bytes / 1e6 / write_time,
+                    "read_MB/s": data_bytes / 1e6 / read_time,
+                    "ratio": uncompressed_size / file_size,
+                    "score": write_time + reads_per_write * read_time,
+                }
+            )
+            logger.info(
+                f"{complib} level {complevel} shuffle {shuffle}: "
+                f"write {results[-1]['write_MB/s']:.1f} MB/s, "
+                f"read {results[-1]['read_MB/s']:.1f} MB/s, "
+                f"ratio {results[-1]['ratio']:.2f}"
+            )
+
+    results = pd.DataFrame(results)
+    results["meets_ratio"] = results["ratio"] >= min_ratio * results["ratio"].max()
+    return results.sort_values(
+        ["meets_ratio", "score"], ascending=[False, True]
+    ).reset_index(drop=True)
+
+
+def apply_compression(results: pd.DataFrame, property_class: str = "default") -> dict:
+    """Saves the recommended compression setting to the config.yml file.
+
+    Args:
+        results (pd.DataFrame): Results returned by calibrate_compression.
+        property_class (str, optional): Property class or formatted property
+            the setting is used for, e.g generator.
+            Defaults to "default", which is used for all properties.
+
+    Returns:
+        dict: saved compression setting
+    """
+    best = results.iloc[0]
+    setting = dict(
+        complib=best["complib"] or "blosc:zlib",
+        complevel=int(best["complevel"]),
+        shuffle=bool(best["shuffle"]),
+    )
+    compression = mconfig.parser("formatter_settings", "compression")
+    compression[property_class] = setting
+    mconfig.edit_value(compression, "formatter_settings", "compression")
+    return setting
+
+
+def main():
+    """Run the compression calibration from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark compression settings of a formatted h5 file"
+    )
+    parser.add_argument("file_name", help="Path to formatted h5 file")
+    parser.add_argument("--key", help="Formatted property to sample")
+    parser.add_argument("--sample-rows", type=int, default=1000000)
+    parser.add_argument("--reads-per-write", type=float, default=10)
+    parser.add_argument("--min-ratio", type=float, default=0.8)
+    parser.add_argument(
+        "--apply",
+        nargs="?",
+        const="default",
+        metavar="PROPERTY_CLASS",
+        help="Save the recommended setting to config.yml, for all properties "
+        "or for a single property class, e.g generator",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    results = calibrate_compression(
+        args.file_name,
+        key=args.key,
+        sample_rows=args.sample_rows,
+        reads_per_write=args.reads_per_write,
+        min_ratio=args.min_ratio,
+    )
+    print(results.to_string(index=False, float_format="{:.2f}".format))
+    best = results.iloc[0]
+    print(
+        f"\nRecommended: complib={best['complib']}, complevel={best['complevel']}, "
+        f"shuffle={best['shuffle']}"
+    )
+    if args.apply:
+        setting = apply_compression(results, args.apply)
+        print(f"Saved {args.apply} compression setting to config.yml: {setting}")
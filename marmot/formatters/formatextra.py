@@ -34,6 +34,41 @@ class ExtraProperties:
         """
         self.model = model
         self.files_list = files_list
+        self.formatted_properties: dict = {}
+        """Properties formatted in the current run which are inputs to extra
+        properties, keyed by (property_key_name, timescale)"""
+
+    def get_formatted_property(
+        self, property_key_name: str, prop_class: str, prop: str, timescale: str
+    ) -> pd.DataFrame:
+        """Gets a property used as an input to an extra property.
+
+        If the property has already been formatted in the current run it is
+        reused, otherwise it is processed from every model partition.
+
+        Args:
+            property_key_name (str): formatted property identifier,
+                e.g generator_Available_Capacity
+            prop_class (str): class e.g Region, Generator, Zone etc
+            prop (str): Property e.g Available Capacity, Pump Load etc.
+            timescale (str): Data timescale, e.g interval, summary.
+
+        Returns:
+            pd.DataFrame: Combined property df, empty if the property is not
+            available in every partition.
+        """
+        if (property_key_name, timescale) in self.formatted_properties:
+            return self.formatted_properties[(property_key_name, timescale)]
+
+        data_chunks = []
+        for file in self.files_list:
+            processed_data = self.model.get_processed_data(
+                prop_class, prop, timescale, file
+            )
+            if processed_data.empty is True:
+                return pd.DataFrame()
+            data_chunks.append(processed_data)
+        return self.model.combine_models(data_chunks)
 
     def plexos_generator_curtailment(
         self, df: pd.DataFrame, timescale: str = "interval"
@@ -48,23 +83,17 @@ class ExtraProperties:
         Returns:
             pd.DataFrame: generator_Curtailment df
         """
-        data_chunks = []
-        for file in self.files_list:
-            processed_data = self.model.get_processed_data(
-                "generator", "Available Capacity", timescale, file
+        avail_gen = self.get_formatted_property(
+            "generator_Available_Capacity", "generator", "Available Capacity", timescale
+        )
+        if avail_gen.empty is True:
+            logger.warning(
+                "generator_Available_Capacity & "
+                "generator_Generation are required "
+                "for Curtailment calculation"
             )
+            return pd.DataFrame()
 
-            if processed_data.empty is True:
-                logger.warning(
-                    "generator_Available_Capacity & "
-                    "generator_Generation are required "
-                    "for Curtailment calculation"
-                )
-                return pd.DataFrame()
-
-            data_chunks.append(processed_data)
-
-        avail_gen = self.model.combine_models(data_chunks)
         return avail_gen - df
 
     def plexos_demand(
@@ -84,19 +113,13 @@ class ExtraProperties:
         Returns:
             pd.DataFrame: region_Demand / zone_Demand df
         """
-        data_chunks = []
-        for file in self.files_list:
-            processed_data = self.model.get_processed_data(
-                "generator", "Pump Load", timescale, file
-            )
-
-            if processed_data.empty is True:
-                logger.info("Total Demand will equal Total Load")
-                return pd.DataFrame()
-
-            data_chunks.append(processed_data)
+        pump_load = self.get_formatted_property(
+            "generator_Pump_Load", "generator", "Pump Load", timescale
+        )
+        if pump_load.empty is True:
+            logger.info("Total Demand will equal Total Load")
+            return pd.DataFrame()
 
-        pump_load = self.model.combine_models(data_chunks)
         pump_load = pump_load.groupby(df.index.names).sum()
         return df - pump_load
 
@@ -0,0 +1,297 @@
+"""Records the inputs used to create each key of the formatted h5 file.
+
+The manifest is saved in the formatted h5 file alongside the formatted
+properties. On later runs it is used to find the keys whose inputs have
+changed, so only those keys are processed again.
+"""
+
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from marmot.formatters.formatbase import Process
+from marmot.formatters.formatoutput import FormattedH5Session
+
+logger = logging.getLogger("formatter." + __name__)
+
+
+def _digest(data) -> str:
+    """Gets a hash of json serializable data.
+
+    Args:
+        data: json serializable data
+
+    Returns:
+        str: hex digest
+    """
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Gets a hash of the contents of a dataframe, e.g a Region_Mapping.
+
+    Args:
+        df (pd.DataFrame): dataframe to hash
+
+    Returns:
+        str: hex digest, None if the dataframe is empty.
+    """
+    if df.empty:
+        return None
+    digest = hashlib.sha1(str(list(df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).values)
+    return digest.hexdigest()
+
+
+class FormatManifest:
+    """Manifest of the inputs used to create each key of the formatted h5 file.
+
+    For each key the manifest records the size and modification time of
+    every input file it was created from (and its content hash if
+    hash_input_files is True), the Properties_File row used and the settings
+    which affect the formatted data. Extra properties record the digests of
+    the properties they were created from.
+
+    Input files are only hashed if their size or modification time differ
+    from the manifest, and each file is hashed at most once per run.
+    """
+
+    KEY = "manifest"
+    """Key of the manifest in the formatted h5 file"""
+
+    IN_PROGRESS = "in_progress"
+    """Digest recorded for keys which are being saved one partition at a time"""
+
+    def __init__(
+        self,
+        output_session: FormattedH5Session,
+        settings: dict,
+        hash_input_files: bool = False,
+    ):
+        """
+        Args:
+            output_session (FormattedH5Session): Open session of the formatted h5 file.
+            settings (dict): Settings which affect the formatted data,
+                e.g sim_model, VoLL. Must be json serializable.
+            hash_input_files (bool, optional): Compare the contents of input files,
+                if False only the size and modification time are compared.
+                Defaults to False.
+        """
+        self.output_session = output_session
+        self.settings = settings
+        self.hash_input_files = hash_input_files
+        self.records: Dict[str, dict] = {}
+        """Saved manifest records, {key: {"digest": str, "record": dict}}"""
+        self._file_signatures: Dict[str, dict] = {}
+
+        if self.KEY in output_session:
+            manifest = output_session.get(self.KEY)
+            for key, row in manifest.iterrows():
+                self.records[key] = {
+                    "digest": row["digest"],
+                    "record": json.loads(row["record"]),
+                }
+
+        # Hashes of files from previous runs, reused if the file is unchanged
+        self._previous_files: Dict[Tuple[str, int, int], str] = {}
+        for saved in self.records.values():
+            for file in saved["record"].get("files", []):
+                self._previous_files[
+                    (file["path"], file["size"], file["mtime_ns"])
+                ] = file["sha1"]
+
+    def file_signature(self, file_path: Path) -> dict:
+        """Gets the size, modification time and content hash of an input file.
+
+        Args:
+            file_path (Path): Path to input file.
+
+        Returns:
+            dict: file signature
+        """
+        file_path = str(file_path)
+        if file_path not in self._file_signatures:
+            stat = Path(file_path).stat()
+            sha1 = None
+            if self.hash_input_files:
+                sha1 = self._previous_files.get(
+                    (file_path, stat.st_size, stat.st_mtime_ns)
+                )
+                if sha1 is None:
+                    logger.debug(f"Hashing {file_path}")
+                    digest = hashlib.sha1()
+                    with open(file_path, "rb") as f:
+                        for block in iter(lambda: f.read(1 << 24), b""):
+                            digest.update(block)
+                    sha1 = digest.hexdigest()
+            self._file_signatures[file_path] = {
+                "path": file_path,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha1": sha1,
+            }
+        return self._file_signatures[file_path]
+
+    def property_record(self, row: pd.Series, file_paths: List[Path]) -> dict:
+        """Creates the manifest record of a property processed from input files.
+
+        Args:
+            row (pd.Series): Properties_File row of property.
+            file_paths (List[Path]): Paths of the input files the property
+                is processed from.
+
+        Returns:
+            dict: manifest record
+        """
+        return {
+            "property": {name: str(value) for name, value in row.items()},
+            "settings": self.settings,
+            "files": [self.file_signature(path) for path in file_paths],
+        }
+
+    @staticmethod
+    def record_digest(record: dict) -> str:
+        """Gets the digest of a manifest record.
+
+        Modification times are not included, so a file which has been
+        touched but not modified does not change the digest.
+
+        Args:
+            record (dict): manifest record
+
+        Returns:
+            str: hex digest
+        """
+        compare = dict(record)
+        if "files" in compare:
+            compare["files"] = [
+                {name: value for name, value in file.items() if name != "mtime_ns"}
+                if file["sha1"] is not None
+                else file
+                for file in compare["files"]
+            ]
+        return _digest(compare)
+
+    def expected_digests(
+        self, process_sim_model: Process, base_records: Dict[str, dict]
+    ) -> Dict[str, Tuple[str, dict]]:
+        """Gets the expected digest of every key which can be created in this run.
+
+        Extra properties are found from the Process EXTRA_MARMOT_PROPERTIES.
+        Their record is the digest of the property they are created from,
+        other inputs such as those in EXTRA_PROPERTY_INPUTS are read from
+        the same input files.
+
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            base_records (Dict[str, dict]): {property_key_name: record} of each
+                property in the Properties_File.
+
+        Returns:
+            Dict[str, Tuple[str, dict]]: {key: (digest, record)}
+        """
+        digests = {
+            key: (self.record_digest(record), record)
+            for key, record in base_records.items()
+        }
+        pending = list(base_records)
+        while pending:
+            parent = pending.pop(0)
+            for prop_name, _ in process_sim_model.EXTRA_MARMOT_PROPERTIES.get(
+                parent, []
+            ):
+                if prop_name in digests:
+                    continue
+                record = {"parent": parent, "parent_digest": digests[parent][0]}
+                digests[prop_name] = (self.record_digest(record), record)
+                pending.append(prop_name)
+        return digests
+
+    def stale_keys(
+        self, expected: Dict[str, Tuple[str, dict]], existing_keys: list
+    ) -> Tuple[Set[str], Set[str]]:
+        """Finds existing keys whose inputs have changed since they were saved.
+
+        Keys with no manifest record, e.g those saved before the manifest
+        was added, are assumed to be current. Keys recorded as in progress
+        were not completely saved, so are always stale.
+
+        Args:
+            expected (Dict[str, Tuple[str, dict]]): Expected digests, as returned
+                by expected_digests.
+            existing_keys (list): Keys in the formatted h5 file.
+
+        Returns:
+            Tuple[Set[str], Set[str]]: stale keys, and the base properties
+            which must be processed again to recreate them.
+        """
+        stale = set()
+        reprocess = set()
+        for key, (digest, _) in expected.items():
+            saved = self.records.get(key)
+            if key not in existing_keys or saved is None:
+                continue
+            if saved["digest"] != digest:
+                stale.add(key)
+                # Extra properties are recreated from their base property
+                root = key
+                while "parent" in expected[root][1]:
+                    root = expected[root][1]["parent"]
+                reprocess.add(root)
+        return stale, reprocess
+
+    def update(self, key: str, digest: str, record: dict) -> None:
+        """Updates the record of a saved key.
+
+        Args:
+            key (str): formatted property identifier, e.g generator_Generation
+            digest (str): digest of record
+            record (dict): manifest record
+        """
+        self.records[key] = {"digest": digest, "record": record}
+
+    def mark_in_progress(self, key: str) -> None:
+        """Records that a key is being saved one partition at a time, and
+        saves the manifest.
+
+        Must be called before the first partition is saved. If the run stops
+        before the key is complete, the partially saved key is then processed
+        again by the next run, instead of being assumed current. The record is
+        replaced by update once the key is complete.
+
+        Args:
+            key (str): formatted property identifier, e.g generator_Generation
+        """
+        self.update(key, self.IN_PROGRESS, {"in_progress": True})
+        self.save()
+
+    def remove(self, key: str) -> None:
+        """Removes the record of a key, if it exists.
+
+        Args:
+            key (str): formatted property identifier, e.g generator_Generation
+        """
+        self.records.pop(key, None)
+
+    def save(self) -> None:
+        """Saves the manifest to the formatted h5 file."""
+        if not self.records:
+            return
+        manifest = pd.DataFrame(
+            {
+                "digest": [saved["digest"] for saved in self.records.values()],
+                "record": [
+                    json.dumps(saved["record"], sort_keys=True, default=str)
+                    for saved in self.records.values()
+                ],
+            },
+            index=pd.Index(list(self.records), name="key"),
+        ).sort_index()
+        self.output_session.put(manifest, key=self.KEY)
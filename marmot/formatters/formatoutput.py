@@ -0,0 +1,676 @@
+"""Handles the writing of formatted data to the formatted h5 file.
+
+All writes to the formatted h5 file during a formatter run go through a single
+FormattedH5Writer, so the file never has more than one writer at a time.
+The file itself is held open for the whole run by a FormattedH5Session.
+"""
+
+import queue
+import shutil
+import hashlib
+import logging
+import threading
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, Set
+
+import numpy as np
+import pandas as pd
+import tables
+
+from marmot.formatters.formatwide import WideProperty
+
+logger = logging.getLogger("formatter." + __name__)
+
+
+def _fixed_width_strings(data: np.ndarray) -> np.ndarray:
+    """Converts variable length string fields of a structured array to
+    fixed width bytes, which can be stored in a pytables table.
+
+    Args:
+        data (np.ndarray): Structured array
+
+    Returns:
+        np.ndarray: Structured array with no object fields
+    """
+    object_fields = [name for name in data.dtype.names if data.dtype[name] == object]
+    if not object_fields:
+        return data
+    new_dtype = []
+    for name in data.dtype.names:
+        if name in object_fields:
+            values = [
+                x if isinstance(x, bytes) else str(x).encode("utf-8")
+                for x in data[name]
+            ]
+            new_dtype.append((name, f"S{max(map(len, values), default=1) or 1}"))
+        else:
+            new_dtype.append((name, data.dtype[name]))
+    return data.astype(new_dtype)
+
+
+def _metadata_digest(datasets: dict) -> str:
+    """Gets a hash of the names, types and contents of a group of arrays.
+
+    Args:
+        datasets (dict): Dictionary of dataset name to np.ndarray
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha1()
+    for name in sorted(datasets):
+        data = np.asarray(datasets[name])
+        if data.dtype.names:
+            data = _fixed_width_strings(data)
+        elif data.dtype == object:
+            data = np.array(
+                [
+                    x if isinstance(x, bytes) else str(x).encode("utf-8")
+                    for x in data.ravel()
+                ]
+            )
+        digest.update(name.encode("utf-8"))
+        digest.update(str(data.dtype.descr).encode("utf-8"))
+        digest.update(str(data.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(data).tobytes())
+    return digest.hexdigest()
+
+
+def get_compression(compression_settings: dict, key: str = None) -> dict:
+    """Gets the compression settings of a formatted h5 key.
+
+    Settings of the key, e.g generator_Generation, or of its property class,
+    e.g generator, are applied over the default settings.
+
+    Args:
+        compression_settings (dict): compression section of the formatter_settings,
+            {"default": {...}, <property class or key>: {...}}
+        key (str, optional): formatted property identifier,
+            e.g generator_Generation.
+            Defaults to None, which returns the default settings.
+
+    Returns:
+        dict: complevel, complib and shuffle settings
+    """
+    compression = dict(complevel=9, complib="blosc:zlib", shuffle=True)
+    compression.update(compression_settings.get("default", {}))
+    if key is not None:
+        prop_class = key.strip("/").split("_")[0]
+        for name in (prop_class, key.strip("/")):
+            compression.update(compression_settings.get(name) or {})
+    return compression
+
+
+class FormattedH5Session:
+    """Single open pd.HDFStore used for all access to the formatted h5 file.
+
+    The formatted h5 file is opened once at the start of a formatter run and
+    closed at the end, instead of being opened, flushed and closed by every
+    save, key lookup and metadata write. Key names are cached so existence
+    checks do not need to read the file.
+
+    Access to the store is serialized with a lock, so the session can be shared
+    between the main thread and the FormattedH5Writer thread.
+
+    FormattedH5Session should be used as a context manager so the file is
+    closed once formatting is complete.
+    """
+
+    def __init__(
+        self,
+        file_name: Path,
+        mode: str = "a",
+        complevel: int = 9,
+        complib: str = "blosc:zlib",
+        shuffle: bool = True,
+    ):
+        """
+        Args:
+            file_name (Path): name of hdf5 file, created if it does not exist.
+            mode (str, optional): file access mode.
+                Defaults to "a".
+            complevel (int, optional): default compression level.
+                Defaults to 9.
+            complib (str, optional): default compression library.
+                Defaults to 'blosc:zlib'.
+            shuffle (bool, optional): default byte shuffle setting.
+                Defaults to True.
+        """
+        self.file_name = file_name
+        # Folder of the parquet storage backend, see formatstorage
+        self._parquet_folder = Path(file_name).with_suffix(".parquet")
+        if mode == "w":
+            shutil.rmtree(self._parquet_folder, ignore_errors=True)
+        self.complevel = complevel
+        self.complib = complib
+        self.shuffle = shuffle
+        self._lock = threading.RLock()
+        self._store = pd.HDFStore(file_name, mode=mode)
+        self._store._filters = self._create_filters(complevel, complib, shuffle)
+        self._keys: Set[str] = {
+            key.lstrip("/") for key in self._store.root._v_children.keys()
+        }
+        # Content hash of each metadata group saved in the file,
+        # {digest: group path}, read when first needed
+        self._metadata_groups: Dict[str, str] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __contains__(self, key: str) -> bool:
+        return key.strip("/").split("/")[0] in self._keys
+
+    @property
+    def is_open(self) -> bool:
+        """bool: True if the h5 file is open"""
+        return self._store.is_open
+
+    @property
+    def handle(self) -> tables.File:
+        """Underlying pytables file handle, used to write non pandas data
+        such as metadata.
+
+        Returns:
+            tables.File: open file handle
+        """
+        return self._store._handle
+
+    def keys(self) -> list:
+        """Gets the top level keys of the formatted h5 file.
+
+        Returns:
+            list: list of key names
+        """
+        return sorted(self._keys)
+
+    @staticmethod
+    def _create_filters(
+        complevel: int, complib: str, shuffle: bool
+    ) -> tables.Filters:
+        """Creates the pytables compression filters of a key.
+
+        Args:
+            complevel (int): compression level, 0 disables compression.
+            complib (str): compression library.
+            shuffle (bool): byte shuffle data before compression.
+
+        Returns:
+            tables.Filters: Compression filters, None if uncompressed.
+        """
+        if not complevel:
+            return None
+        return tables.Filters(complevel=complevel, complib=complib, shuffle=shuffle)
+
+    def put(
+        self,
+        df: pd.DataFrame,
+        key: str,
+        append: bool = False,
+        complevel: int = None,
+        complib: str = None,
+        shuffle: bool = None,
+        **kwargs,
+    ) -> None:
+        """Saves a dataframe to the formatted h5 file.
+
+        Args:
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            append (bool, optional): Append to an existing table format key.
+                Defaults to False.
+            complevel (int, optional): compression level of a new key.
+                Defaults to None, the session complevel.
+            complib (str, optional): compression library of a new key.
+                Defaults to None, the session complib.
+            shuffle (bool, optional): byte shuffle setting of a new key.
+                Defaults to None, the session shuffle setting.
+            **kwargs
+                These parameters will be passed to pandas.HDFStore.put or
+                pandas.HDFStore.append, e.g format='table'
+        """
+        filters = self._create_filters(
+            self.complevel if complevel is None else complevel,
+            complib or self.complib,
+            self.shuffle if shuffle is None else shuffle,
+        )
+        with self._lock, warnings.catch_warnings():
+            # Rollup keys are not valid python identifiers
+            warnings.simplefilter("ignore", tables.NaturalNameWarning)
+            # pandas only sets the compression of fixed format keys from the
+            # store, so the store filters are replaced for this save
+            store_filters = self._store._filters
+            self._store._filters = filters
+            try:
+                if append:
+                    kwargs.pop("format", None)
+                    self._store.append(key, df, **kwargs)
+                else:
+                    self._store.put(key, df, **kwargs)
+            finally:
+                self._store._filters = store_filters
+            self._remove_parquet_copy(key)
+            self._keys.add(key.strip("/").split("/")[0])
+
+    def put_wide(
+        self,
+        df: pd.DataFrame,
+        key: str,
+        complevel: int = None,
+        complib: str = None,
+        shuffle: bool = None,
+    ) -> bool:
+        """Saves a formatted property in the wide matrix layout.
+
+        The property is saved as a group containing the matrix (values),
+        the object attribute table (objects) and the time axis as attributes
+        of the group, see WideProperty. The time axis is saved as its start
+        and frequency in int64 nanoseconds, along with the resolution of the
+        timestamps on versions of pandas which support other resolutions.
+
+        Args:
+            df (pd.DataFrame): Formatted property in the long layout.
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            complevel (int, optional): compression level.
+                Defaults to None, the session complevel.
+            complib (str, optional): compression library.
+                Defaults to None, the session complib.
+            shuffle (bool, optional): byte shuffle setting.
+                Defaults to None, the session shuffle setting.
+
+        Returns:
+            bool: True if saved, False if the property cannot be saved in the
+            wide layout, e.g it has no timestamp or the timestamps are not a fixed
+            frequency.
+        """
+        wide = WideProperty.from_long(df)
+        if wide is None:
+            return False
+        key = key.strip("/")
+        filters = self._create_filters(
+            self.complevel if complevel is None else complevel,
+            complib or self.complib,
+            self.shuffle if shuffle is None else shuffle,
+        )
+        with self._lock, warnings.catch_warnings():
+            warnings.simplefilter("ignore", tables.NaturalNameWarning)
+            if "/" + key in self.handle:
+                self.handle.remove_node("/" + key, recursive=True)
+            group = self.handle.create_group("/", key)
+            self.handle.create_carray(
+                group, "values", obj=wide.values, filters=filters
+            )
+            store_filters = self._store._filters
+            self._store._filters = filters
+            try:
+                self._store.put(f"{key}/objects", wide.objects)
+            finally:
+                self._store._filters = store_filters
+            attrs = group._v_attrs
+            attrs.marmot_layout = "wide"
+            attrs.start = int(wide.timestamps[0].value)
+            attrs.freq = (
+                int((wide.timestamps[1] - wide.timestamps[0]).value)
+                if len(wide.timestamps) > 1
+                else 0
+            )
+            attrs.periods = len(wide.timestamps)
+            attrs.unit = getattr(wide.timestamps, "unit", "ns")
+            attrs.index_names = wide.index_names
+            attrs.column = wide.column
+            attrs.dtype = wide.dtype
+            self._remove_parquet_copy(key)
+            self._keys.add(key)
+        return True
+
+    def is_wide(self, key: str) -> bool:
+        """Checks if a key is saved in the wide matrix layout.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            bool: True if the key is saved in the wide layout
+        """
+        with self._lock:
+            path = "/" + key.strip("/")
+            if path not in self.handle:
+                return False
+            node = self.handle.get_node(path)
+            return getattr(node._v_attrs, "marmot_layout", None) == "wide"
+
+    def get_wide(self, key: str) -> WideProperty:
+        """Reads a key saved in the wide matrix layout.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            WideProperty: Saved matrix, objects and time axis
+        """
+        key = key.strip("/")
+        with self._lock:
+            group = self.handle.get_node("/" + key)
+            attrs = group._v_attrs
+            timestamps = pd.DatetimeIndex(
+                (
+                    int(attrs.start)
+                    + np.arange(int(attrs.periods), dtype=np.int64) * int(attrs.freq)
+                ).astype("datetime64[ns]"),
+                name="timestamp",
+            )
+            # pandas >= 2.0 timestamps can have a resolution other than ns
+            if "unit" in attrs and hasattr(timestamps, "as_unit"):
+                timestamps = timestamps.as_unit(str(attrs.unit))
+            return WideProperty(
+                values=group.values.read(),
+                objects=self._store.get(f"{key}/objects"),
+                timestamps=timestamps,
+                index_names=list(attrs.index_names),
+                column=attrs.column,
+                dtype=str(attrs.dtype),
+            )
+
+    def get(self, key: str) -> pd.DataFrame:
+        """Reads a key from the formatted h5 file.
+
+        Keys saved in the wide matrix layout are returned in the long layout.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            pd.DataFrame: Saved data
+        """
+        with self._lock:
+            if self.is_wide(key):
+                return self.get_wide(key).to_long()
+            return self._store.get(key)
+
+    def remove(self, key: str) -> None:
+        """Removes a key from the formatted h5 file, if it exists.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+        """
+        key = key.strip("/")
+        with self._lock:
+            if "/" + key in self.handle:
+                self.handle.remove_node("/" + key, recursive=True)
+            self._remove_parquet_copy(key)
+            self._keys.discard(key)
+
+    def _remove_parquet_copy(self, key: str) -> None:
+        """Removes any copy of a key saved by the parquet storage backend.
+
+        Properties are read from the parquet dataset in preference to the
+        formatted h5 file, so a copy left from a run with the parquet backend
+        would be read in place of the data saved by this session.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+        """
+        key_folder = self._parquet_folder.joinpath(key.strip("/"))
+        if key_folder.is_dir():
+            shutil.rmtree(key_folder, ignore_errors=True)
+
+    def has_node(self, path: str) -> bool:
+        """Checks if a group or dataset exists, e.g metadata/<partition>.
+
+        Args:
+            path (str): Path of node
+
+        Returns:
+            bool: True if the node exists
+        """
+        with self._lock:
+            return "/" + path.strip("/") in self.handle
+
+    def is_table(self, key: str) -> bool:
+        """Checks if a key is saved in table format, and can be appended to.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            bool: True if the key is a table
+        """
+        with self._lock:
+            if self.is_wide(key):
+                return False
+            return self._store.get_storer(key).is_table
+
+    def select_column(self, key: str, column: str) -> pd.Series:
+        """Reads a single column or index level of a table format key.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            column (str): Name of column or index level, e.g timestamp
+
+        Returns:
+            pd.Series: Column values
+        """
+        with self._lock:
+            return self._store.select_column(key, column)
+
+    def put_metadata_group(
+        self, path: str, datasets: dict, deduplicate: bool = True
+    ) -> None:
+        """Saves a group of raw arrays, such as h5plexos metadata tables.
+
+        Structured arrays are saved as tables, all other arrays as plain arrays.
+        If deduplicate is True and a group with identical contents has already
+        been saved to the file, by this or an earlier session, a soft link to
+        that group is created instead. Links are resolved by HDF5 when read, so
+        linked groups can be read the same as any other group. The content hash
+        of each saved group is kept as an attribute of the group.
+
+        Args:
+            path (str): Group path, e.g metadata/<partition>/objects.
+                Parent groups are created if they do not exist.
+            datasets (dict): Dictionary of dataset name to np.ndarray
+            deduplicate (bool, optional): Link to identical groups instead of
+                saving a copy.
+                Defaults to True.
+        """
+        path_parts = path.strip("/").split("/")
+        parent_path = "/" + "/".join(path_parts[:-1])
+        digest = _metadata_digest(datasets) if deduplicate else None
+        with self._lock, warnings.catch_warnings():
+            # Partition names are not valid python identifiers
+            warnings.simplefilter("ignore", tables.NaturalNameWarning)
+            if self._metadata_groups is None:
+                self._metadata_groups = self._read_metadata_digests()
+            if digest in self._metadata_groups:
+                if parent_path != "/" and parent_path not in self.handle:
+                    self.handle.create_group(
+                        "/" + "/".join(path_parts[:-2]),
+                        path_parts[-2],
+                        createparents=True,
+                    )
+                self.handle.create_soft_link(
+                    parent_path, path_parts[-1], self._metadata_groups[digest]
+                )
+            else:
+                group = self.handle.create_group(
+                    parent_path, path_parts[-1], createparents=True
+                )
+                for name, data in datasets.items():
+                    data = np.asarray(data)
+                    if data.dtype.names:
+                        self.handle.create_table(
+                            group, name, obj=_fixed_width_strings(data)
+                        )
+                    else:
+                        self.handle.create_array(group, name, obj=data)
+                if digest is not None:
+                    group._v_attrs.marmot_digest = digest
+                    self._metadata_groups[digest] = group._v_pathname
+            self._keys.add(path_parts[0])
+
+    def _read_metadata_digests(self) -> Dict[str, str]:
+        """Reads the content hash of each metadata group already in the file.
+
+        Returns:
+            Dict[str, str]: {digest: group path}
+        """
+        metadata_groups = {}
+        if "/metadata" not in self.handle:
+            return metadata_groups
+        # Soft links are not groups, so only saved copies are found
+        for group in self.handle.walk_groups("/metadata"):
+            if "marmot_digest" in group._v_attrs:
+                metadata_groups.setdefault(
+                    str(group._v_attrs.marmot_digest), group._v_pathname
+                )
+        return metadata_groups
+
+    def flush(self) -> None:
+        """Flushes written data to disk."""
+        with self._lock:
+            if self._store.is_open:
+                self._store.flush()
+
+    def close(self) -> None:
+        """Closes the h5 file."""
+        with self._lock:
+            if self._store.is_open:
+                self._store.close()
+
+
+class FormattedH5Writer:
+    """Dedicated writer thread which owns all saves to the formatted h5 file.
+
+    Dataframes are added to a queue with the write method and saved in the
+    order they were received by a background thread. This allows the formatter
+    to continue processing the next property while the previous one is being
+    saved. If a save fails, no further data is saved and the error is raised
+    by every later call to write, flush or close.
+
+    FormattedH5Writer should be used as a context manager, on exit all queued
+    data is saved before returning. If the context exits with an error,
+    queued data is discarded instead of saved.
+    """
+
+    def __init__(
+        self,
+        save_function: Callable,
+        file_name: Path,
+        max_queue_size: int = 2,
+    ):
+        """
+        Args:
+            save_function (Callable): Function used to save data,
+                must accept arguments (df, file_name, key=key),
+                e.g MarmotFormat.save_to_h5
+            file_name (Path): name of hdf5 file
+            max_queue_size (int, optional): Max number of dataframes waiting
+                to be saved. Once reached, the write method will block until a
+                save completes. Limits the memory held by the queue.
+                Defaults to 2.
+        """
+        self.save_function = save_function
+        self.file_name = file_name
+        self.saved_keys: list = []
+        """List of keys saved by the writer"""
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._error = None
+        self._discard = False
+        self._thread = threading.Thread(
+            target=self._run, name="FormattedH5Writer", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is not None:
+            # The error being handled is raised, not any writer error
+            self._discard = True
+            self._stop()
+            return
+        self.close()
+
+    def write(self, df: pd.DataFrame, key: str, **kwargs) -> None:
+        """Add data to the queue to be saved.
+
+        Args:
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            **kwargs
+                These parameters will be passed to the save_function,
+                e.g format='table', append=True
+        """
+        self._raise_error()
+        self._queue.put((df, key, kwargs))
+
+    def flush(self) -> None:
+        """Waits until all queued data has been saved."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Saves any queued data and stops the writer thread."""
+        self._stop()
+        self._raise_error()
+
+    def _stop(self) -> None:
+        """Stops the writer thread once the queue is empty."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _raise_error(self) -> None:
+        """Raises any error encountered by the writer thread.
+
+        The error is kept, so it is raised again by any later call.
+        """
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        """Writer thread loop, saves data until None is received."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            df, key, kwargs = item
+            try:
+                # Skip saving once a save has failed or the context has
+                # exited with an error
+                if self._error is None and not self._discard:
+                    self._save(df, key, **kwargs)
+            except Exception as e:
+                self._error = e
+            finally:
+                del df, item
+                self._queue.task_done()
+
+    def _save(self, df: pd.DataFrame, key: str, **kwargs) -> None:
+        """Saves data and records the saved key.
+
+        Args:
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            **kwargs
+                These parameters will be passed to the save_function.
+        """
+        self.save_function(df, self.file_name, key=key, **kwargs)
+        if key not in self.saved_keys:
+            self.saved_keys.append(key)
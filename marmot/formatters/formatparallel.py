@@ -0,0 +1,229 @@
+"""Run model specific Process class methods in a pool of worker processes.
+
+Each worker process creates its own instance of the Process class at startup,
+this ensures open simulation model files are never shared between processes.
+Only the arguments required to create the class and the processed dataframes
+are passed between the main process and the workers.
+"""
+
+import os
+import logging
+import concurrent.futures
+from collections import deque
+from itertools import repeat
+from pathlib import Path
+from typing import Iterator, List
+
+import pandas as pd
+
+from marmot.formatters.formatbase import Process
+
+logger = logging.getLogger("formatter." + __name__)
+
+# Process class instance owned by each worker process,
+# set by _init_worker when the worker is started
+_worker_process: Process = None
+
+
+def _init_worker(
+    process_class: type,
+    input_folder: Path,
+    output_file_path: Path,
+    process_kwargs: dict,
+) -> None:
+    """Creates the Process class instance used by a worker process.
+
+    Args:
+        process_class (type): Model specific Process class, e.g ProcessPLEXOS
+        input_folder (Path): Folder containing model input files.
+        output_file_path (Path): Path to formatted h5 output file.
+        process_kwargs (dict): Keyword arguments passed to the Process class.
+    """
+    global _worker_process
+    _worker_process = process_class(input_folder, output_file_path, **process_kwargs)
+
+
+def _get_processed_data(
+    prop_class: str, prop: str, timescale: str, model_filename: str
+) -> pd.DataFrame:
+    """Calls get_processed_data on the worker process instance.
+
+    Args:
+        prop_class (str): class e.g Region, Generator, Zone etc
+        prop (str): Property e.g gen_out, cap_out etc.
+        timescale (str): Data timescale, e.g interval, summary.
+        model_filename (str): name of model to process.
+
+    Returns:
+        pd.DataFrame: Formatted results dataframe.
+    """
+    return _worker_process.get_processed_data(
+        prop_class, prop, timescale, model_filename
+    )
+
+
+def _get_property_data(
+    prop_class: str, prop: str, timescale: str, files_list: List[str]
+) -> pd.DataFrame:
+    """Processes all partitions of a property on the worker process instance.
+
+    Args:
+        prop_class (str): class e.g Region, Generator, Zone etc
+        prop (str): Property e.g gen_out, cap_out etc.
+        timescale (str): Data timescale, e.g interval, summary.
+        files_list (List[str]): list of model input filenames to process.
+
+    Returns:
+        pd.DataFrame: Combined dataframe of all partitions.
+    """
+    data_chunks = _worker_process.get_partition_data(
+        prop_class, prop, timescale, files_list
+    )
+    return _worker_process.combine_models(data_chunks)
+
+
+class PartitionPool:
+    """Process the temporal partitions of a property in parallel.
+
+    Partitions are independent of each other, so each partition is
+    sent to a separate worker and the processed dataframes are returned to
+    the main process in partition order, ready to be passed to
+    Process.combine_models.
+
+    PartitionPool should be used as a context manager so the workers are shut
+    down once formatting is complete.
+    """
+
+    def __init__(
+        self,
+        process_class: type,
+        input_folder: Path,
+        output_file_path: Path,
+        process_kwargs: dict = None,
+        max_workers: int = None,
+    ):
+        """
+        Args:
+            process_class (type): Model specific Process class, e.g ProcessPLEXOS
+            input_folder (Path): Folder containing model input files.
+            output_file_path (Path): Path to formatted h5 output file.
+            process_kwargs (dict, optional): Keyword arguments passed to the
+                Process class in each worker.
+                Defaults to None.
+            max_workers (int, optional): Number of worker processes.
+                Defaults to None, which uses the number of processors on the machine.
+        """
+        if process_kwargs is None:
+            process_kwargs = {}
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(process_class, input_folder, output_file_path, process_kwargs),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Shuts down the worker processes."""
+        self.executor.shutdown(wait=True)
+
+    def get_processed_data(
+        self, prop_class: str, prop: str, timescale: str, files_list: List[str]
+    ) -> List[pd.DataFrame]:
+        """Process a property for every partition in files_list.
+
+        Args:
+            prop_class (str): class e.g Region, Generator, Zone etc
+            prop (str): Property e.g gen_out, cap_out etc.
+            timescale (str): Data timescale, e.g interval, summary.
+            files_list (List[str]): list of model input filenames to process.
+
+        Returns:
+            List[pd.DataFrame]: Processed dataframes in the same order as files_list.
+        """
+        logger.info(
+            f"      Processing {len(files_list)} partitions "
+            f"with {self.max_workers} workers"
+        )
+        return list(
+            self.executor.map(
+                _get_processed_data,
+                repeat(prop_class),
+                repeat(prop),
+                repeat(timescale),
+                files_list,
+            )
+        )
+
+    def iter_processed_data(
+        self, prop_class: str, prop: str, timescale: str, files_list: List[str]
+    ) -> Iterator[pd.DataFrame]:
+        """Process a property for every partition in files_list, yielding each result.
+
+        Unlike get_processed_data, only max_workers partitions are processed
+        ahead of the partition being yielded, which limits the number of
+        processed partitions held in memory at once.
+
+        Args:
+            prop_class (str): class e.g Region, Generator, Zone etc
+            prop (str): Property e.g gen_out, cap_out etc.
+            timescale (str): Data timescale, e.g interval, summary.
+            files_list (List[str]): list of model input filenames to process.
+
+        Yields:
+            Iterator[pd.DataFrame]: Processed dataframes in the same order as
+            files_list.
+        """
+        window = deque()
+        files = iter(files_list)
+        try:
+            for model_filename in files:
+                window.append(
+                    self.executor.submit(
+                        _get_processed_data, prop_class, prop, timescale, model_filename
+                    )
+                )
+                if len(window) >= self.max_workers:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            # Cancel any outstanding partitions if iteration is stopped early
+            for future in window:
+                future.cancel()
+
+
+class PropertyPool(PartitionPool):
+    """Process several properties at once in worker processes.
+
+    Each property is processed by a single worker, which processes all
+    partitions of the property and combines them with Process.combine_models.
+    The combined dataframe is returned to the main process, which is the only
+    process that saves data to the formatted h5 file.
+    """
+
+    def submit_property(
+        self, prop_class: str, prop: str, timescale: str, files_list: List[str]
+    ) -> concurrent.futures.Future:
+        """Submit a property to be processed by the next available worker.
+
+        Args:
+            prop_class (str): class e.g Region, Generator, Zone etc
+            prop (str): Property e.g gen_out, cap_out etc.
+            timescale (str): Data timescale, e.g interval, summary.
+            files_list (List[str]): list of model input filenames to process.
+
+        Returns:
+            concurrent.futures.Future: Future which returns the combined
+            dataframe of all partitions.
+        """
+        return self.executor.submit(
+            _get_property_data, prop_class, prop, timescale, files_list
+        )
@@ -6,14 +6,21 @@ Inherits the Process class.
 """
 
 import re
+import numpy as np
 import pandas as pd
 import h5py
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
 
+import marmot.utils.mconfig as mconfig
 from marmot.metamanagers.read_metadata import MetaData
-from marmot.formatters.formatbase import Process
+from marmot.formatters.formatbase import Process, available_memory
 from marmot.formatters.formatextra import ExtraProperties
+from marmot.formatters.formatoutput import FormattedH5Session
+from marmot.formatters.formatcache import cache_processed_data
 
 try:
     # Import as Submodule
@@ -22,6 +29,7 @@ except ModuleNotFoundError:
     from h5plexos.query import PLEXOSSolution
 
 logger = logging.getLogger("formatter." + __name__)
+formatter_settings = mconfig.parser("formatter_settings")
 
 
 class ProcessPLEXOS(Process):
@@ -70,6 +78,26 @@ class ProcessPLEXOS(Process):
         "zone_Demand": [("zone_Demand_Annual", ExtraProperties.annualize_property)],
     }
     """Dictionary of Extra custom properties that are created based off existing properties."""
+    # Other formatted properties read by extra properties
+    EXTRA_PROPERTY_INPUTS: dict = {
+        "generator_Curtailment": ["generator_Available_Capacity"],
+        "region_Demand": ["generator_Pump_Load"],
+        "zone_Demand": ["generator_Pump_Load"],
+    }
+    """Dictionary of formatted properties used as additional inputs to extra properties."""
+    # Object classes which can be read directly from the h5plexos data arrays.
+    # The values are the metadata columns objects are sorted by and the
+    # index level created from each metadata column.
+    DIRECT_READ_CLASSES: dict = {
+        "generator": (["category", "name"], {"category": "tech", "name": "gen_name"}),
+        "region": (["category", "name"], {"name": "region"}),
+        "node": (["name"], {"name": "node"}),
+    }
+    """Object classes read directly from h5plexos data with read_property_values"""
+    # Approximate memory used to format and save each value of a property,
+    # including the value, index codes and the table format string columns
+    FORMATTED_VALUE_BYTES: int = 256
+    """Approximate bytes of memory used to format each value of a property"""
 
     def __init__(
         self,
@@ -100,7 +128,25 @@ class ProcessPLEXOS(Process):
         self.metadata = MetaData(
             self.input_folder, read_from_formatted_h5=False, Region_Mapping=Region_Mapping
         )
+        # Aggregation code tables of each partition,
+        # keyed by (model_filename, object class)
+        self._aggregation_codes: dict = {}
+        # Block to timestamp expansion of each partition, keyed by model_filename
+        self._block_expansions: dict = {}
+        # Decoded timestamps of each partition, keyed by (model_filename, timescale)
+        self._timestamps: dict = {}
+        # Regions already reported missing from the Region_Mapping
+        self._missing_regions: set = set()
     
+    @property
+    def processed_data_cache_key(self) -> tuple:
+        """Identifies the results of this instance in the processed_data_cache.
+
+        Returns:
+            tuple: cache key prefix
+        """
+        return super().processed_data_cache_key + (self.plexos_block,)
+
     @property
     def get_input_files(self) -> list:
         """Gets a list of h5plexos input files within the scenario folders
@@ -119,74 +165,93 @@ class ProcessPLEXOS(Process):
         return self._get_input_files
 
     @property
-    def file_collection(self) -> dict:
-        """Dictionary input file names to h5 PLEXOSSolution
+    def file_collection(self) -> "SolutionFilePool":
+        """Pool of open h5 PLEXOSSolution files, keyed by input file name.
+
+        Files are only opened when they are first used, at most the
+        formatter_settings 'max_open_solution_files' are open at once.
 
         Returns:
-            dict: file_collection {filename: PLEXOSSolution}
+            SolutionFilePool: file_collection {filename: PLEXOSSolution}
         """
         if self._file_collection == None:
-            # Read in all HDF5 files into dictionary
-            logger.info("Loading all HDF5 files to prepare for processing")
-            regions = set()
-
-            self._file_collection = {}
-            for file in self.get_input_files:
-                self._file_collection[file] = PLEXOSSolution(
-                    self.input_folder.joinpath(file)
-                )
-                if not self.Region_Mapping.empty:
-                    regions.update(list(self.metadata.regions(file)["region"]))
-
-            if not self.Region_Mapping.empty:
-                if regions.issubset(self.Region_Mapping["region"]) is False:
-                    missing_regions = list(regions - set(self.Region_Mapping["region"]))
-                    logger.warning(
-                        "The Following PLEXOS REGIONS are missing from "
-                        "the 'region' column of your mapping file: "
-                        f"{missing_regions}\n"
-                    )
+            self._file_collection = SolutionFilePool(
+                self.input_folder,
+                self.get_input_files,
+                max_open=formatter_settings["max_open_solution_files"],
+                on_open=self.check_region_mapping,
+            )
         return self._file_collection
 
-    def output_metadata(self, files_list: list) -> None:
+    def refresh_input_files(self, input_files: list = None) -> None:
+        """Resets the input files, so files added since get_input_files was
+        first called are found. Any open PLEXOSSolution files are closed.
+
+        Args:
+            input_files (list, optional): Input filenames to use, in alpha numeric
+                order, instead of all files in the input folder.
+                Defaults to None, the input folder is read again.
+        """
+        if getattr(self, "_file_collection", None) is not None:
+            self._file_collection.close()
+        super().refresh_input_files(input_files)
+
+    def check_region_mapping(self, model_filename: str) -> None:
+        """Warns if the regions of a partition are missing from the Region_Mapping.
+
+        Each missing region is only reported once.
+
+        Args:
+            model_filename (str): name of h5plexos h5 file being processed
+        """
+        if self.Region_Mapping.empty:
+            return
+        regions = self.metadata.regions(model_filename)
+        if regions.empty:
+            return
+        missing_regions = (
+            set(regions["region"])
+            - set(self.Region_Mapping["region"])
+            - self._missing_regions
+        )
+        if missing_regions:
+            self._missing_regions.update(missing_regions)
+            logger.warning(
+                "The Following PLEXOS REGIONS are missing from "
+                "the 'region' column of your mapping file: "
+                f"{sorted(missing_regions)}\n"
+            )
+
+    def output_metadata(
+        self, files_list: list, output_session: FormattedH5Session = None
+    ) -> None:
         """Transfers metadata from original PLEXOS solutions file to processed HDF5 file.
 
         For each partition in a given scenario, the metadata from that partition
-        is copied over and saved in the processed output file.
+        is copied over and saved in the processed output file. Metadata groups
+        which are identical to those of a previous partition are saved as
+        soft links to the first copy.
 
         Args:
             files_list (list): List of all h5 files in hdf5 folder in alpha numeric order
+            output_session (FormattedH5Session, optional): Open session of the
+                formatted h5 file to save metadata to.
+                Defaults to None, which opens the output_file_path.
         """
-        for partition in files_list:
-            f = h5py.File(self.input_folder.joinpath(partition), "r")
-            meta_keys = [key for key in f["metadata"].keys()]
-
-            group_dict = {}
-            for key in meta_keys:
-                sub_dict = {}
-                subkeys = [key for key in f["metadata"][key].keys()]
-                for sub in subkeys:
-                    dset = f["metadata"][key][sub]
-                    sub_dict[sub] = dset
-                group_dict[key] = sub_dict
-
-            with h5py.File(self.output_file_path, "a") as g:
-                # check if metadata group already exists
-                existing_groups = [key for key in g.keys()]
-                if "metadata" not in existing_groups:
-                    grp = g.create_group("metadata")
-                else:
-                    grp = g["metadata"]
+        if output_session is None:
+            with FormattedH5Session(self.output_file_path) as output_session:
+                self.output_metadata(files_list, output_session)
+            return
 
-                partition_group = grp.create_group(partition)
-                for key in list(group_dict.keys()):
-                    subgrp = partition_group.create_group(key)
-                    s_dict = group_dict[key]
-                    for key2 in list(s_dict.keys()):
-                        dset = s_dict[key2]
-                        subgrp.create_dataset(name=key2, data=dset)
-            f.close()
+        for partition in files_list:
+            with h5py.File(self.input_folder.joinpath(partition), "r") as f:
+                for key, group in f["metadata"].items():
+                    output_session.put_metadata_group(
+                        f"metadata/{partition}/{key}",
+                        {sub: dset[()] for sub, dset in group.items()},
+                    )
 
+    @cache_processed_data
     def get_processed_data(
         self, prop_class: str, prop: str, timescale: str, model_filename: str
     ) -> pd.DataFrame:
@@ -204,62 +269,54 @@ class ProcessPLEXOS(Process):
         """
         db = self.file_collection.get(model_filename)
         logger.info(f"      {model_filename}")
-        try:
-            if "_" in prop_class:
-                df = db.query_relation_property(
-                    prop_class,
-                    prop,
-                    timescale=timescale,
-                    phase=self.plexos_block,
-                )
-                object_class = prop_class
-            else:
-                df = db.query_object_property(
-                    prop_class,
-                    prop,
-                    timescale=timescale,
-                    phase=self.plexos_block,
+        object_class = self.h5_object_class(db, prop_class)
+
+        property_values = None
+        if self.direct_read_enabled(prop_class):
+            try:
+                property_values = self.read_property_values(
+                    db, object_class, prop, timescale, model_filename
                 )
-                if (0, 6, 0) <= db.version and db.version < (0, 7, 0):
-                    object_class = f"{prop_class}s"
+            except KeyError:
+                df = self.report_prop_error(prop, prop_class)
+                return df
+
+        if property_values is None:
+            try:
+                if "_" in prop_class:
+                    df = db.query_relation_property(
+                        prop_class,
+                        prop,
+                        timescale=timescale,
+                        phase=self.plexos_block,
+                    )
                 else:
-                    object_class = prop_class
+                    df = db.query_object_property(
+                        prop_class,
+                        prop,
+                        timescale=timescale,
+                        phase=self.plexos_block,
+                    )
+            except (ValueError, KeyError):
+                df = self.report_prop_error(prop, prop_class)
+                return df
 
-        except (ValueError, KeyError):
-            df = self.report_prop_error(prop, prop_class)
-            return df
+            if self.plexos_block != "ST" and timescale == "interval":
+                df = self.merge_timeseries_block_data(db, df, model_filename)
 
-        if self.plexos_block != "ST" and timescale == "interval":
-            df = self.merge_timeseries_block_data(db, df)
+        converted_units = self.property_units(db, object_class, prop, timescale)
 
-        # handles h5plexos naming discrepency
-        if (0, 6, 0) <= db.version and db.version < (0, 7, 0):
-            # Get original units from h5plexos file
-            df_units = (
-                db.h5file[
-                    f"/data/{self.plexos_block}/{timescale}"
-                    f"/{object_class}/{prop}"
-                ]
-                .attrs["units"]
-                .decode("UTF-8")
+        if property_values is not None:
+            df = self.format_property_values(
+                prop_class, *property_values, model_filename
             )
         else:
-            df_units = db.h5file[
-                f"/data/{self.plexos_block}/{timescale}"
-                f"/{object_class}/{prop}"
-            ].attrs["unit"]
-        # find unit conversion values
-        converted_units = self.UNITS_CONVERSION.get(df_units, (df_units, 1))
+            # Get desired method
+            process_att = getattr(self, f"df_process_{prop_class}")
+            # Process attribute and return to df
+            df = process_att(df, model_filename)
 
-        # Get desired method
-        process_att = getattr(self, f"df_process_{prop_class}")
-        # Process attribute and return to df
-        df = process_att(df, model_filename)
-
-        # Convert units and add unit column to index
-        df = df * converted_units[1]
-        units_index = pd.Index([converted_units[0]] * len(df), name="units")
-        df.set_index(units_index, append=True, inplace=True)
+        df = self.convert_units(df, converted_units)
 
         if (
             prop_class == "region"
@@ -271,114 +328,552 @@ class ProcessPLEXOS(Process):
             )
         return df
 
-    def merge_timeseries_block_data(
-        self, db: PLEXOSSolution, df: pd.DataFrame
-    ) -> pd.DataFrame:
-        """Merge chronological time intervals and block data found in LT, MT and PASA results
+    def h5_object_class(self, db: PLEXOSSolution, prop_class: str) -> str:
+        """Gets the name of a PLEXOS class in a h5plexos file.
 
         Args:
             db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
-            df (pd.DataFrame): h5plexos dataframe
+            prop_class (str): PLEXOS class e.g region, generator, zone etc
 
         Returns:
-            pd.DataFrame: df with merged in timeseries data
+            str: class name used in the h5plexos file, e.g generators
         """
+        # handles h5plexos naming discrepency
+        if "_" not in prop_class and (0, 6, 0) <= db.version and db.version < (0, 7, 0):
+            return f"{prop_class}s"
+        return prop_class
 
-        block_mapping = db.blocks[self.plexos_block]
-        block_mapping.index.rename("timestamp", inplace=True)
-        df = df.reset_index()
+    def property_units(
+        self, db: PLEXOSSolution, object_class: str, prop: str, timescale: str
+    ) -> Tuple[str, float]:
+        """Gets the Marmot units of a property and the multiplier to convert to them.
 
-        merged_data = df.merge(block_mapping.reset_index(), on="block")
-        merged_data.drop("block", axis=1, inplace=True)
-        index_cols = list(merged_data.columns)
-        index_cols.remove(0)
-        merged_data.set_index(index_cols, inplace=True)
-        merged_data = merged_data.sort_index(level=["category", "name"])
-        return merged_data
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            object_class (str): Name of the class in the h5plexos file.
+            prop (str): PLEXOS property e.g Max Capacity, Generation etc.
+            timescale (str): Data timescale, e.g Hourly, Monthly, 5 minute etc.
 
-    def df_process_generator(
-        self, df: pd.DataFrame, model_filename: str
+        Returns:
+            Tuple[str, float]: converted units and conversion multiplier.
+        """
+        dset = db.h5file[f"/data/{self.plexos_block}/{timescale}/{object_class}/{prop}"]
+        # handles h5plexos naming discrepency
+        if (0, 6, 0) <= db.version and db.version < (0, 7, 0):
+            # Get original units from h5plexos file
+            df_units = dset.attrs["units"].decode("UTF-8")
+        else:
+            df_units = dset.attrs["unit"]
+        # find unit conversion values
+        return self.UNITS_CONVERSION.get(df_units, (df_units, 1))
+
+    def convert_units(
+        self, df: pd.DataFrame, converted_units: Tuple[str, float]
     ) -> pd.DataFrame:
-        """Format PLEXOS Generator Class data.
+        """Converts processed data units and adds a units level to the index.
 
         Args:
-            df (pd.DataFrame): h5plexos dataframe to process
-            model_filename (str): name of h5plexos h5 file being processed
+            df (pd.DataFrame): processed data.
+            converted_units (Tuple[str, float]): converted units and conversion
+                multiplier from property_units.
 
         Returns:
-            pd.DataFrame: Processed output, single value column with multiindex.
+            pd.DataFrame: converted data.
         """
-        df = df.droplevel(level=["band", "property"])
-        df.index.rename(["tech", "gen_name"], level=["category", "name"], inplace=True)
+        df = df * converted_units[1]
+        units_index = pd.Index([converted_units[0]] * len(df), name="units")
+        df.set_index(units_index, append=True, inplace=True)
+        return df
 
-        region_gen_cat_meta = self.metadata.region_generator_category(model_filename)
-        zone_gen_cat_meta = self.metadata.zone_generator_category(model_filename)
-        timeseries_len = len(df.index.get_level_values("timestamp").unique())
+    def direct_read_enabled(self, prop_class: str) -> bool:
+        """Checks if a class is read directly from h5plexos data arrays.
 
-        if region_gen_cat_meta.empty is False:
-            region_gen_idx = pd.CategoricalIndex(
-                region_gen_cat_meta.index.get_level_values(0)
-            )
+        Args:
+            prop_class (str): PLEXOS class e.g region, generator, zone etc
+
+        Returns:
+            bool: True if read_property_values is used for the class.
+        """
+        return (
+            formatter_settings["plexos_direct_read"]
+            and self.plexos_block == "ST"
+            and prop_class in self.DIRECT_READ_CLASSES
+        )
+
+    def iter_partition_chunks(
+        self, prop_class: str, prop: str, timescale: str, model_filename: str
+    ) -> Iterator[pd.DataFrame]:
+        """Gets the processed data of a partition in one or more slabs of time.
+
+        Properties which are read directly from the h5plexos data arrays and need
+        more memory to format than the formatter_settings stream_chunk_mb (or a
+        quarter of the available memory if not set) are read in slabs of
+        consecutive timestamps with h5py hyperslab selections. Each slab is
+        formatted on its own, so only one slab of the property is held in memory.
 
-            region_gen_idx = region_gen_idx.repeat(timeseries_len)
+        Args:
+            prop_class (str): PLEXOS class e.g Region, Generator, Zone etc
+            prop (str): PLEXOS property e.g Max Capacity, Generation etc.
+            timescale (str): Data timescale, e.g Hourly, Monthly, 5 minute etc.
+            model_filename (str): name of model to process.
 
-            idx_region = pd.MultiIndex(
-                levels=df.index.levels + [region_gen_idx.categories],
-                codes=df.index.codes + [region_gen_idx.codes],
-                names=df.index.names + region_gen_idx.names,
+        Yields:
+            Iterator[pd.DataFrame]: Formatted results of each slab, in timestamp order.
+        """
+        db = self.file_collection.get(model_filename)
+        object_class = self.h5_object_class(db, prop_class)
+        dataset = None
+        if self.direct_read_enabled(prop_class):
+            try:
+                dataset = self.property_dataset(
+                    db, object_class, prop, timescale, model_filename
+                )
+            except KeyError:
+                pass
+        slab_len = None
+        if dataset is not None:
+            slab_len = self.slab_length(*dataset[0].shape[:2])
+        if slab_len is None:
+            yield self.get_processed_data(prop_class, prop, timescale, model_filename)
+            return
+
+        dset, objects, timestamps = dataset
+        converted_units = self.property_units(db, object_class, prop, timescale)
+        logger.info(f"      {model_filename} in slabs of {slab_len} intervals")
+        for start in range(0, len(timestamps), slab_len):
+            time_slab = slice(start, start + slab_len)
+            df = self.format_property_values(
+                prop_class,
+                dset[:, time_slab, 0],
+                objects,
+                timestamps[time_slab],
+                model_filename,
             )
+            yield self.convert_units(df, converted_units)
+
+    def slab_length(self, n_objects: int, n_timestamps: int) -> int:
+        """Gets the number of timestamps to format at once for a large property.
+
+        Args:
+            n_objects (int): Number of objects of the property.
+            n_timestamps (int): Number of timestamps of the property.
+
+        Returns:
+            int: Number of timestamps in each slab, None if the whole property
+            can be formatted at once.
+        """
+        if formatter_settings["stream_chunk_mb"]:
+            memory = formatter_settings["stream_chunk_mb"] * 1024**2
         else:
-            idx_region = df.index
+            memory = available_memory() // 4
+        slab_len = max(1, int(memory // (n_objects * self.FORMATTED_VALUE_BYTES)))
+        if slab_len >= n_timestamps:
+            return None
+        return slab_len
+
+    def interval_timestamps(
+        self, db: PLEXOSSolution, timescale: str, model_filename: str
+    ) -> pd.DatetimeIndex:
+        """Gets the timestamps of a timescale of a partition.
+
+        Timestamps are decoded once per partition and reused by every
+        property of the timescale.
+
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            timescale (str): Data timescale, e.g Hourly, Monthly, 5 minute etc.
+            model_filename (str): name of h5plexos h5 file being processed
 
-        if zone_gen_cat_meta.empty is False:
-            zone_gen_idx = pd.CategoricalIndex(
-                zone_gen_cat_meta.index.get_level_values(0)
+        Returns:
+            pd.DatetimeIndex: timestamps of the timescale
+        """
+        if (model_filename, timescale) not in self._timestamps:
+            times = db.h5file[f"/metadata/times/{timescale}"][()]
+            self._timestamps[(model_filename, timescale)] = pd.DatetimeIndex(
+                pd.to_datetime(times.astype(str), format="%Y-%m-%dT%H:%M:%S"),
+                name="timestamp",
             )
+        return self._timestamps[(model_filename, timescale)]
+
+    def property_dataset(
+        self,
+        db: PLEXOSSolution,
+        object_class: str,
+        prop: str,
+        timescale: str,
+        model_filename: str,
+    ) -> Tuple[h5py.Dataset, pd.DataFrame, pd.DatetimeIndex]:
+        """Gets the h5plexos dataset of an object property, with the metadata of
+        each row and the timestamp of each column.
+
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            object_class (str): Name of the object class in the h5plexos file,
+                e.g generator or generators.
+            prop (str): PLEXOS property e.g Max Capacity, Generation etc.
+            timescale (str): Data timescale, e.g Hourly, Monthly, 5 minute etc.
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Raises:
+            KeyError: If the property does not exist in the h5plexos file.
+
+        Returns:
+            Tuple[h5py.Dataset, pd.DataFrame, pd.DatetimeIndex]: dataset, the
+            metadata of each object and the timestamps. None if the dataset cannot
+            be read directly, e.g it has more than one band.
+        """
+        dset = db.h5file[f"/data/{self.plexos_block}/{timescale}/{object_class}/{prop}"]
+        objects = self.metadata.objects(model_filename, object_class)
+        if dset.ndim != 3 or dset.shape[0] != len(objects) or dset.shape[2] != 1:
+            return None
+
+        period_offset = int(dset.attrs.get("period_offset", 0))
+        timestamps = self.interval_timestamps(db, timescale, model_filename)[
+            period_offset : period_offset + dset.shape[1]
+        ]
+        if len(timestamps) != dset.shape[1]:
+            return None
+        return dset, objects, timestamps
+
+    def read_property_values(
+        self,
+        db: PLEXOSSolution,
+        object_class: str,
+        prop: str,
+        timescale: str,
+        model_filename: str,
+    ) -> Tuple[np.ndarray, pd.DataFrame, pd.DatetimeIndex]:
+        """Reads the values of an object property directly from the h5plexos file.
+
+        The /data/<block>/<timescale>/<class>/<prop> dataset is read with h5py,
+        no h5plexos query DataFrame is created.
+
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            object_class (str): Name of the object class in the h5plexos file,
+                e.g generator or generators.
+            prop (str): PLEXOS property e.g Max Capacity, Generation etc.
+            timescale (str): Data timescale, e.g Hourly, Monthly, 5 minute etc.
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Raises:
+            KeyError: If the property does not exist in the h5plexos file.
+
+        Returns:
+            Tuple[np.ndarray, pd.DataFrame, pd.DatetimeIndex]: values with a row for
+            each object and a column for each timestamp, the metadata of each object
+            and the timestamps. None if the dataset cannot be read directly,
+            e.g it has more than one band.
+        """
+        dataset = self.property_dataset(
+            db, object_class, prop, timescale, model_filename
+        )
+        if dataset is None:
+            return None
+        dset, objects, timestamps = dataset
+        return dset[:, :, 0], objects, timestamps
+
+    def block_expansion(
+        self, db: PLEXOSSolution, model_filename: str
+    ) -> Tuple[pd.Index, pd.DatetimeIndex, np.ndarray]:
+        """Gets the chronological timestamps of a partition and the block
+        each timestamp belongs to.
+
+        The block mapping is only read once per partition and reused by every
+        LT, MT or PASA property of the partition.
+
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Returns:
+            Tuple[pd.Index, pd.DatetimeIndex, np.ndarray]: sorted block numbers,
+            sorted timestamps and the position in the block numbers of the block
+            of each timestamp.
+        """
+        if model_filename in self._block_expansions:
+            return self._block_expansions[model_filename]
+
+        block_mapping = db.blocks[self.plexos_block]
+        if isinstance(block_mapping, pd.DataFrame):
+            block_mapping = block_mapping["block"]
+        timestamps = pd.DatetimeIndex(block_mapping.index, name="timestamp")
+        order = np.argsort(timestamps.asi8, kind="stable")
+        timestamp_blocks, blocks = pd.factorize(
+            block_mapping.to_numpy()[order], sort=True
+        )
+        expansion = (pd.Index(blocks), timestamps[order], timestamp_blocks)
+        self._block_expansions[model_filename] = expansion
+        return expansion
+
+    def merge_timeseries_block_data(
+        self, db: PLEXOSSolution, df: pd.DataFrame, model_filename: str
+    ) -> pd.DataFrame:
+        """Merge chronological time intervals and block data found in LT, MT and PASA results
 
-            zone_gen_idx = zone_gen_idx.repeat(timeseries_len)
+        Block values are placed in an (object, block) array, where an object is
+        each unique combination of the other index levels. Each row of the array
+        is expanded to every timestamp of the partition with a single gather, and
+        the new index is built from level codes, so the block data does not need
+        to be merged and sorted.
 
-            idx_zone = pd.MultiIndex(
-                levels=idx_region.levels + [zone_gen_idx.categories],
-                codes=idx_region.codes + [zone_gen_idx.codes],
-                names=idx_region.names + zone_gen_idx.names,
+        Args:
+            db (PLEXOSSolution): PLEXOSSolution instance for specific h5plexos file.
+            df (pd.DataFrame): h5plexos dataframe
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Returns:
+            pd.DataFrame: df with merged in timeseries data, sorted by object
+            then timestamp.
+        """
+        blocks, timestamps, timestamp_blocks = self.block_expansion(db, model_filename)
+
+        index = df.index
+        block_level = index.names.index("block")
+        object_levels = [i for i in range(index.nlevels) if i != block_level]
+
+        # Position of the block of each row, -1 if the block has no timestamps
+        level_blocks = blocks.get_indexer(index.levels[block_level])
+        row_codes = index.codes[block_level]
+        row_blocks = np.where(row_codes < 0, -1, level_blocks[row_codes])
+        in_mapping = row_blocks >= 0
+
+        # Codes are shifted by 1 so missing values (-1) can be raveled
+        level_sizes = [len(index.levels[i]) + 1 for i in object_levels]
+        row_objects, object_ids = pd.factorize(
+            np.ravel_multi_index(
+                [index.codes[i][in_mapping] + 1 for i in object_levels], level_sizes
             )
+        )
+        object_codes = np.unravel_index(object_ids, level_sizes)
+
+        # Sort objects by level values, missing values last
+        level_ranks = []
+        for i, codes in zip(object_levels, object_codes):
+            rank = np.empty(len(index.levels[i]) + 1, dtype=np.intp)
+            rank[0] = len(index.levels[i])
+            rank[1 + index.levels[i].argsort()] = np.arange(len(index.levels[i]))
+            level_ranks.append(rank[codes])
+        object_order = np.lexsort(level_ranks[::-1])
+        object_position = np.empty(len(object_order), dtype=np.intp)
+        object_position[object_order] = np.arange(len(object_order))
+        row_objects = object_position[row_objects]
+
+        block_values = np.empty(
+            (len(object_order), len(blocks)), dtype=df.dtypes.iloc[0]
+        )
+        has_value = np.zeros(block_values.shape, dtype=bool)
+        block_values[row_objects, row_blocks[in_mapping]] = df.iloc[:, 0].to_numpy()[
+            in_mapping
+        ]
+        has_value[row_objects, row_blocks[in_mapping]] = True
+
+        # Expand each object to every timestamp of the partition
+        values = block_values[:, timestamp_blocks].reshape(-1)
+        has_value = has_value[:, timestamp_blocks].reshape(-1)
+        timeseries_len = len(timestamps)
+
+        levels = [index.levels[i] for i in object_levels] + [timestamps]
+        codes = [
+            np.repeat(codes[object_order] - 1, timeseries_len)[has_value]
+            for codes in object_codes
+        ]
+        codes.append(np.tile(np.arange(timeseries_len), len(object_order))[has_value])
+        names = [index.names[i] for i in object_levels] + ["timestamp"]
+        merged_index = pd.MultiIndex(
+            levels=levels, codes=codes, names=names, verify_integrity=False
+        )
+        return pd.DataFrame({df.columns[0]: values[has_value]}, index=merged_index)
+
+    def aggregation_code_table(
+        self, object_class: str, model_filename: str
+    ) -> List[Tuple[str, pd.Index, np.ndarray]]:
+        """Gets the region, zone and Region_Mapping aggregations of each object
+        of a class as integer codes.
+
+        Code tables are created once per partition from the metadata and reused
+        by every property of the class, e.g the generator region codes are only
+        found once however many generator properties are formatted.
+
+        Objects are in the same order as the rows of h5plexos data, generators
+        are sorted by tech and gen_name, nodes by node and regions
+        by category and region.
+
+        Args:
+            object_class (str): PLEXOS class, generator, node or region.
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Returns:
+            List[Tuple[str, pd.Index, np.ndarray]]: list of (level name, level values,
+            code of each object). Codes are -1 where an object has no aggregation.
+        """
+        if (model_filename, object_class) in self._aggregation_codes:
+            return self._aggregation_codes[(model_filename, object_class)]
+
+        if object_class == "generator":
+            region_meta = self.metadata.region_generator_category(model_filename)
+            zone_meta = self.metadata.zone_generator_category(model_filename)
+            object_cols = ["tech", "gen_name"]
+        elif object_class == "node":
+            region_meta = self.metadata.node_region(model_filename)
+            zone_meta = self.metadata.node_zone(model_filename)
+            object_cols = ["node"]
         else:
-            idx_zone = idx_region
+            # Regions are only aggregated by the Region_Mapping
+            region_meta = pd.DataFrame()
+            if not self.Region_Mapping.empty:
+                region_meta = self.metadata.regions(model_filename)
+            if region_meta.empty is False:
+                region_meta = region_meta.set_index("region")
+            zone_meta = pd.DataFrame()
+            object_cols = ["category"]
+
+        code_table = []
+        if object_class != "region":
+            for name, meta in (("region", region_meta), ("zone", zone_meta)):
+                if meta.empty is False:
+                    codes, level = pd.factorize(
+                        meta.index.get_level_values(0), sort=True
+                    )
+                    code_table.append((name, pd.Index(level, name=name), codes))
 
-        if not self.Region_Mapping.empty:
-            region_gen_mapping = (
-                region_gen_cat_meta.merge(self.Region_Mapping, how="left", on="region")
-                .sort_values(by=["tech", "gen_name"])
-                .drop(["region", "tech", "gen_name"], axis=1)
+        if not self.Region_Mapping.empty and region_meta.empty is False:
+            region_mapping = region_meta.reset_index().merge(
+                self.Region_Mapping, how="left", on="region"
             )
-            region_gen_mapping.dropna(axis=1, how="all", inplace=True)
+            if object_class == "generator":
+                region_mapping = region_mapping.sort_values(by=object_cols)
+            region_mapping = region_mapping.drop(["region"] + object_cols, axis=1)
+            region_mapping.dropna(axis=1, how="all", inplace=True)
+            for name, values in region_mapping.items():
+                codes, level = pd.factorize(values, sort=True)
+                code_table.append((name, pd.Index(level, name=name), codes))
 
-            if not region_gen_mapping.empty:
-                region_gen_mapping_idx = pd.MultiIndex.from_frame(region_gen_mapping)
-                region_gen_mapping_idx = region_gen_mapping_idx.repeat(timeseries_len)
+        self._aggregation_codes[(model_filename, object_class)] = code_table
+        return code_table
 
-                idx_map = pd.MultiIndex(
-                    levels=idx_zone.levels + region_gen_mapping_idx.levels,
-                    codes=idx_zone.codes + region_gen_mapping_idx.codes,
-                    names=idx_zone.names + region_gen_mapping_idx.names,
-                )
-            else:
-                idx_map = idx_zone
-        else:
-            idx_map = idx_zone
+    def build_aggregation_index(
+        self, df: pd.DataFrame, code_table: List[Tuple[str, pd.Index, np.ndarray]]
+    ) -> pd.DataFrame:
+        """Adds aggregation levels to h5plexos data and moves timestamp to the
+        first level.
 
-        df = pd.DataFrame(data=df.values.reshape(-1), index=idx_map)
-        # Gets names of all columns in df and places in list
-        df_col = list(df.index.names)
-        # move timestamp to start of df
-        df_col.insert(0, df_col.pop(df_col.index("timestamp")))
-        df = df.reorder_levels(df_col, axis=0)
-        df[0] = pd.to_numeric(df[0], downcast="float")
+        Args:
+            df (pd.DataFrame): h5plexos dataframe, rows ordered by object
+                then timestamp.
+            code_table (List[Tuple[str, pd.Index, np.ndarray]]): Aggregation code
+                table from aggregation_code_table.
+
+        Returns:
+            pd.DataFrame: Processed output, single value column with multiindex.
+        """
+        return self.build_index_from_codes(
+            df.values.reshape(-1),
+            list(df.index.levels),
+            list(df.index.codes),
+            list(df.index.names),
+            code_table,
+        )
+
+    def build_index_from_codes(
+        self,
+        values: np.ndarray,
+        levels: list,
+        codes: list,
+        names: list,
+        code_table: List[Tuple[str, pd.Index, np.ndarray]],
+    ) -> pd.DataFrame:
+        """Creates processed output from values and the levels and codes of
+        their index, adding aggregation levels and moving timestamp to the
+        first level.
+
+        The new MultiIndex is assembled directly from the level codes, the
+        object codes of the code_table are repeated for each timestamp of the
+        object, so no merges or index reordering are required.
+
+        Args:
+            values (np.ndarray): 1-D values, ordered by object then timestamp.
+            levels (list): index levels of values, including timestamp.
+            codes (list): codes of each index level.
+            names (list): names of each index level.
+            code_table (List[Tuple[str, pd.Index, np.ndarray]]): Aggregation code
+                table from aggregation_code_table.
 
+        Returns:
+            pd.DataFrame: Processed output, single value column with multiindex.
+        """
+        for name, level, object_codes in code_table:
+            timeseries_len = len(values) // len(object_codes)
+            levels.append(level)
+            codes.append(np.repeat(object_codes, timeseries_len))
+            names.append(name)
+
+        # move timestamp to start of index
+        order = list(range(len(names)))
+        order.insert(0, order.pop(names.index("timestamp")))
+        idx = pd.MultiIndex(
+            levels=[levels[i] for i in order],
+            codes=[codes[i] for i in order],
+            names=[names[i] for i in order],
+        )
+        df = pd.DataFrame(data=values, index=idx)
+        df[0] = pd.to_numeric(df[0], downcast="float")
         return df
 
-    def df_process_region(self, df: pd.DataFrame, model_filename: str) -> pd.DataFrame:
-        """Format PLEXOS Region Class data.
+    def format_property_values(
+        self,
+        prop_class: str,
+        values: np.ndarray,
+        objects: pd.DataFrame,
+        timestamps: pd.DatetimeIndex,
+        model_filename: str,
+    ) -> pd.DataFrame:
+        """Format property values read with read_property_values.
+
+        Objects are sorted in the same order as the rows of the equivalent
+        df_process_<prop_class> method, and the index is built from the codes
+        of each object and timestamp.
+
+        Args:
+            prop_class (str): PLEXOS class, a key of DIRECT_READ_CLASSES.
+            values (np.ndarray): values with a row for each object and a column
+                for each timestamp.
+            objects (pd.DataFrame): metadata of each object.
+            timestamps (pd.DatetimeIndex): timestamp of each column of values.
+            model_filename (str): name of h5plexos h5 file being processed
+
+        Returns:
+            pd.DataFrame: Processed output, single value column with multiindex.
+        """
+        sort_columns, level_names = self.DIRECT_READ_CLASSES[prop_class]
+        object_order = objects.sort_values(sort_columns, kind="stable").index.to_numpy()
+        if not (object_order[1:] > object_order[:-1]).all():
+            values = values[object_order]
+            objects = objects.take(object_order)
+
+        timeseries_len = len(timestamps)
+        levels, codes, names = [], [], []
+        for col, name in level_names.items():
+            object_codes, level = pd.factorize(objects[col], sort=True)
+            levels.append(pd.Index(level, name=name))
+            codes.append(np.repeat(object_codes, timeseries_len))
+            names.append(name)
+        levels.append(timestamps)
+        codes.append(np.tile(np.arange(timeseries_len), len(objects)))
+        names.append("timestamp")
+
+        return self.build_index_from_codes(
+            values.reshape(-1),
+            levels,
+            codes,
+            names,
+            self.aggregation_code_table(prop_class, model_filename),
+        )
+
+    def df_process_generator(
+        self, df: pd.DataFrame, model_filename: str
+    ) -> pd.DataFrame:
+        """Format PLEXOS Generator Class data.
 
         Args:
             df (pd.DataFrame): h5plexos dataframe to process
@@ -387,40 +882,29 @@ class ProcessPLEXOS(Process):
         Returns:
             pd.DataFrame: Processed output, single value column with multiindex.
         """
-        df = df.droplevel(level=["band", "property", "category"])
-        df.index.rename("region", level="name", inplace=True)
+        df = df.droplevel(level=["band", "property"])
+        df.index.rename(["tech", "gen_name"], level=["category", "name"], inplace=True)
 
-        timeseries_len = len(df.index.get_level_values("timestamp").unique())
+        return self.build_aggregation_index(
+            df, self.aggregation_code_table("generator", model_filename)
+        )
 
-        # checks if Region_Mapping contains data to merge, skips if empty
-        if not self.Region_Mapping.empty:
-            region_gen_mapping = (
-                self.metadata.regions(model_filename)
-                .merge(self.Region_Mapping, how="left", on="region")
-                .drop(["region", "category"], axis=1)
-            )
-            region_gen_mapping.dropna(axis=1, how="all", inplace=True)
+    def df_process_region(self, df: pd.DataFrame, model_filename: str) -> pd.DataFrame:
+        """Format PLEXOS Region Class data.
 
-            if not region_gen_mapping.empty:
-                mapping_idx = pd.MultiIndex.from_frame(region_gen_mapping)
-                mapping_idx = mapping_idx.repeat(timeseries_len)
+        Args:
+            df (pd.DataFrame): h5plexos dataframe to process
+            model_filename (str): name of h5plexos h5 file being processed
 
-                idx = pd.MultiIndex(
-                    levels=df.index.levels + mapping_idx.levels,
-                    codes=df.index.codes + mapping_idx.codes,
-                    names=df.index.names + mapping_idx.names,
-                )
-            else:
-                idx = df.index
-        else:
-            idx = df.index
+        Returns:
+            pd.DataFrame: Processed output, single value column with multiindex.
+        """
+        df = df.droplevel(level=["band", "property", "category"])
+        df.index.rename("region", level="name", inplace=True)
 
-        df = pd.DataFrame(data=df.values.reshape(-1), index=idx)
-        df_col = list(df.index.names)
-        df_col.insert(0, df_col.pop(df_col.index("timestamp")))
-        df = df.reorder_levels(df_col, axis=0)
-        df[0] = pd.to_numeric(df[0], downcast="float")
-        return df
+        return self.build_aggregation_index(
+            df, self.aggregation_code_table("region", model_filename)
+        )
 
     def df_process_zone(self, df: pd.DataFrame, model_filename: str) -> pd.DataFrame:
         """Format PLEXOS Zone Class data.
@@ -794,66 +1278,9 @@ class ProcessPLEXOS(Process):
         df.index.rename("node", level="name", inplace=True)
         df.sort_index(level=["node"], inplace=True)
 
-        node_region_meta = self.metadata.node_region(model_filename)
-        node_zone_meta = self.metadata.node_zone(model_filename)
-        timeseries_len = len(df.index.get_level_values("timestamp").unique())
-
-        if node_region_meta.empty is False:
-            node_region_idx = pd.CategoricalIndex(
-                node_region_meta.index.get_level_values(0)
-            )
-
-            node_region_idx = node_region_idx.repeat(timeseries_len)
-
-            idx_region = pd.MultiIndex(
-                levels=df.index.levels + [node_region_idx.categories],
-                codes=df.index.codes + [node_region_idx.codes],
-                names=df.index.names + node_region_idx.names,
-            )
-        else:
-            idx_region = df.index
-
-        if node_zone_meta.empty is False:
-            node_zone_idx = pd.CategoricalIndex(
-                node_zone_meta.index.get_level_values(0)
-            )
-
-            node_zone_idx = node_zone_idx.repeat(timeseries_len)
-
-            idx_zone = pd.MultiIndex(
-                levels=idx_region.levels + [node_zone_idx.categories],
-                codes=idx_region.codes + [node_zone_idx.codes],
-                names=idx_region.names + node_zone_idx.names,
-            )
-        else:
-            idx_zone = idx_region
-
-        if not self.Region_Mapping.empty:
-            region_mapping = node_region_meta.merge(
-                self.Region_Mapping, how="left", on="region"
-            ).drop(["region", "node"], axis=1)
-            region_mapping.dropna(axis=1, how="all", inplace=True)
-
-            if not region_mapping.empty:
-                region_mapping_idx = pd.MultiIndex.from_frame(region_mapping)
-                region_mapping_idx = region_mapping_idx.repeat(timeseries_len)
-
-                idx_map = pd.MultiIndex(
-                    levels=idx_zone.levels + region_mapping_idx.levels,
-                    codes=idx_zone.codes + region_mapping_idx.codes,
-                    names=idx_zone.names + region_mapping_idx.names,
-                )
-            else:
-                idx_map = idx_zone
-        else:
-            idx_map = idx_zone
-
-        df = pd.DataFrame(data=df.values.reshape(-1), index=idx_map)
-        df_col = list(df.index.names)
-        df_col.insert(0, df_col.pop(df_col.index("timestamp")))
-        df = df.reorder_levels(df_col, axis=0)
-        df[0] = pd.to_numeric(df[0], downcast="float")
-        return df
+        return self.build_aggregation_index(
+            df, self.aggregation_code_table("node", model_filename)
+        )
 
     def df_process_abatement(
         self, df: pd.DataFrame, model_filename: str
@@ -900,3 +1327,109 @@ class ProcessPLEXOS(Process):
         df = df.reorder_levels(df_col, axis=0)
         df[0] = pd.to_numeric(df[0], downcast="float")
         return df
+
+
+class SolutionFilePool:
+    """Bounded pool of open h5plexos PLEXOSSolution files.
+
+    Files are opened when they are first used and kept open for later
+    properties. Once more than max_open files are open, the least recently
+    used file is closed, it is opened again if it is used later. Open files
+    are never shared between processes, a pickled pool, e.g one sent to a
+    worker process, starts with no open files.
+    """
+
+    def __init__(
+        self,
+        input_folder: Path,
+        filenames: List[str],
+        max_open: int = 64,
+        on_open: Callable[[str], None] = None,
+    ):
+        """
+        Args:
+            input_folder (Path): Folder containing h5plexos h5 files.
+            filenames (List[str]): h5plexos filenames in the pool.
+            max_open (int, optional): Max number of files open at once.
+                Defaults to 64.
+            on_open (Callable[[str], None], optional): Called with the filename
+                the first time each file is opened.
+                Defaults to None.
+        """
+        self.input_folder = Path(input_folder)
+        self.filenames = list(filenames)
+        self.max_open = max(1, int(max_open))
+        self.on_open = on_open
+        self._lock = threading.RLock()
+        self._open_files: OrderedDict = OrderedDict()
+        self._opened: set = set()
+
+    def __getstate__(self) -> dict:
+        # Locks and open files cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_open_files"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.filenames
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.filenames)
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def __getitem__(self, filename: str) -> PLEXOSSolution:
+        if filename not in self.filenames:
+            raise KeyError(filename)
+        return self.get(filename)
+
+    def get(self, filename: str) -> PLEXOSSolution:
+        """Gets the open PLEXOSSolution of a file, opening it if required.
+
+        Args:
+            filename (str): h5plexos filename
+
+        Returns:
+            PLEXOSSolution: open solution file, None if the file is not in the pool.
+        """
+        if filename not in self.filenames:
+            return None
+        with self._lock:
+            if filename in self._open_files:
+                self._open_files.move_to_end(filename)
+                return self._open_files[filename]
+
+            logger.debug(f"Opening {filename}")
+            db = PLEXOSSolution(self.input_folder.joinpath(filename))
+            self._open_files[filename] = db
+            while len(self._open_files) > self.max_open:
+                closed_filename, closed_db = self._open_files.popitem(last=False)
+                logger.debug(f"Closing {closed_filename}")
+                closed_db.h5file.close()
+            first_open = filename not in self._opened
+            self._opened.add(filename)
+        if first_open and self.on_open is not None:
+            self.on_open(filename)
+        return db
+
+    @property
+    def open_files(self) -> List[str]:
+        """Files which are currently open, least recently used first.
+
+        Returns:
+            List[str]: h5plexos filenames
+        """
+        return list(self._open_files)
+
+    def close(self) -> None:
+        """Closes all open files."""
+        with self._lock:
+            while self._open_files:
+                _, db = self._open_files.popitem(last=False)
+                db.h5file.close()
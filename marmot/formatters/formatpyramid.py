@@ -0,0 +1,308 @@
+"""Temporal pyramid of formatted interval properties.
+
+When the formatter_settings temporal_pyramid setting is enabled, interval
+properties are also saved at hourly, daily, monthly and annual resolution,
+as companion keys named <property>@<resolution>, e.g generator_Generation@monthly.
+Only resolutions coarser than the interval length of the property are saved,
+e.g hourly is only saved for sub-hourly properties.
+
+Most properties are summed to each resolution. Sums are divided by the
+number of intervals per hour, so a sum of MW values is in MWh and the
+pyramid can be read in place of the interval data by plots which sum values
+and correct for sub-hourly intervals. Properties such as prices, which
+do not add over time, are averaged, see formatrollup.MEAN_PROPERTY_KEYWORDS.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from marmot.formatters.formatrollup import (
+    ROLLUP_SEPARATOR,
+    create_rollups,
+    property_aggregation,
+)
+
+logger = logging.getLogger("formatter." + __name__)
+
+PYRAMID_RESOLUTIONS: Dict[str, Callable[[pd.DatetimeIndex], pd.DatetimeIndex]] = {
+    "hourly": lambda timestamps: timestamps.floor("h"),
+    "daily": lambda timestamps: timestamps.floor("D"),
+    "monthly": lambda timestamps: timestamps.to_period("M").to_timestamp(),
+    "annual": lambda timestamps: timestamps.to_period("Y").to_timestamp(),
+}
+"""Functions which round timestamps down to the start of each resolution,
+from finest to coarsest"""
+
+RESOLUTION_LENGTH = {
+    "hourly": pd.Timedelta(hours=1),
+    "daily": pd.Timedelta(days=1),
+    "monthly": pd.Timedelta(days=28),
+    "annual": pd.Timedelta(days=365),
+}
+"""Shortest length of each resolution"""
+
+
+def pyramid_key(key: str, resolution: str) -> str:
+    """Gets the key of a property at a pyramid resolution.
+
+    Args:
+        key (str): formatted property or rollup identifier,
+            e.g generator_Generation
+        resolution (str): Resolution name, e.g monthly
+
+    Returns:
+        str: pyramid key, e.g generator_Generation@monthly
+    """
+    return f"{key}{ROLLUP_SEPARATOR}{resolution}"
+
+
+def round_timestamps(df: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Rounds the timestamps of a formatted property down to the start of each
+    period of a resolution.
+
+    Args:
+        df (pd.DataFrame): Formatted property with a timestamp index level.
+        resolution (str): Resolution name, e.g monthly
+
+    Returns:
+        pd.DataFrame: Property with rounded timestamps and a MultiIndex.
+    """
+    index = df.index
+    if not isinstance(index, pd.MultiIndex):
+        index = pd.MultiIndex.from_arrays([index], names=[index.name])
+    timestamp_level = index.names.index("timestamp")
+    # Timestamps are rounded once per unique value, then mapped to each row
+    rounded_codes, rounded = pd.factorize(
+        PYRAMID_RESOLUTIONS[resolution](pd.DatetimeIndex(index.levels[timestamp_level]))
+    )
+    codes = list(index.codes)
+    codes[timestamp_level] = np.where(
+        codes[timestamp_level] < 0, -1, rounded_codes[codes[timestamp_level]]
+    )
+    levels = list(index.levels)
+    levels[timestamp_level] = rounded
+    return df.set_axis(
+        pd.MultiIndex(
+            levels=levels, codes=codes, names=index.names, verify_integrity=False
+        ),
+        axis=0,
+    )
+
+
+def resample_property(
+    df: pd.DataFrame, resolution: str, aggregation: str = "sum"
+) -> pd.DataFrame:
+    """Aggregates a formatted property to a coarser time resolution.
+
+    Args:
+        df (pd.DataFrame): Formatted property with a timestamp index level.
+        resolution (str): Resolution name, e.g monthly
+        aggregation (str, optional): 'sum' or 'mean'.
+            Defaults to "sum".
+
+    Returns:
+        pd.DataFrame: Aggregated property, timestamps are the start of each period.
+    """
+    resampled = round_timestamps(df, resolution)
+    grouped = resampled.groupby(
+        level=list(resampled.index.names), observed=True, dropna=False
+    )
+    return grouped.mean() if aggregation == "mean" else grouped.sum()
+
+
+def _combine_partials(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """Adds partial sums or counts which share an index entry.
+
+    Args:
+        partials (List[pd.DataFrame]): Partial sums or counts.
+
+    Returns:
+        pd.DataFrame: Combined sums or counts, sorted by index.
+    """
+    combined = pd.concat(partials) if len(partials) > 1 else partials[0]
+    return combined.groupby(
+        level=list(combined.index.names), observed=True, dropna=False
+    ).sum()
+
+
+class PyramidBuilder:
+    """Creates the temporal pyramid of a formatted property one chunk of time
+    at a time.
+
+    Used when a property is saved one partition or chunk at a time, so the
+    whole property never has to be held in memory. Each chunk is reduced to
+    partial sums (and counts of values for averaged properties) at the finest
+    resolution of the pyramid, e.g hourly for 5 minute data. Periods which
+    span two chunks, e.g a day split between partitions, are merged when the
+    pyramid is created. Coarser resolutions are then created from the partial
+    sums, instead of from the interval data.
+
+    Chunks are expected in timestamp order, as saved by the formatter.
+    The pyramid can be created at any time, e.g after each new partition
+    is added by the watch_formatter.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        mapping_columns: Iterable[str] = (),
+        rollups: bool = False,
+    ):
+        """
+        Args:
+            key (str): formatted property identifier, e.g generator_Generation
+            mapping_columns (Iterable[str], optional): Region_Mapping columns,
+                used to create rollups of each resolution.
+                Defaults to ().
+            rollups (bool, optional): Also create the spatial rollups of each
+                resolution, e.g generator_Generation@zone_tech@monthly.
+                Defaults to False.
+        """
+        self.key = key
+        self.mapping_columns = mapping_columns
+        self.rollups = rollups
+        self.aggregation = property_aggregation(key)
+        self.interval: pd.Timedelta = None
+        """Shortest interval between timestamps added so far"""
+        self.resolution: str = None
+        """Finest resolution partial sums are saved at"""
+        self._last_timestamp: pd.Timestamp = None
+        self._pending: List[pd.DataFrame] = []
+        self._sums: List[pd.DataFrame] = []
+        self._counts: List[pd.DataFrame] = []
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Adds a chunk of time of the property.
+
+        Args:
+            df (pd.DataFrame): Formatted property chunk
+        """
+        if (
+            ROLLUP_SEPARATOR in self.key
+            or df.empty
+            or "timestamp" not in df.index.names
+        ):
+            return
+        timestamps = pd.DatetimeIndex(df.index.get_level_values("timestamp").unique())
+        if self._last_timestamp is not None:
+            timestamps = timestamps.append(pd.DatetimeIndex([self._last_timestamp]))
+        timestamps = timestamps.unique().sort_values()
+        self._last_timestamp = timestamps[-1]
+        if len(timestamps) > 1:
+            interval = pd.Series(timestamps).diff().min()
+            if self.interval is None or interval < self.interval:
+                self.interval = interval
+                if self.resolution is not None and any(
+                    interval < RESOLUTION_LENGTH[resolution]
+                    for resolution in self._finer_resolutions()
+                ):
+                    logger.warning(
+                        f"{self.key} interval reduced to {interval}, resolutions "
+                        f"finer than {self.resolution} are not saved"
+                    )
+
+        if self.interval is None:
+            # The resolution is chosen once the interval is known
+            self._pending.append(df)
+            return
+        if self.resolution is None:
+            self.resolution = next(
+                (
+                    resolution
+                    for resolution in PYRAMID_RESOLUTIONS
+                    if self.interval < RESOLUTION_LENGTH[resolution]
+                ),
+                None,
+            )
+        if self.resolution is None:
+            self._pending = []
+            return
+        for chunk in self._pending + [df]:
+            rounded = round_timestamps(chunk, self.resolution)
+            grouped = rounded.groupby(
+                level=list(rounded.index.names), observed=True, dropna=False
+            )
+            self._sums.append(grouped.sum())
+            if self.aggregation == "mean":
+                self._counts.append(grouped.count())
+        self._pending = []
+
+    def _finer_resolutions(self) -> List[str]:
+        """Gets the resolutions finer than the resolution of the partial sums.
+
+        Returns:
+            List[str]: Resolution names
+        """
+        resolutions = list(PYRAMID_RESOLUTIONS)
+        return resolutions[: resolutions.index(self.resolution)]
+
+    def create(self) -> Dict[str, pd.DataFrame]:
+        """Creates the pyramid from all chunks added so far.
+
+        Returns:
+            Dict[str, pd.DataFrame]: {pyramid key: aggregated data}, empty if the
+            property has no timestamp or is already at annual resolution.
+        """
+        if self.resolution is None or not self._sums:
+            return {}
+        # Partial sums are combined once, so the pyramid can be created again
+        # after more chunks are added
+        self._sums = [_combine_partials(self._sums)]
+        if self._counts:
+            self._counts = [_combine_partials(self._counts)]
+
+        pyramid = {}
+        resolutions = list(PYRAMID_RESOLUTIONS)
+        for resolution in resolutions[resolutions.index(self.resolution) :]:
+            if self.interval >= RESOLUTION_LENGTH[resolution]:
+                continue
+            sums = self._sums[0]
+            if resolution != self.resolution:
+                sums = resample_property(sums, resolution)
+            if self.aggregation == "mean":
+                counts = self._counts[0]
+                if resolution != self.resolution:
+                    counts = resample_property(counts, resolution)
+                resampled = sums / counts
+            elif self.interval < pd.Timedelta(hours=1):
+                # Sums are corrected to hourly values, e.g MW to MWh
+                resampled = sums / (pd.Timedelta(hours=1) / self.interval)
+            else:
+                resampled = sums
+            pyramid[pyramid_key(self.key, resolution)] = resampled
+            if self.rollups:
+                for rollup_name, rollup in create_rollups(
+                    resampled, self.key, self.mapping_columns
+                ).items():
+                    pyramid[pyramid_key(rollup_name, resolution)] = rollup
+        return pyramid
+
+
+def create_pyramid(
+    df: pd.DataFrame,
+    key: str,
+    mapping_columns: Iterable[str] = (),
+    rollups: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """Creates the temporal pyramid of a formatted property.
+
+    Args:
+        df (pd.DataFrame): Formatted property
+        key (str): formatted property identifier, e.g generator_Generation
+        mapping_columns (Iterable[str], optional): Region_Mapping columns,
+            used to create rollups of each resolution.
+            Defaults to ().
+        rollups (bool, optional): Also create the spatial rollups of each
+            resolution, e.g generator_Generation@zone_tech@monthly.
+            Defaults to False.
+
+    Returns:
+        Dict[str, pd.DataFrame]: {pyramid key: aggregated data}, empty if the
+        property has no timestamp or is already at annual resolution.
+    """
+    builder = PyramidBuilder(key, mapping_columns, rollups=rollups)
+    builder.add(df)
+    return builder.create()
@@ -8,15 +8,17 @@ Inherits the Process class.
 import logging
 import re
 import gdxpds
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List
 from dataclasses import dataclass, field
 
 import marmot.utils.mconfig as mconfig
-from marmot.metamanagers.read_metadata import MetaData
 from marmot.formatters.formatbase import Process
 from marmot.formatters.formatextra import ExtraProperties
+from marmot.formatters.formatoutput import FormattedH5Session
+from marmot.formatters.formatcache import cache_processed_data
 
 logger = logging.getLogger("formatter." + __name__)
 formatter_settings = mconfig.parser("formatter_settings")
@@ -72,6 +74,14 @@ class ProcessReEDS(Process):
         "region_Load": [("region_Load_Annual", ExtraProperties.annualize_property)],
     }
     """Dictionary of Extra custom properties that are created based off existing properties."""
+    # Other gdx symbols read when a symbol is processed, including by its
+    # extra properties
+    GDX_SYMBOL_INPUTS: dict = {
+        "gen_out": ["stor_out"],
+        "gen_out_ann": ["stor_inout"],
+        "load_rt": ["stor_in"],
+    }
+    """Dictionary of gdx symbols used as additional inputs to each gdx symbol."""
 
     def __init__(
         self,
@@ -103,12 +113,10 @@ class ProcessReEDS(Process):
         # To access the values use the public api e.g self.property_units
         self._property_units: dict = {}
         self._wind_resource_to_pca = None
-
-        self.metadata = MetaData(
-            output_file_path.parent,
-            read_from_formatted_h5=True,
-            Region_Mapping=Region_Mapping,
-        )
+        self._regions: pd.DataFrame = None
+        self._timeslice_hours: pd.DataFrame = None
+        self.gdx_symbols = GdxSymbolCache()
+        """Raw gdx symbol data read during the run"""
 
         if process_subset_years:
             # Ensure values are ints
@@ -135,13 +143,66 @@ class ProcessReEDS(Process):
         # Extracts values between markers
         symbol_marker = "--(.*?)--"
 
-        symbol_list = gdxpds.list_symbols(gdx_filename)
-        for symbol in symbol_list:
-            unit = re.search(symbol_marker, symbol.description)
+        descriptions = self.gdx_symbols.descriptions(gdx_filename)
+        for symbol_name, description in descriptions.items():
+            if symbol_name in self._property_units:
+                continue
+            unit = re.search(symbol_marker, description)
             if unit:
                 unit = unit.group(1)
-            if symbol.name not in self._property_units:
-                self._property_units[symbol.name] = unit
+            self._property_units[symbol_name] = unit
+
+    @property
+    def processed_data_cache_key(self) -> tuple:
+        """Identifies the results of this instance in the processed_data_cache.
+
+        Returns:
+            tuple: cache key prefix
+        """
+        return super().processed_data_cache_key + (
+            tuple(self.process_subset_years or ()),
+        )
+
+    @property
+    def regions(self) -> pd.DataFrame:
+        """Gets the ReEDS regions and the resource regions within them
+
+        Read from the inputs_case/regions.csv file of the scenario, the
+        same source as the metadata saved to the formatted h5 file.
+
+        Returns:
+            pd.DataFrame: regions, with region name and category columns
+        """
+        if self._regions is None:
+            region_df = pd.read_csv(
+                self.input_folder.joinpath("inputs_case", "regions.csv")
+            )
+            region_df.rename(columns={"p": "name", "s": "category"}, inplace=True)
+            self._regions = region_df
+        return self._regions
+
+    @property
+    def timeslice_hours(self) -> pd.DataFrame:
+        """Gets the ReEDS timeslice (h) of each hour of the year
+
+        Read from the inputs_case/h_dt_szn.csv file of the scenario.
+        All year timeslice mappings are the same, the 2007 mapping is used.
+
+        Returns:
+            pd.DataFrame: hour of the year (1-8760), h and any other columns
+            of the mapping, e.g season
+        """
+        if self._timeslice_hours is None:
+            timeslice_mapping_file = pd.read_csv(
+                self.input_folder.joinpath("inputs_case", "h_dt_szn.csv")
+            )
+            timeslice_mapping_file = timeslice_mapping_file.loc[
+                timeslice_mapping_file.year == 2007
+            ]
+            self._timeslice_hours = timeslice_mapping_file.drop(
+                "year", axis=1
+            ).reset_index(drop=True)
+        return self._timeslice_hours
 
     @property
     def wind_resource_to_pca(self) -> dict:
@@ -156,15 +217,17 @@ class ProcessReEDS(Process):
     def wind_resource_to_pca(self, h5_filename: str):
         """Sets the wind_resource_to_pca mapping
 
+        The mapping is created from the regions of the scenario input files,
+        so the formatted h5 file is not read while it is being written.
+
         Args:
             h5_filename (str): formatted h5 filename
         """
-        if self.metadata.filename != h5_filename or self._wind_resource_to_pca is None:
-            regions = self.metadata.regions(h5_filename)
+        if self._wind_resource_to_pca is None:
             self._wind_resource_to_pca = (
-                regions[["category", "region"]]
+                self.regions[["category", "name"]]
                 .set_index("category")
-                .to_dict()["region"]
+                .to_dict()["name"]
             )
 
     @property
@@ -177,12 +240,21 @@ class ProcessReEDS(Process):
                 if names.name == f"rep_{self.input_folder.name}.gdx":
                     files.append(names.name)
 
-                    self.property_units = str(names)
-
             # List of all files in input folder in alpha numeric order
             self._get_input_files = sorted(files, key=lambda x: int(re.sub("\D", "0", x)))
         return self._get_input_files
 
+    def input_file_path(self, filename: str) -> Path:
+        """Gets the full path of a ReEDS gdx file.
+
+        Args:
+            filename (str): gdx filename, as returned by get_input_files
+
+        Returns:
+            Path: path to gdx file
+        """
+        return self.input_folder.joinpath("outputs", filename)
+
     @property
     def file_collection(self) -> dict:
         """Dictionary input file names to full filename path 
@@ -193,27 +265,45 @@ class ProcessReEDS(Process):
         if self._file_collection == None:
             self._file_collection = {}
             for file in self.get_input_files:
-                self._file_collection[file] = str(self.input_folder.joinpath("outputs", file))
+                self._file_collection[file] = str(self.input_file_path(file))
         return self._file_collection
 
-    def output_metadata(self, files_list: list) -> None:
+    def output_metadata(
+        self, files_list: list, output_session: FormattedH5Session = None
+    ) -> None:
         """Add ReEDS specific metadata to formatted h5 file .
 
         Args:
             files_list (list): List of all gdx files in inputs
                 folder in alpha numeric order.
+            output_session (FormattedH5Session, optional): Open session of the
+                formatted h5 file to save metadata to.
+                Defaults to None, which opens the output_file_path.
         """
+        if output_session is None:
+            with FormattedH5Session(self.output_file_path) as output_session:
+                self.output_metadata(files_list, output_session)
+            return
+
         for partition in files_list:
-            region_df = pd.read_csv(
-                self.input_folder.joinpath("inputs_case", "regions.csv")
-            )
-            region_df.rename(columns={"p": "name", "s": "category"}, inplace=True)
-            region_df.to_hdf(
-                self.output_file_path,
-                key=f"metadata/{partition}/objects/regions",
-                mode="a",
+            output_session.put(
+                self.regions, key=f"metadata/{partition}/objects/regions"
             )
 
+    def register_properties(self, property_rows: list) -> None:
+        """Registers the gdx symbols of the properties to process, and the
+        symbols they depend on, so all are read in a single pass of the gdx file.
+
+        Args:
+            property_rows (list): Properties_File rows of the properties to process.
+        """
+        symbols = set()
+        for row in property_rows:
+            symbols.add(row["data_set"])
+            symbols.update(self.GDX_SYMBOL_INPUTS.get(row["data_set"], []))
+        self.gdx_symbols.require(symbols)
+
+    @cache_processed_data
     def get_processed_data(
         self, prop_class: str, prop: str, timescale: str, model_filename: str
     ) -> pd.DataFrame:
@@ -233,15 +323,13 @@ class ProcessReEDS(Process):
         self.wind_resource_to_pca = self.input_folder.name
 
         gdx_file = self.file_collection.get(model_filename)
+        self.property_units = gdx_file
         logger.info(f"      {model_filename}")
         try:
-            df: pd.DataFrame = gdxpds.to_dataframe(gdx_file, prop)[prop]
+            df = self.read_symbol(gdx_file, prop)
         except gdxpds.tools.Error:
             df = self.report_prop_error(prop, prop_class)
             return df
-        # Get column names
-        reeds_prop_cols = PropertyColumns()
-        df.columns = getattr(reeds_prop_cols, prop)
         if "region" in df.columns:
             df.region = df.region.map(lambda x: self.wind_resource_to_pca.get(x, x))
             if not self.Region_Mapping.empty:
@@ -254,10 +342,6 @@ class ProcessReEDS(Process):
             # Process attribute and return to df
             df = process_att(df, prop, gdx_file)
 
-        df.year = df.year.astype(int)
-        if self.process_subset_years:
-            df = df.loc[df.year.isin(self.process_subset_years)]
-
         if timescale == "interval":
             df = self.merge_timeseries_block_data(df)
         else:
@@ -282,45 +366,85 @@ class ProcessReEDS(Process):
         df.rename(columns={"Value": 0}, inplace=True)
         return df
 
+    def read_symbol(self, gdx_file: str, symbol: str) -> pd.DataFrame:
+        """Reads a gdx symbol, with Marmot column names and integer years.
+
+        If process_subset_years is set, only rows of those years are returned,
+        so the rest of the processing only works on the years requested.
+
+        Args:
+            gdx_file (str): Full path to gdx file
+            symbol (str): gdx symbol name, e.g gen_out
+
+        Raises:
+            gdxpds.tools.Error: If the symbol is not in the gdx file.
+
+        Returns:
+            pd.DataFrame: symbol data, columns named by PropertyColumns
+        """
+        df = self.gdx_symbols.get(gdx_file, symbol, copy=False)
+        columns = getattr(PropertyColumns(), symbol)
+        # Years are converted once per unique value
+        year_codes, years = pd.factorize(df.iloc[:, columns.index("year")])
+        years = years.astype(int).to_numpy()
+        if self.process_subset_years:
+            keep = np.flatnonzero(np.isin(years, self.process_subset_years)[year_codes])
+            df = df.take(keep)
+            year_codes = year_codes[keep]
+        else:
+            df = df.copy()
+        df.columns = columns
+        df["year"] = years[year_codes]
+        return df
+
     def merge_timeseries_block_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Merge chronological time intervals with reeds timeslices
 
+        Each row is repeated for every hour of its year in its timeslice.
+        Rows are gathered by timeslice code, instead of merging with an
+        hourly table of every year.
+
         Args:
             df (pd.DataFrame): input dataframe
 
         Returns:
             pd.DataFrame: df with merged in timeseries data
         """
-        timeslice_mapping_file = pd.read_csv(
-            self.input_folder.joinpath("inputs_case", "h_dt_szn.csv")
-        )
-
-        # All year timeslice mappings are the same, defaulting to 2007
-        timeslice_mapping_file = timeslice_mapping_file.loc[
-            timeslice_mapping_file.year == 2007
+        timeslice_hours = self.timeslice_hours
+        # Hours of the year grouped by timeslice
+        hour_codes, timeslices = pd.factorize(timeslice_hours.h)
+        hours_by_timeslice = np.argsort(hour_codes, kind="stable")
+        hour_counts = np.bincount(hour_codes, minlength=len(timeslices))
+        hour_starts = np.cumsum(hour_counts) - hour_counts
+
+        # Rows with a timeslice that is not in the mapping are dropped
+        codes = timeslices.get_indexer(df.h)
+        repeats = np.where(codes >= 0, hour_counts[codes], 0)
+        rows = np.repeat(np.arange(len(df)), repeats)
+        # Position of each repeated row in hours_by_timeslice
+        first_position = hour_starts[codes] - (np.cumsum(repeats) - repeats)
+        hour_rows = hours_by_timeslice[
+            np.repeat(first_position, repeats) + np.arange(len(rows))
         ]
-        timeslice_mapping_file = timeslice_mapping_file.drop("year", axis=1)
-
-        year_list = df.year.unique()
-        year_list.sort()
-
-        year_chunks = []
-        for year in year_list:
-            year_chunks.extend(pd.date_range(f"{year}-01-01", periods=8760, freq="H"))
 
-        datetime_df = pd.DataFrame(
-            data=list(range(1, 8761)) * len(year_list),
-            index=pd.to_datetime(year_chunks),
-            columns=["hour"],
+        year_codes, years = pd.factorize(df.year)
+        year_start = (
+            (years.to_numpy().astype(np.int64) - 1970)
+            .astype("datetime64[Y]")
+            .astype("datetime64[ns]")
+            .view(np.int64)
         )
-        datetime_df["year"] = datetime_df.index.year.astype(int)
-        datetime_df = datetime_df.reset_index()
-        datetime_df.rename(columns={"index": "timestamp"}, inplace=True)
-
-        datetime_block = datetime_df.merge(timeslice_mapping_file, on="hour")
-        datetime_block.sort_values(by=["timestamp", "h"], inplace=True)
-        df_merged = df.merge(datetime_block, on=["year", "h"])
-        return df_merged.drop(["h", "hour", "year"], axis=1)
+        hour_of_year = timeslice_hours.hour.to_numpy().astype(np.int64) - 1
+        timestamps = (
+            year_start[year_codes[rows]] + hour_of_year[hour_rows] * 3600 * 10**9
+        )
+        df_merged = df.drop(["h", "year"], axis=1).iloc[rows].reset_index(drop=True)
+        df_merged["timestamp"] = timestamps.view("datetime64[ns]")
+        for column in timeslice_hours.columns.drop(["hour", "h"]):
+            df_merged[column] = (
+                timeslice_hours[column].take(hour_rows).reset_index(drop=True)
+            )
+        return df_merged
 
     def df_process_generator(
         self, df: pd.DataFrame, prop: str = None, gdx_file: str = None
@@ -354,14 +478,10 @@ class ProcessReEDS(Process):
                 stor_prop_name = "stor_inout"
                 group_list = ["tech", "region", "year"]
             try:
-                stor_out: pd.DataFrame = gdxpds.to_dataframe(gdx_file, stor_prop_name)[
-                    stor_prop_name
-                ]
+                stor_out = self.read_symbol(gdx_file, stor_prop_name)
             except gdxpds.tools.Error:
                 stor_out = self.report_prop_error(stor_prop_name, "storage")
                 return df
-            reeds_prop_cols = PropertyColumns()
-            stor_out.columns = getattr(reeds_prop_cols, stor_prop_name)
             if prop == "gen_out_ann":
                 stor_out = stor_out.loc[stor_out.type == "out"]
             stor_out = stor_out.groupby(group_list).sum()
@@ -369,7 +489,7 @@ class ProcessReEDS(Process):
             df = df.merge(stor_out, on=group_list, how="outer")
             df["Value"] = df["Value_y"]
             df["Value"] = df["Value"].fillna(df["Value_x"])
-            df["Value"].to_numpy()[df["Value"].to_numpy() < 0] = 0
+            df.loc[df["Value"] < 0, "Value"] = 0
             df = df.drop(["Value_x", "Value_y"], axis=1)
 
         return df
@@ -412,6 +532,119 @@ class ProcessReEDS(Process):
         return df
 
 
+class GdxSymbolCache:
+    """Reads and caches the symbols of ReEDS gdx files.
+
+    Each gdxpds read starts the GAMS API and scans the gdx file. Symbols
+    registered with require are all loaded the first time a gdx file is read,
+    in a single pass, and the raw dataframes are kept for the rest of the run.
+    Symbols which were not registered are loaded when first read.
+    Cached data is dropped if the gdx file is modified.
+    """
+
+    def __init__(self):
+        self._required: set = set()
+        self._frames: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self._descriptions: Dict[str, Dict[str, str]] = {}
+        self._file_stats: Dict[str, tuple] = {}
+
+    def require(self, symbols: Iterable[str]) -> None:
+        """Registers symbols to load in the first pass of each gdx file.
+
+        Args:
+            symbols (Iterable[str]): gdx symbol names, e.g gen_out
+        """
+        self._required.update(symbols)
+
+    def descriptions(self, gdx_file: str) -> Dict[str, str]:
+        """Gets the description of each symbol in a gdx file.
+
+        Args:
+            gdx_file (str): Full path to gdx file
+
+        Returns:
+            Dict[str, str]: {symbol name: description}
+        """
+        self._check_modified(gdx_file)
+        if gdx_file not in self._descriptions:
+            self._read(gdx_file)
+        return self._descriptions[gdx_file]
+
+    def get(self, gdx_file: str, symbol: str, copy: bool = True) -> pd.DataFrame:
+        """Gets the data of a gdx symbol.
+
+        Args:
+            gdx_file (str): Full path to gdx file
+            symbol (str): gdx symbol name, e.g gen_out
+            copy (bool, optional): Return a copy of the cached data. If False
+                the returned data must not be modified.
+                Defaults to True.
+
+        Raises:
+            gdxpds.tools.Error: If the symbol is not in the gdx file.
+
+        Returns:
+            pd.DataFrame: symbol data, as returned by gdxpds.to_dataframe
+        """
+        self._check_modified(gdx_file)
+        if symbol not in self._frames.get(gdx_file, {}):
+            # Files which have been read are only read again for symbols they contain
+            if (
+                gdx_file not in self._descriptions
+                or symbol in self._descriptions[gdx_file]
+            ):
+                self._read(gdx_file, symbol)
+        frames = self._frames.get(gdx_file, {})
+        if symbol not in frames:
+            raise gdxpds.tools.Error(f"No symbol named '{symbol}' in '{gdx_file}'.")
+        if copy:
+            return frames[symbol].copy()
+        return frames[symbol]
+
+    def clear(self) -> None:
+        """Removes all cached data."""
+        self._frames.clear()
+        self._descriptions.clear()
+        self._file_stats.clear()
+
+    def _read(self, gdx_file: str, symbol: str = None) -> None:
+        """Loads a symbol and any required symbols not yet loaded from a gdx file.
+
+        Args:
+            gdx_file (str): Full path to gdx file
+            symbol (str, optional): gdx symbol name to load.
+                Defaults to None.
+        """
+        frames = self._frames.setdefault(gdx_file, {})
+        to_load = set(self._required)
+        if symbol is not None:
+            to_load.add(symbol)
+        with gdxpds.gdx.GdxFile(lazy_load=True) as gdx:
+            gdx.read(gdx_file)
+            self._descriptions[gdx_file] = {
+                gdx_symbol.name: gdx_symbol.description for gdx_symbol in gdx
+            }
+            for name in sorted(to_load):
+                if name in frames or name not in self._descriptions[gdx_file]:
+                    continue
+                gdx[name].load()
+                frames[name] = gdx[name].dataframe
+        logger.debug(f"Loaded {sorted(frames)} from {Path(gdx_file).name}")
+
+    def _check_modified(self, gdx_file: str) -> None:
+        """Drops the cached data of a gdx file if it has been modified.
+
+        Args:
+            gdx_file (str): Full path to gdx file
+        """
+        stat = Path(gdx_file).stat()
+        file_stat = (stat.st_mtime_ns, stat.st_size)
+        if self._file_stats.get(gdx_file, file_stat) != file_stat:
+            self._frames.pop(gdx_file, None)
+            self._descriptions.pop(gdx_file, None)
+        self._file_stats[gdx_file] = file_stat
+
+
 @dataclass
 class PropertyColumns:
     """ReEDS property column names"""
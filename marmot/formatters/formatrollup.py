@@ -0,0 +1,137 @@
+"""Spatial rollups of formatted properties.
+
+Most plots aggregate generator level data to timestamp and technology for each
+region or zone. When the formatter_settings spatial_rollups setting is enabled,
+properties with a tech level are also saved pre-aggregated to
+(timestamp, <aggregation>, tech, units) for each spatial level, e.g region,
+zone and each Region_Mapping column. These rollups are saved as companion keys
+named <property>@<aggregation>_tech, e.g generator_Generation@zone_tech,
+and are read by the plotter in place of the full property when a plot only
+needs data by technology.
+
+Rollups are sums, so properties which do not add across objects, such as
+prices and capacity factors, are not rolled up, see MEAN_PROPERTY_KEYWORDS.
+"""
+
+import logging
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+logger = logging.getLogger("formatter." + __name__)
+
+ROLLUP_SEPARATOR = "@"
+"""Separates the property name from the rollup name in rollup keys"""
+
+ROLLUP_LEVELS = ("timestamp", "tech", "units")
+"""Index levels kept in every rollup, along with the aggregation level"""
+
+MEAN_PROPERTY_KEYWORDS = (
+    "Price",
+    "SRMC",
+    "Factor",
+    "Volume",
+    "Units_",
+    "Installed_Capacity",
+    "Limit",
+    "Hours_at",
+)
+"""Properties which contain any of these names are averaged instead of summed
+in the temporal pyramid, and are not rolled up as rollups are sums"""
+
+
+def property_aggregation(key: str) -> str:
+    """Gets how a property is aggregated over time and across objects.
+
+    Args:
+        key (str): formatted property identifier, e.g generator_Generation
+
+    Returns:
+        str: 'mean' or 'sum'
+    """
+    prop_name = key.split(ROLLUP_SEPARATOR)[0]
+    if any(keyword in prop_name for keyword in MEAN_PROPERTY_KEYWORDS):
+        return "mean"
+    return "sum"
+
+
+def rollup_key(key: str, aggregation: str) -> str:
+    """Gets the key of a spatial rollup.
+
+    Args:
+        key (str): formatted property identifier, e.g generator_Generation
+        aggregation (str): Spatial aggregation level, e.g zone
+
+    Returns:
+        str: rollup key, e.g generator_Generation@zone_tech
+    """
+    return f"{key}{ROLLUP_SEPARATOR}{aggregation}_tech"
+
+
+def is_rollup_key(key: str) -> bool:
+    """Checks if a key is a spatial rollup of a property.
+
+    Args:
+        key (str): key name
+
+    Returns:
+        bool: True if the key is a rollup
+    """
+    return ROLLUP_SEPARATOR in key
+
+
+def rollup_aggregations(
+    df: pd.DataFrame, mapping_columns: Iterable[str] = ()
+) -> List[str]:
+    """Gets the spatial levels a property can be rolled up to.
+
+    Args:
+        df (pd.DataFrame): Formatted property
+        mapping_columns (Iterable[str], optional): Region_Mapping columns.
+            Defaults to ().
+
+    Returns:
+        List[str]: Spatial index levels of the property, empty if the property
+        has no timestamp or tech level.
+    """
+    names = df.index.names
+    if "timestamp" not in names or "tech" not in names:
+        return []
+    aggregations = []
+    for name in ("region", "zone", *mapping_columns):
+        if name in names and name not in aggregations and name not in ROLLUP_LEVELS:
+            aggregations.append(name)
+    return aggregations
+
+
+def create_rollups(
+    df: pd.DataFrame, key: str, mapping_columns: Iterable[str] = ()
+) -> Dict[str, pd.DataFrame]:
+    """Sums a formatted property to timestamp and tech for each spatial level.
+
+    Args:
+        df (pd.DataFrame): Formatted property
+        key (str): formatted property identifier, e.g generator_Generation
+        mapping_columns (Iterable[str], optional): Region_Mapping columns,
+            a rollup is created for each column in the property index.
+            Defaults to ().
+
+    Returns:
+        Dict[str, pd.DataFrame]: {rollup key: rollup data}, empty if the property
+        cannot be rolled up or is not additive, e.g a price.
+    """
+    if is_rollup_key(key) or df.empty or property_aggregation(key) == "mean":
+        return {}
+    rollups = {}
+    for aggregation in rollup_aggregations(df, mapping_columns):
+        group_levels = [
+            name
+            for name in df.index.names
+            if name in ROLLUP_LEVELS or name == aggregation
+        ]
+        if len(group_levels) == df.index.nlevels:
+            continue
+        rollups[rollup_key(key, aggregation)] = df.groupby(
+            level=group_levels, observed=True, dropna=False
+        ).sum()
+    return rollups
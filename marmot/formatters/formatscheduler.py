@@ -0,0 +1,242 @@
+"""Schedules the creation of extra properties during a formatter run.
+
+Extra properties and the properties they are created from form a dependency
+graph, built from the Process class PROPERTY_MAPPING, EXTRA_MARMOT_PROPERTIES and
+EXTRA_PROPERTY_INPUTS attributes. Each property is created once, as soon as all
+its inputs are available, and formatted data is only held in memory until the
+last property that depends on it has been created.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import pandas as pd
+
+from marmot.formatters.formatbase import Process
+from marmot.formatters.formatextra import ExtraProperties
+
+logger = logging.getLogger("formatter." + __name__)
+
+
+@dataclass
+class PropertyNode:
+    """A property in the dependency graph."""
+
+    key: str
+    """formatted property identifier, e.g generator_Generation"""
+    timescale: str
+    """Data timescale, e.g interval, summary"""
+    parent: str = None
+    """Property the extra property is created from, None for base properties"""
+    function: Callable = None
+    """ExtraProperties method used to create the extra property"""
+    inputs: List[str] = field(default_factory=list)
+    """Properties in the graph that must be complete before this property is created"""
+    save: bool = True
+    """Save the property, False if it already exists in the formatted h5 file"""
+    consumers: int = 0
+    """Number of properties still to be created which read this property"""
+
+
+class PropertyScheduler:
+    """Creates extra properties as soon as the properties they depend on are formatted.
+
+    Base properties (those listed in the Properties_File) are passed to the
+    complete method once they have been formatted. The scheduler then creates
+    every extra property whose inputs are all complete, to any depth, e.g
+    generator_Generation -> generator_Curtailment -> generator_Curtailment_Annual.
+
+    Properties which are read by other properties, such as
+    generator_Available_Capacity for generator_Curtailment, are shared through
+    ExtraProperties.formatted_properties, so they are never processed twice.
+    Each property is released from memory once its last consumer has been created.
+    """
+
+    def __init__(
+        self,
+        process_sim_model: Process,
+        extraprops_init: ExtraProperties,
+        properties_to_process: List[Tuple[pd.Series, str]],
+        existing_keys: list = None,
+    ):
+        """
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            extraprops_init (ExtraProperties): Instance of ExtraProperties class.
+            properties_to_process (List[Tuple[pd.Series, str]]): list of
+                (Properties_File row, property_key_name) of base properties
+                formatted in this run.
+            existing_keys (list, optional): Keys already in the formatted h5 file,
+                these are only created if another property depends on them.
+                Defaults to None.
+        """
+        if existing_keys is None:
+            existing_keys = []
+        self.extraprops_init = extraprops_init
+        self.properties_to_process = properties_to_process
+        self.nodes: Dict[str, PropertyNode] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._complete: set = set()
+
+        for row, property_key_name in properties_to_process:
+            self.nodes[property_key_name] = PropertyNode(
+                property_key_name, row["data_type"]
+            )
+
+        # Add extra properties, parents are always added before their children
+        extra_properties = []
+        extra_marmot_properties = process_sim_model.EXTRA_MARMOT_PROPERTIES
+        pending = deque(self.nodes.values())
+        while pending:
+            parent = pending.popleft()
+            for prop_name, prop_function in extra_marmot_properties.get(parent.key, []):
+                if prop_name in self.nodes:
+                    continue
+                node = PropertyNode(
+                    prop_name,
+                    parent.timescale,
+                    parent=parent.key,
+                    function=prop_function,
+                    save=prop_name not in existing_keys,
+                )
+                node.inputs.append(parent.key)
+                for input_key in process_sim_model.EXTRA_PROPERTY_INPUTS.get(
+                    prop_name, []
+                ):
+                    # Only inputs formatted in this run with the same timescale
+                    # can be reused
+                    input_node = self.nodes.get(input_key)
+                    if input_node and input_node.timescale == node.timescale:
+                        node.inputs.append(input_key)
+                self.nodes[prop_name] = node
+                extra_properties.append(node)
+                pending.append(node)
+
+        # Remove extra properties that are not saved and have no saved dependents
+        required = set()
+        for node in reversed(extra_properties):
+            if node.save or node.key in required:
+                required.update(node.inputs)
+            else:
+                del self.nodes[node.key]
+
+        for node in self.nodes.values():
+            for input_key in node.inputs:
+                self.nodes[input_key].consumers += 1
+                self._dependents.setdefault(input_key, []).append(node.key)
+
+    def ordered_properties(self) -> List[Tuple[pd.Series, str]]:
+        """Orders the base properties so those read by extra properties of other
+        properties are formatted first.
+
+        Returns:
+            List[Tuple[pd.Series, str]]: list of
+            (Properties_File row, property_key_name)
+        """
+        extra_inputs = {
+            input_key
+            for node in self.nodes.values()
+            if node.parent is not None
+            for input_key in node.inputs
+            if input_key != node.parent
+        }
+        return sorted(
+            self.properties_to_process, key=lambda x: x[1] not in extra_inputs
+        )
+
+    def needs_data(self, property_key_name: str) -> bool:
+        """Checks if other properties depend on a base property.
+
+        Args:
+            property_key_name (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            bool: True if the property data is required by the scheduler.
+        """
+        node = self.nodes.get(property_key_name)
+        return node is not None and node.consumers > 0
+
+    def complete(
+        self, property_key_name: str, df: pd.DataFrame = None
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Marks a base property as complete and creates any extra properties
+        which are now ready.
+
+        The returned iterator must be fully consumed.
+
+        Args:
+            property_key_name (str): formatted property identifier,
+                e.g generator_Generation
+            df (pd.DataFrame, optional): Formatted property data, None or empty
+                if the property could not be formatted.
+                Defaults to None.
+
+        Yields:
+            Iterator[Tuple[str, pd.DataFrame]]: (property_key_name, df) of each
+            extra property to save.
+        """
+        if property_key_name not in self.nodes:
+            return
+        pending = deque([(property_key_name, df)])
+        while pending:
+            key, df = pending.popleft()
+            node = self.nodes[key]
+            self._complete.add(key)
+            if node.consumers > 0 and df is not None:
+                self.extraprops_init.formatted_properties[(key, node.timescale)] = df
+            del df
+
+            for dependent in self._dependents.get(key, []):
+                dependent_node = self.nodes[dependent]
+                if dependent in self._complete or not all(
+                    input_key in self._complete for input_key in dependent_node.inputs
+                ):
+                    continue
+                prop = self._create_property(dependent_node)
+                self._release(dependent_node)
+                if prop is not None and dependent_node.save:
+                    yield dependent, prop
+                pending.append((dependent, prop))
+                del prop
+
+    def _create_property(self, node: PropertyNode) -> pd.DataFrame:
+        """Creates an extra property from its parent property.
+
+        Args:
+            node (PropertyNode): Extra property to create.
+
+        Returns:
+            pd.DataFrame: Extra property data, None if it could not be created.
+        """
+        parent_df = self.extraprops_init.formatted_properties.get(
+            (node.parent, node.timescale)
+        )
+        if parent_df is None or parent_df.empty:
+            return None
+
+        logger.info(f"Processing {node.key}")
+        prop = node.function(self.extraprops_init, parent_df, timescale=node.timescale)
+        if prop.empty is True:
+            if node.save:
+                logger.warning(f"{node.key} was not saved")
+            return None
+        return prop
+
+    def _release(self, node: PropertyNode) -> None:
+        """Releases the inputs of a created property from memory if they are
+        not needed by any other property.
+
+        Args:
+            node (PropertyNode): Property that has been created.
+        """
+        for input_key in node.inputs:
+            input_node = self.nodes[input_key]
+            input_node.consumers -= 1
+            if input_node.consumers == 0:
+                self.extraprops_init.formatted_properties.pop(
+                    (input_key, input_node.timescale), None
+                )
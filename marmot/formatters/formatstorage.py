@@ -0,0 +1,531 @@
+"""Storage backends of formatted properties.
+
+Formatted properties can be saved in the formatted h5 file (hdf5 backend), or
+in an Apache Parquet dataset saved next to it (parquet backend). The parquet
+backend saves each property to its own folder, partitioned by year, with the
+index levels saved as dictionary encoded columns. Metadata and the manifest
+are always saved in the formatted h5 file, so both backends are read by MetaData
+in the same way.
+
+The backend used by the formatter is set by the formatter_settings
+storage_backend setting. Formatted properties are read with
+read_formatted_property, which finds the backend a property was saved with.
+When a property is saved or removed by either backend, any copy saved by the
+other backend is removed, so switching backends never leaves stale data.
+"""
+
+import json
+import time
+import shutil
+import logging
+import traceback
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from marmot.formatters.formatoutput import FormattedH5Session
+from marmot.formatters.formatwide import WideProperty
+
+logger = logging.getLogger("formatter." + __name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa = None
+    PYARROW_ERROR = traceback.format_exc()
+
+H5_ONLY_KEYS = ("metadata", "manifest")
+"""Top level keys which are always saved in the formatted h5 file"""
+
+PARQUET_COMPRESSION = {
+    "blosc:zstd": "zstd",
+    "zstd": "zstd",
+    "blosc:lz4": "lz4",
+    "blosc:lz4hc": "lz4",
+    "lz4": "lz4",
+    "blosc:snappy": "snappy",
+    "blosc:blosclz": "snappy",
+    "blosc:zlib": "gzip",
+    "zlib": "gzip",
+    "bzip2": "brotli",
+}
+"""Maps the complib compression setting to the nearest parquet codec"""
+
+
+def parquet_dataset_path(file_name: Path) -> Path:
+    """Gets the folder of the parquet dataset of a formatted h5 file.
+
+    Args:
+        file_name (Path): Path to formatted h5 file, e.g <scenario>_formatted.h5
+
+    Returns:
+        Path: Path to dataset folder, e.g <scenario>_formatted.parquet
+    """
+    return Path(file_name).with_suffix(".parquet")
+
+
+def _parquet_files(key_folder: Path) -> List[Path]:
+    """Gets the parquet files of a property in the order they were saved.
+
+    Args:
+        key_folder (Path): Folder of property.
+
+    Returns:
+        List[Path]: list of parquet files
+    """
+    return sorted(key_folder.glob("*.parquet")) + sorted(
+        key_folder.glob("year=*/*.parquet")
+    )
+
+
+def write_parquet_property(
+    df: pd.DataFrame,
+    key_folder: Path,
+    complevel: int = 9,
+    complib: str = "blosc:zstd",
+) -> None:
+    """Saves a formatted property to its parquet dataset folder.
+
+    The data is added to the dataset as a new file for each year, so a
+    property can be saved one partition at a time.
+
+    Args:
+        df (pd.DataFrame): Formatted property data.
+        key_folder (Path): Folder of property.
+        complevel (int, optional): compression level, 0 disables compression.
+            Defaults to 9.
+        complib (str, optional): compression library, converted to the nearest
+            parquet codec.
+            Defaults to 'blosc:zstd'.
+    """
+    index_names = list(df.index.names)
+    index_columns = [
+        str(name) if name is not None else f"__index_level_{i}__"
+        for i, name in enumerate(index_names)
+    ]
+    arrays = []
+    for i, column in enumerate(index_columns):
+        level = df.index.levels[i] if isinstance(df.index, pd.MultiIndex) else None
+        if level is not None and pd.api.types.is_string_dtype(level):
+            # String levels are saved with the MultiIndex codes as the
+            # dictionary indices, without creating the full column of strings
+            codes = df.index.codes[i]
+            arrays.append(
+                pa.DictionaryArray.from_arrays(
+                    pa.array(np.where(codes < 0, 0, codes), type=pa.int32()),
+                    pa.array(level, type=pa.string()),
+                    mask=codes < 0 if (codes < 0).any() else None,
+                )
+            )
+        else:
+            values = df.index.get_level_values(i)
+            if pd.api.types.is_string_dtype(values):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values))
+    data_columns = [str(column) for column in df.columns]
+    for column in df.columns:
+        arrays.append(pa.array(df[column]))
+
+    table = pa.Table.from_arrays(arrays, names=index_columns + data_columns)
+    table = table.replace_schema_metadata(
+        {
+            "marmot": json.dumps(
+                {
+                    "index_names": index_names,
+                    "index_columns": index_columns,
+                    "columns": list(df.columns),
+                    "columns_dtype": str(df.columns.dtype),
+                },
+                default=str,
+            )
+        }
+    )
+
+    write_options = dict(compression="none")
+    if complevel:
+        write_options["compression"] = PARQUET_COMPRESSION.get(complib, "zstd")
+        if write_options["compression"] in ("zstd", "gzip", "brotli"):
+            write_options["compression_level"] = complevel
+
+    # Files are named by time saved, so are read back in the order they were saved
+    file_name = f"part-{time.time_ns()}.parquet"
+    if "timestamp" in index_names and len(df) > 0:
+        years = np.asarray(df.index.get_level_values("timestamp").year)
+        for year in np.unique(years):
+            year_folder = key_folder.joinpath(f"year={year}")
+            year_folder.mkdir(parents=True, exist_ok=True)
+            year_table = table.filter(pa.array(years == year))
+            pq.write_table(
+                year_table, year_folder.joinpath(file_name), **write_options
+            )
+    else:
+        key_folder.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, key_folder.joinpath(file_name), **write_options)
+
+
+def read_parquet_property(key_folder: Path, columns: list = None) -> pd.DataFrame:
+    """Reads a formatted property from its parquet dataset folder.
+
+    Files are read with multiple threads. Dictionary encoded index columns are
+    converted directly to MultiIndex levels and codes.
+
+    Args:
+        key_folder (Path): Folder of property.
+        columns (list, optional): Data columns to read, index levels are
+            always read.
+            Defaults to None, which reads all columns.
+
+    Returns:
+        pd.DataFrame: Formatted property data.
+    """
+    files = _parquet_files(key_folder)
+    if not files:
+        return pd.DataFrame()
+    schema = pq.read_schema(files[0])
+    saved = json.loads(schema.metadata[b"marmot"])
+    data_columns = saved["columns"]
+    if columns is not None:
+        data_columns = [column for column in data_columns if column in columns]
+
+    dataset = ds.dataset([str(file) for file in files], format="parquet")
+    table = dataset.to_table(
+        columns=saved["index_columns"] + [str(column) for column in data_columns],
+        use_threads=True,
+    )
+    table = table.unify_dictionaries().combine_chunks()
+
+    levels = []
+    codes = []
+    for column in saved["index_columns"]:
+        array = table.column(column)
+        array = array.chunk(0) if array.num_chunks else pa.array([], array.type)
+        if pa.types.is_dictionary(array.type):
+            levels.append(pd.Index(array.dictionary.to_pandas()))
+            codes.append(array.indices.fill_null(-1).to_numpy(zero_copy_only=False))
+        else:
+            level_codes, level = pd.factorize(array.to_pandas(), sort=True)
+            levels.append(pd.Index(level))
+            codes.append(level_codes)
+    if len(levels) > 1:
+        index = pd.MultiIndex(
+            levels=levels,
+            codes=codes,
+            names=saved["index_names"],
+            verify_integrity=False,
+        )
+    else:
+        index = levels[0].take(codes[0])
+        index.name = saved["index_names"][0]
+
+    df = table.select([str(column) for column in data_columns]).to_pandas(
+        use_threads=True
+    )
+    df.columns = pd.Index(data_columns, dtype=saved["columns_dtype"])
+    df.index = index
+    return df
+
+
+def read_formatted_property(
+    file_name: Path, key: str, columns: list = None
+) -> pd.DataFrame:
+    """Reads a formatted property, from whichever storage backend it was saved with.
+
+    Args:
+        file_name (Path): Path to formatted h5 file, e.g <scenario>_formatted.h5
+        key (str): formatted property identifier, e.g generator_Generation
+        columns (list, optional): Data columns to read. Only the requested
+            columns are read from parquet datasets.
+            Defaults to None, which reads all columns.
+
+    Raises:
+        KeyError: If the property has not been saved.
+
+    Returns:
+        pd.DataFrame: Formatted property data.
+    """
+    key_folder = parquet_dataset_path(file_name).joinpath(key)
+    if key_folder.is_dir():
+        if pa is None:
+            raise ModuleNotFoundError(
+                f"pyarrow is required to read {key}, which was saved "
+                f"with the parquet storage backend\n{PYARROW_ERROR}"
+            )
+        return read_parquet_property(key_folder, columns)
+
+    with FormattedH5Session(file_name, mode="r") as session:
+        df = session.get(key)
+    if columns is not None:
+        df = df[[column for column in df.columns if column in columns]]
+    return df
+
+
+def read_formatted_wide(file_name: Path, key: str) -> WideProperty:
+    """Reads a formatted property as a timestamps x objects matrix.
+
+    Properties saved in the wide matrix layout are read directly, others are
+    converted from the long layout.
+
+    Args:
+        file_name (Path): Path to formatted h5 file, e.g <scenario>_formatted.h5
+        key (str): formatted property identifier, e.g generator_Generation
+
+    Raises:
+        KeyError: If the property has not been saved.
+
+    Returns:
+        WideProperty: Formatted property in the wide layout, None if it cannot
+        be converted, e.g it has no timestamp.
+    """
+    if not parquet_dataset_path(file_name).joinpath(key).is_dir():
+        with FormattedH5Session(file_name, mode="r") as session:
+            if session.is_wide(key):
+                return session.get_wide(key)
+    return WideProperty.from_long(
+        read_formatted_property(file_name, key), min_density=0
+    )
+
+
+class FormattedParquetSession(FormattedH5Session):
+    """FormattedH5Session which saves formatted properties to a parquet dataset.
+
+    Metadata and the manifest are saved in the formatted h5 file, all other
+    keys are saved to the parquet dataset folder of the formatted h5 file.
+    Properties previously saved in the formatted h5 file are read from it
+    until they are saved again.
+
+    Compression settings are converted to the nearest parquet codec,
+    see PARQUET_COMPRESSION.
+    """
+
+    def __init__(
+        self,
+        file_name: Path,
+        mode: str = "a",
+        complevel: int = 9,
+        complib: str = "blosc:zlib",
+        shuffle: bool = True,
+    ):
+        """
+        Args:
+            file_name (Path): name of hdf5 file, created if it does not exist.
+                The parquet dataset is saved to a folder with the same name
+                and a .parquet suffix.
+            mode (str, optional): file access mode.
+                Defaults to "a".
+            complevel (int, optional): default compression level.
+                Defaults to 9.
+            complib (str, optional): default compression library.
+                Defaults to 'blosc:zlib'.
+            shuffle (bool, optional): default byte shuffle setting,
+                only used for keys saved in the h5 file.
+                Defaults to True.
+        """
+        if pa is None:
+            raise ModuleNotFoundError(
+                "pyarrow is required by the parquet storage backend\n"
+                f"{PYARROW_ERROR}"
+            )
+        super().__init__(
+            file_name,
+            mode=mode,
+            complevel=complevel,
+            complib=complib,
+            shuffle=shuffle,
+        )
+        self.dataset_folder = parquet_dataset_path(file_name)
+        if mode == "w":
+            shutil.rmtree(self.dataset_folder, ignore_errors=True)
+        self._parquet_keys = set()
+        if self.dataset_folder.is_dir():
+            self._parquet_keys = {
+                key_folder.name
+                for key_folder in self.dataset_folder.iterdir()
+                if key_folder.is_dir() and _parquet_files(key_folder)
+            }
+        self._keys.update(self._parquet_keys)
+
+    def put(
+        self,
+        df: pd.DataFrame,
+        key: str,
+        append: bool = False,
+        complevel: int = None,
+        complib: str = None,
+        shuffle: bool = None,
+        **kwargs,
+    ) -> None:
+        """Saves a dataframe to the parquet dataset, or the formatted h5 file
+        for metadata and the manifest.
+
+        Args:
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            append (bool, optional): Append to an existing key.
+                Defaults to False.
+            complevel (int, optional): compression level.
+                Defaults to None, the session complevel.
+            complib (str, optional): compression library.
+                Defaults to None, the session complib.
+            shuffle (bool, optional): byte shuffle setting of keys saved in the
+                h5 file.
+                Defaults to None, the session shuffle setting.
+            **kwargs
+                These parameters will be passed to pandas.HDFStore.put or
+                pandas.HDFStore.append for keys saved in the h5 file,
+                and are otherwise ignored.
+        """
+        key = key.strip("/")
+        if key.split("/")[0] in H5_ONLY_KEYS:
+            super().put(
+                df,
+                key,
+                append=append,
+                complevel=complevel,
+                complib=complib,
+                shuffle=shuffle,
+                **kwargs,
+            )
+            return
+
+        key_folder = self.dataset_folder.joinpath(key)
+        with self._lock:
+            if not append:
+                shutil.rmtree(key_folder, ignore_errors=True)
+            write_parquet_property(
+                df,
+                key_folder,
+                complevel=self.complevel if complevel is None else complevel,
+                complib=complib or self.complib,
+            )
+            # Remove any copy saved in the h5 file by the hdf5 backend
+            if key in self._store:
+                self._store.remove(key)
+            self._parquet_keys.add(key)
+            self._keys.add(key)
+
+    def put_wide(self, df: pd.DataFrame, key: str, **kwargs) -> bool:
+        """Parquet datasets are already columnar with dictionary encoded
+        index levels, so properties are always saved in the long layout.
+
+        Args:
+            df (pd.DataFrame): Formatted property in the long layout.
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            **kwargs
+                Compression settings, not used.
+
+        Returns:
+            bool: False, the property is not saved.
+        """
+        return False
+
+    def get(self, key: str) -> pd.DataFrame:
+        """Reads a key from the parquet dataset or formatted h5 file.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            pd.DataFrame: Saved data
+        """
+        key = key.strip("/")
+        if key in self._parquet_keys:
+            with self._lock:
+                return read_parquet_property(self.dataset_folder.joinpath(key))
+        return super().get(key)
+
+    def remove(self, key: str) -> None:
+        """Removes a key from the parquet dataset and formatted h5 file,
+        if it exists.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+        """
+        key = key.strip("/")
+        with self._lock:
+            if key in self._parquet_keys:
+                shutil.rmtree(self.dataset_folder.joinpath(key), ignore_errors=True)
+                self._parquet_keys.discard(key)
+            super().remove(key)
+
+    def is_table(self, key: str) -> bool:
+        """Checks if a key can be appended to, parquet keys always can be.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            bool: True if the key can be appended to
+        """
+        if key.strip("/") in self._parquet_keys:
+            return True
+        return super().is_table(key)
+
+    def select_column(self, key: str, column: str) -> pd.Series:
+        """Reads a single column or index level of a key.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            column (str): Name of column or index level, e.g timestamp
+
+        Returns:
+            pd.Series: Column values
+        """
+        key = key.strip("/")
+        if key in self._parquet_keys:
+            files = _parquet_files(self.dataset_folder.joinpath(key))
+            with self._lock:
+                table = ds.dataset([str(file) for file in files], format="parquet")
+                return table.to_table(columns=[str(column)]).column(0).to_pandas()
+        return super().select_column(key, column)
+
+
+STORAGE_BACKENDS = {"hdf5": FormattedH5Session, "parquet": None}
+"""Session classes of each storage backend, None if a required module is missing"""
+if pa is not None:
+    STORAGE_BACKENDS["parquet"] = FormattedParquetSession
+
+
+def open_formatted_session(
+    file_name: Path, storage_backend: str = "hdf5", **kwargs
+) -> FormattedH5Session:
+    """Opens a session of the formatted h5 file with a storage backend.
+
+    Args:
+        file_name (Path): name of hdf5 file, created if it does not exist.
+        storage_backend (str, optional): Name of storage backend,
+            hdf5 or parquet.
+            Defaults to "hdf5".
+        **kwargs
+            These parameters will be passed to the session class,
+            e.g mode, complevel, complib.
+
+    Raises:
+        ValueError: If there is no storage backend with the given name.
+        ModuleNotFoundError: If a module required by the backend is missing.
+
+    Returns:
+        FormattedH5Session: Open session
+    """
+    if storage_backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"No storage backend named {storage_backend}, "
+            f"choose from {list(STORAGE_BACKENDS)}"
+        )
+    session_class = STORAGE_BACKENDS[storage_backend]
+    if session_class is None:
+        raise ModuleNotFoundError(
+            f"pyarrow is required by the {storage_backend} storage backend\n"
+            f"{PYARROW_ERROR}"
+        )
+    return session_class(file_name, **kwargs)
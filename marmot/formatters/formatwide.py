@@ -0,0 +1,196 @@
+"""Wide matrix layout of formatted timeseries properties.
+
+In the long layout a formatted property is a single column on a MultiIndex of
+timestamp, object attributes (tech, gen_name, region, zone, ...) and units,
+with the object attributes repeated on every row. In the wide layout the same
+data is saved as:
+
+- a dense matrix of timestamps x objects, in the dtype of the property
+- an object attribute table, with one row per matrix column
+- a fixed frequency time axis, saved as its start, frequency and length
+
+WideProperty converts between the two layouts.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("formatter." + __name__)
+
+
+@dataclass
+class WideProperty:
+    """Formatted property in the wide matrix layout."""
+
+    values: np.ndarray
+    """Matrix of shape (timestamps, objects) in the dtype of the property, NaN
+    where an object has no data at a timestamp"""
+    objects: pd.DataFrame
+    """Attributes of each object, one row per matrix column"""
+    timestamps: pd.DatetimeIndex
+    """Fixed frequency time axis, one entry per matrix row"""
+    index_names: List[str]
+    """Index level names of the long layout, in order"""
+    column: object = 0
+    """Name of the data column of the long layout"""
+    dtype: str = "float64"
+    """dtype of the data column of the long layout"""
+
+    @classmethod
+    def from_long(
+        cls, df: pd.DataFrame, min_density: float = 0.5
+    ) -> "WideProperty":
+        """Converts a formatted property in the long layout to the wide layout.
+
+        Args:
+            df (pd.DataFrame): Formatted property with a timestamp index level.
+            min_density (float, optional): Min fraction of the matrix which
+                must contain data. Sparse properties are smaller in the long layout.
+                Defaults to 0.5.
+
+        Returns:
+            WideProperty: Property in the wide layout, None if the property
+            cannot be saved in the wide layout.
+        """
+        index_names = list(df.index.names)
+        if (
+            df.empty
+            or len(df.columns) != 1
+            or len(index_names) < 2
+            or "timestamp" not in index_names
+            or None in index_names
+            or len(set(index_names)) != len(index_names)
+            or not pd.api.types.is_float_dtype(df.iloc[:, 0])
+        ):
+            return None
+        data = df.iloc[:, 0].to_numpy()
+        # NaN marks missing data in the matrix
+        if np.isnan(data).any():
+            return None
+
+        index = df.index
+        timestamp_level = index_names.index("timestamp")
+        if (index.codes[timestamp_level] < 0).any():
+            return None
+        # Timestamps sorted, excluding unused levels
+        order = index.levels[timestamp_level].argsort()
+        used = np.bincount(
+            index.codes[timestamp_level], minlength=len(order)
+        ).astype(bool)
+        order = order[used[order]]
+        timestamps = index.levels[timestamp_level][order]
+        if len(timestamps) > 1:
+            steps = np.diff(timestamps.asi8)
+            if (steps != steps[0]).any():
+                logger.debug("Timestamps are not a fixed frequency")
+                return None
+        rank = np.full(len(used), -1, dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        timestamp_codes = rank[index.codes[timestamp_level]]
+
+        # Objects are numbered by combining the codes of their index levels
+        object_codes = np.zeros(len(df), dtype=np.int64)
+        combined_size = 1
+        for i, name in enumerate(index_names):
+            if name == "timestamp":
+                continue
+            level_size = len(index.levels[i]) + 1
+            if combined_size * level_size > 2**62:
+                object_codes, uniques = pd.factorize(object_codes)
+                combined_size = len(uniques)
+            object_codes = object_codes * level_size + index.codes[i] + 1
+            combined_size *= level_size
+        object_codes, uniques = pd.factorize(object_codes)
+        n_objects = len(uniques)
+        if len(df) < min_density * len(timestamps) * n_objects:
+            logger.debug("Property is too sparse for the wide layout")
+            return None
+        positions = timestamp_codes * n_objects + object_codes
+        filled = np.zeros(len(timestamps) * n_objects, dtype=bool)
+        filled[positions] = True
+        if np.count_nonzero(filled) != len(df):
+            logger.debug("Property has duplicate entries")
+            return None
+
+        # The matrix keeps the dtype of the data, so values are saved exactly
+        values = np.full((len(timestamps), n_objects), np.nan, dtype=data.dtype)
+        values.flat[positions] = data
+        first_rows = pd.Series(object_codes).drop_duplicates().index
+        objects = (
+            index.droplevel("timestamp")[first_rows]
+            .to_frame(index=False)
+            .reset_index(drop=True)
+        )
+        return cls(
+            values=values,
+            objects=objects,
+            timestamps=pd.DatetimeIndex(timestamps, name="timestamp"),
+            index_names=index_names,
+            column=df.columns[0],
+            dtype=str(data.dtype),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Gets the matrix as a dataframe, with a timestamp index and the
+        object attributes as MultiIndex columns.
+
+        Object attributes can then be aggregated directly,
+        e.g df.T.groupby(level="tech").sum().T
+
+        Returns:
+            pd.DataFrame: timestamps x objects dataframe
+        """
+        return pd.DataFrame(
+            self.values,
+            index=self.timestamps,
+            columns=pd.MultiIndex.from_frame(self.objects),
+        )
+
+    def to_long(self) -> pd.DataFrame:
+        """Rebuilds the formatted property in the long layout.
+
+        Rows are ordered by timestamp, then object. Timestamps where an object
+        has no data are not included.
+
+        Returns:
+            pd.DataFrame: Formatted property in the long layout.
+        """
+        n_timestamps, n_objects = self.values.shape
+        missing = np.isnan(self.values)
+        if missing.any():
+            timestamp_rows, object_columns = np.nonzero(~missing)
+            values = self.values[timestamp_rows, object_columns]
+        else:
+            timestamp_rows = np.repeat(
+                np.arange(n_timestamps, dtype=np.min_scalar_type(n_timestamps)),
+                n_objects,
+            )
+            object_columns = np.tile(np.arange(n_objects), n_timestamps)
+            values = self.values.ravel()
+        levels = []
+        codes = []
+        for name in self.index_names:
+            if name == "timestamp":
+                levels.append(self.timestamps)
+                codes.append(timestamp_rows)
+            else:
+                level_codes, level = pd.factorize(self.objects[name])
+                levels.append(level)
+                codes.append(
+                    level_codes.astype(np.min_scalar_type(-len(level)))[object_columns]
+                )
+        index = pd.MultiIndex(
+            levels=levels,
+            codes=codes,
+            names=self.index_names,
+            verify_integrity=False,
+        )
+        return pd.DataFrame(
+            values.astype(self.dtype),
+            index=index,
+            columns=pd.Index([self.column], dtype=object),
+        )
@@ -13,12 +13,15 @@ it can be read into the marmot_plot_main.py file
 # Import Python Libraries
 # =======================================================================================
 
+import re
 import sys
 from pathlib import Path
 import time
-from typing import Union
+import concurrent.futures
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, List, Union
 import pandas as pd
-import h5py
 
 try:
     import marmot.utils.mconfig as mconfig
@@ -30,7 +33,24 @@ except ModuleNotFoundError:
 from marmot.utils.definitions import INPUT_DIR, PLEXOS_YEAR_WARNING
 from marmot.utils.loggersetup import SetupLogger
 from marmot.formatters import PROCESS_LIBRARY
+from marmot.formatters.formatbase import Process
+from marmot.formatters.formatparallel import PartitionPool, PropertyPool
+from marmot.formatters.formatoutput import (
+    FormattedH5Session,
+    FormattedH5Writer,
+    get_compression,
+)
+from marmot.formatters.formatcache import ProcessedDataCache
 from marmot.formatters.formatextra import ExtraProperties
+from marmot.formatters.formatscheduler import PropertyScheduler
+from marmot.formatters.formatmanifest import FormatManifest, frame_digest
+from marmot.formatters.formatstorage import open_formatted_session
+from marmot.formatters.formatrollup import (
+    ROLLUP_SEPARATOR,
+    create_rollups,
+    is_rollup_key,
+)
+from marmot.formatters.formatpyramid import PyramidBuilder, create_pyramid
 
 # A bug in pandas requires this to be included,
 # otherwise df.to_string truncates long strings. Fix available in Pandas 1.0
@@ -162,18 +182,116 @@ class MarmotFormat(SetupLogger):
                     inplace=True,
                 )
 
+        # Cache of processed partition data, shared by all runs of this instance
+        self.processed_data_cache = None
+        if formatter_settings["processed_data_cache_mb"] > 0:
+            self.processed_data_cache = ProcessedDataCache(
+                int(formatter_settings["processed_data_cache_mb"] * 1e6),
+                spill_directory=formatter_settings["processed_data_cache_dir"],
+            )
+
+    def get_process_class(self, sim_model: str) -> type:
+        """Gets the Process class of a simulation model.
+
+        Exits if there is no Process class for the model, or a module
+        it requires is not installed.
+
+        Args:
+            sim_model (str): Name of simulation model, e.g PLEXOS
+
+        Returns:
+            type: model specific Process class, e.g ProcessPLEXOS
+        """
+        try:
+            process_class = PROCESS_LIBRARY[sim_model]
+            if process_class is None:
+                self.logger.error(
+                    "A required module was not found to " f"process {sim_model} results"
+                )
+                self.logger.error(PROCESS_LIBRARY["Error"])
+                sys.exit()
+        except KeyError:
+            self.logger.error(f"No formatter found for model: {sim_model}")
+            sys.exit()
+        return process_class
+
+    def get_property_rows(self, process_sim_model: Process) -> list:
+        """Gets the properties to collect from the Properties_File.
+
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+
+        Returns:
+            list: list of (row, key_path, property_key_name) of each property
+            with collect_data set to True.
+        """
+        process_properties = self.Properties_File.loc[
+            self.Properties_File["collect_data"] == True
+        ]
+        property_rows = []
+        for _, row in process_properties.iterrows():
+            prop_underscore = row["data_set"].replace(" ", "_")
+            key_path = row["group"] + "_" + prop_underscore
+            # Get name to save property as in formatted h5 file
+            property_key_name = process_sim_model.PROPERTY_MAPPING.get(
+                key_path, key_path
+            )
+            property_rows.append((row, key_path, property_key_name))
+        return property_rows
+
+    def create_manifest(
+        self,
+        output_session: FormattedH5Session,
+        sim_model: str,
+        plexos_block: str,
+        process_subset_years: list = None,
+    ) -> FormatManifest:
+        """Loads the manifest of the formatted h5 file, with the settings of this run.
+
+        Args:
+            output_session (FormattedH5Session): Open session of the formatted h5 file.
+            sim_model (str): Name of simulation model.
+            plexos_block (str): PLEXOS results type.
+            process_subset_years (list, optional): Years processed.
+                Defaults to None.
+
+        Returns:
+            FormatManifest: manifest of formatted h5 file
+        """
+        return FormatManifest(
+            output_session,
+            settings=dict(
+                sim_model=sim_model,
+                plexos_block=plexos_block,
+                process_subset_years=process_subset_years,
+                VoLL=formatter_settings["VoLL"],
+                exclude_pumping_from_reeds_storage_gen=formatter_settings[
+                    "exclude_pumping_from_reeds_storage_gen"
+                ],
+                Region_Mapping=frame_digest(self.Region_Mapping),
+                emit_names=frame_digest(self.emit_names),
+            ),
+            hash_input_files=formatter_settings["hash_input_files"],
+        )
+
     def save_to_h5(
         self,
         df: pd.DataFrame,
         file_name: Path,
         key: str,
         mode: str = "a",
-        complevel: int = 9,
-        complib: str = "blosc:zlib",
+        complevel: int = None,
+        complib: str = None,
+        shuffle: bool = None,
+        output_session: FormattedH5Session = None,
         **kwargs,
     ) -> None:
         """Saves data to formatted hdf5 file
 
+        If an output_session is passed the data is saved through the already
+        open file, otherwise the file is opened for this save only.
+
         Args:
             df (pd.DataFrame): Dataframe to save
             file_name (Path): name of hdf5 file
@@ -182,24 +300,400 @@ class MarmotFormat(SetupLogger):
             mode (str, optional): file access mode.
                 Defaults to "a".
             complevel (int, optional): compression level.
-                Defaults to 9.
+                Defaults to None, the compression setting of the key.
             complib (str, optional): compression library.
-                Defaults to 'blosc:zlib'.
+                Defaults to None, the compression setting of the key.
+            shuffle (bool, optional): byte shuffle data before compression.
+                Defaults to None, the compression setting of the key.
+            output_session (FormattedH5Session, optional): Open session of
+                the formatted h5 file, file_name and mode are ignored if passed.
+                Defaults to None.
             **kwargs
-                These parameters will be passed pandas.to_hdf function.
+                These parameters will be passed to the put method of the
+                session, e.g format='table'.
         """
+        compression = get_compression(formatter_settings["compression"], key)
+        if complevel is not None:
+            compression["complevel"] = complevel
+        if complib is not None:
+            compression["complib"] = complib
+        if shuffle is not None:
+            compression["shuffle"] = shuffle
+
         self.logger.info("Saving data to h5 file...")
-        df.to_hdf(
-            file_name,
-            key=key,
-            mode=mode,
-            complevel=complevel,
-            complib=complib,
-            **kwargs,
-        )
+        if output_session is not None:
+            self._save_property(output_session, df, key, compression, **kwargs)
+        else:
+            with open_formatted_session(
+                file_name, formatter_settings["storage_backend"], mode=mode
+            ) as session:
+                self._save_property(session, df, key, compression, **kwargs)
 
         self.logger.info("Data saved to h5 file successfully\n")
 
+    def _save_property(
+        self,
+        session: FormattedH5Session,
+        df: pd.DataFrame,
+        key: str,
+        compression: dict,
+        **kwargs,
+    ) -> None:
+        """Saves data with an open session, along with its spatial rollups
+        and temporal pyramid if enabled.
+
+        Rollups and pyramid resolutions saved with a previous version of the
+        property are removed when the property is replaced, so they are never
+        out of date. Table format saves are appended one partition at a time,
+        so their pyramid is built from each partition and saved separately once
+        all partitions are saved, see create_pyramid_builder.
+
+        Args:
+            session (FormattedH5Session): Open session of the formatted h5 file.
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            compression (dict): complevel, complib and shuffle settings
+            **kwargs
+                These parameters will be passed to the put method of the
+                session, e.g format='table'.
+        """
+        self._put(session, df, key, compression, **kwargs)
+        if is_rollup_key(key):
+            return
+        if not kwargs.get("append", False):
+            for existing_key in session.keys():
+                if existing_key.startswith(f"{key}{ROLLUP_SEPARATOR}"):
+                    session.remove(existing_key)
+        if formatter_settings["spatial_rollups"]:
+            rollups = create_rollups(df, key, self.Region_Mapping.columns)
+            for rollup_name, rollup in rollups.items():
+                rollup_kwargs = dict(kwargs)
+                if kwargs.get("min_itemsize"):
+                    rollup_kwargs["min_itemsize"] = {
+                        name: size
+                        for name, size in kwargs["min_itemsize"].items()
+                        if name in rollup.index.names
+                    }
+                self._put(session, rollup, rollup_name, compression, **rollup_kwargs)
+        if kwargs.get("format", "fixed") != "table":
+            pyramid = self.create_temporal_pyramid(df, key)
+            for pyramid_name, resampled in pyramid.items():
+                self._put(session, resampled, pyramid_name, compression)
+
+    def create_temporal_pyramid(
+        self, df: pd.DataFrame, key: str
+    ) -> Dict[str, pd.DataFrame]:
+        """Creates the temporal pyramid of a property, if enabled.
+
+        Args:
+            df (pd.DataFrame): All data of the property.
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            Dict[str, pd.DataFrame]: {pyramid key: aggregated data}, empty if
+            the temporal_pyramid setting is off.
+        """
+        if not formatter_settings["temporal_pyramid"]:
+            return {}
+        return create_pyramid(
+            df,
+            key,
+            self.Region_Mapping.columns,
+            rollups=formatter_settings["spatial_rollups"],
+        )
+
+    def create_pyramid_builder(self, key: str) -> PyramidBuilder:
+        """Creates a builder of the temporal pyramid of a property which is
+        saved one chunk of time at a time, if enabled.
+
+        Args:
+            key (str): formatted property identifier,
+                e.g generator_Generation
+
+        Returns:
+            PyramidBuilder: Pyramid builder, None if the temporal_pyramid
+            setting is off.
+        """
+        if not formatter_settings["temporal_pyramid"]:
+            return None
+        return PyramidBuilder(
+            key,
+            self.Region_Mapping.columns,
+            rollups=formatter_settings["spatial_rollups"],
+        )
+
+    @staticmethod
+    def _put(
+        session: FormattedH5Session,
+        df: pd.DataFrame,
+        key: str,
+        compression: dict,
+        **kwargs,
+    ) -> None:
+        """Saves data with an open session, in the wide matrix layout if enabled.
+
+        Table format saves, which are appended to one partition at a time,
+        always use the long layout.
+
+        Args:
+            session (FormattedH5Session): Open session of the formatted h5 file.
+            df (pd.DataFrame): Dataframe to save
+            key (str): formatted property identifier,
+                e.g generator_Generation
+            compression (dict): complevel, complib and shuffle settings
+            **kwargs
+                These parameters will be passed to the put method of the
+                session, e.g format='table'.
+        """
+        if (
+            formatter_settings["wide_layout"]
+            and kwargs.get("format", "fixed") != "table"
+            and not kwargs.get("append", False)
+            and session.put_wide(df, key=key, **compression)
+        ):
+            return
+        session.put(df, key=key, **compression, **kwargs)
+
+    def get_partition_files(
+        self, row: pd.Series, files_list: list, sim_model: str = "PLEXOS"
+    ) -> list:
+        """Gets the model partitions to process for a property.
+
+        PLEXOS Year capacity properties are the same in every partition,
+        so these are only reported from the first partition.
+
+        Args:
+            row (pd.Series): Properties_File row of property to process.
+            files_list (list): list of model input filenames.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+
+        Returns:
+            list: list of model input filenames to process.
+        """
+        # Check if data is for year interval and of type capacity
+        if (
+            row["data_type"] == "year"
+            and sim_model == "PLEXOS"
+            and row["data_set"]
+            in ("Installed Capacity", "Export Limit", "Import Limit")
+        ):
+            self.logger.info(
+                f"{row['data_set']} Year property reported "
+                "from only the first partition"
+            )
+            return files_list[:1]
+        return files_list
+
+    def get_partition_data(
+        self,
+        process_sim_model: Process,
+        row: pd.Series,
+        files_list: list,
+        sim_model: str = "PLEXOS",
+        partition_pool: PartitionPool = None,
+    ) -> list:
+        """Gets the processed data of a single property for each model partition.
+
+        If a partition_pool is passed, partitions are processed in parallel,
+        otherwise they are processed one at a time.
+
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            row (pd.Series): Properties_File row of property to process.
+            files_list (list): list of model input filenames.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+            partition_pool (PartitionPool, optional): Pool of worker processes
+                used to process partitions in parallel.
+                Defaults to None.
+
+        Returns:
+            list: list of processed dataframes in partition order.
+        """
+        files_list = self.get_partition_files(row, files_list, sim_model)
+
+        if partition_pool is None:
+            return process_sim_model.get_partition_data(
+                row["group"], row["data_set"], row["data_type"], files_list
+            )
+
+        data_chunks = []
+        for processed_data in partition_pool.get_processed_data(
+            row["group"], row["data_set"], row["data_type"], files_list
+        ):
+            data_chunks.append(processed_data)
+            if processed_data.empty is True:
+                break
+        return data_chunks
+
+    @staticmethod
+    def table_min_itemsize(df: pd.DataFrame) -> dict:
+        """Gets the min_itemsize of the string index levels of a table format key.
+
+        Table columns are fixed width, room is left for longer names
+        in later partitions.
+
+        Args:
+            df (pd.DataFrame): First partition saved to the key.
+
+        Returns:
+            dict: {level name: min string length}
+        """
+        return {
+            name: max(32, 2 * int(level.str.len().max()))
+            for name, level in zip(df.index.names, df.index.levels)
+            if pd.api.types.is_string_dtype(level) and not level.empty
+        }
+
+    def stream_property_data(
+        self,
+        process_sim_model: Process,
+        row: pd.Series,
+        files_list: list,
+        property_key_name: str,
+        h5_writer: FormattedH5Writer,
+        sim_model: str = "PLEXOS",
+        partition_pool: PartitionPool = None,
+        pyramid_builder: PyramidBuilder = None,
+    ) -> int:
+        """Saves each partition of a property to the formatted h5 file as it is processed.
+
+        Partitions are appended to a table format key, after removing any
+        data which overlaps with the previous partition. Only one partition
+        is held in memory at a time (or one per worker if a partition_pool
+        is passed), instead of the whole property. Without a partition_pool,
+        partitions too large to format at once are appended in chunks of time,
+        see Process.iter_partition_chunks.
+
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            row (pd.Series): Properties_File row of property to process.
+            files_list (list): list of model input filenames.
+            property_key_name (str): formatted property identifier,
+                e.g generator_Generation
+            h5_writer (FormattedH5Writer): Writer used to save data.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+            partition_pool (PartitionPool, optional): Pool of worker processes
+                used to process partitions in parallel.
+                Defaults to None.
+            pyramid_builder (PyramidBuilder, optional): Each saved partition
+                is added to the temporal pyramid of the property.
+                Defaults to None.
+
+        Returns:
+            int: Number of rows saved.
+        """
+        files_list = self.get_partition_files(row, files_list, sim_model)
+        if partition_pool is None:
+            # Very large partitions can be processed in several chunks of time
+            processed_partitions = (
+                processed_chunk
+                for model in files_list
+                for processed_chunk in process_sim_model.iter_partition_chunks(
+                    row["group"], row["data_set"], row["data_type"], model
+                )
+            )
+        else:
+            processed_partitions = partition_pool.iter_processed_data(
+                row["group"], row["data_set"], row["data_type"], files_list
+            )
+
+        saved_rows = 0
+        trimmed_rows = 0
+        last_timestamp = None
+        min_itemsize = None
+        for processed_data in processed_partitions:
+            if processed_data.empty is True:
+                break
+            partition_rows = len(processed_data)
+            processed_data = process_sim_model.trim_partition_overlap(
+                processed_data, last_timestamp
+            )
+            trimmed_rows += partition_rows - len(processed_data)
+            if processed_data.empty is True:
+                continue
+            last_timestamp = processed_data.index.get_level_values("timestamp").max()
+
+            if min_itemsize is None:
+                min_itemsize = self.table_min_itemsize(processed_data)
+                h5_writer.write(
+                    processed_data,
+                    key=property_key_name,
+                    format="table",
+                    min_itemsize=min_itemsize,
+                )
+            else:
+                h5_writer.write(
+                    processed_data, key=property_key_name, format="table", append=True
+                )
+            saved_rows += len(processed_data)
+            if pyramid_builder is not None:
+                pyramid_builder.add(processed_data)
+            del processed_data
+
+        if trimmed_rows > 0:
+            self.logger.info(f"Partition overlap removed {trimmed_rows} rows")
+        return saved_rows
+
+    def save_property(
+        self,
+        Processed_Data_Out: pd.DataFrame,
+        row: pd.Series,
+        property_key_name: str,
+        h5_writer: FormattedH5Writer,
+        scheduler: PropertyScheduler,
+        sim_model: str = "PLEXOS",
+    ) -> None:
+        """Saves a processed property and creates any extra properties based on it.
+
+        Args:
+            Processed_Data_Out (pd.DataFrame): Combined property data.
+            row (pd.Series): Properties_File row of property.
+            property_key_name (str): formatted property identifier,
+                e.g generator_Generation
+            h5_writer (FormattedH5Writer): Writer used to save data.
+            scheduler (PropertyScheduler): Scheduler of extra properties.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+        """
+        if Processed_Data_Out.empty is False:
+            if row["data_type"] == "year" and sim_model == "PLEXOS":
+                self.logger.info(PLEXOS_YEAR_WARNING)
+            h5_writer.write(Processed_Data_Out, key=property_key_name)
+
+        self.save_extra_properties(
+            property_key_name, Processed_Data_Out, h5_writer, scheduler
+        )
+
+    def save_extra_properties(
+        self,
+        property_key_name: str,
+        Processed_Data_Out: pd.DataFrame,
+        h5_writer: FormattedH5Writer,
+        scheduler: PropertyScheduler,
+    ) -> None:
+        """Creates and saves the extra properties which are ready once a
+        property has been processed.
+
+        Args:
+            property_key_name (str): formatted property identifier,
+                e.g generator_Generation
+            Processed_Data_Out (pd.DataFrame): Combined property data,
+                None or empty if the property could not be processed.
+            h5_writer (FormattedH5Writer): Writer used to save data.
+            scheduler (PropertyScheduler): Scheduler of extra properties.
+        """
+        for prop_name, prop in scheduler.complete(
+            property_key_name, Processed_Data_Out
+        ):
+            h5_writer.write(prop, key=prop_name)
+
     def run_formatter(
         self,
         sim_model: str = "PLEXOS",
@@ -227,17 +721,7 @@ class MarmotFormat(SetupLogger):
         else:
             scen_name = self.Scenario_name
 
-        try:
-            process_class = PROCESS_LIBRARY[sim_model]
-            if process_class is None:
-                self.logger.error(
-                    "A required module was not found to " f"process {sim_model} results"
-                )
-                self.logger.error(PROCESS_LIBRARY["Error"])
-                sys.exit()
-        except KeyError:
-            self.logger.error(f"No formatter found for model: {sim_model}")
-            sys.exit()
+        process_class = self.get_process_class(sim_model)
 
         self.logger.info(f"#### Processing {scen_name} {sim_model} " "Results ####")
 
@@ -248,13 +732,15 @@ class MarmotFormat(SetupLogger):
 
         output_file_path = output_folder.joinpath(hdf5_output_name)
 
-        process_sim_model = process_class(
-            input_folder,
-            output_file_path,
+        process_kwargs = dict(
             plexos_block=plexos_block,
             process_subset_years=process_subset_years,
             Region_Mapping=self.Region_Mapping,
             emit_names=self.emit_names,
+            processed_data_cache=self.processed_data_cache,
+        )
+        process_sim_model = process_class(
+            input_folder, output_file_path, **process_kwargs
         )
 
         files_list = process_sim_model.get_input_files
@@ -265,174 +751,791 @@ class MarmotFormat(SetupLogger):
         # Process the Outputs
         # =====================================================================
 
-        # Creates Initial HDF5 file for outputting formated data
-        Processed_Data_Out = pd.DataFrame()
-        if output_file_path.is_file():
-            self.logger.info(
-                f"'{output_file_path}' already exists: New " "variables will be added\n"
-            )
-            # Skip properties that already exist in *formatted.h5 file.
-            with h5py.File(output_file_path, "r") as f:
-                existing_keys = [key for key in f.keys()]
-            # The processed HDF5 output file already exists. If metadata is already in
-            # this file, leave as is. Otherwise, append it to the file.
-            if "metadata" not in existing_keys:
-                self.logger.info("Adding metadata to processed HDF5 file.")
-                process_sim_model.output_metadata(files_list)
-
-            if not formatter_settings["skip_existing_properties"]:
+        # The formatted h5 file is held open for the whole run
+        output_file_exists = output_file_path.is_file()
+        with open_formatted_session(
+            output_file_path,
+            formatter_settings["storage_backend"],
+            **get_compression(formatter_settings["compression"]),
+        ) as output_session:
+            if output_file_exists:
+                self.logger.info(
+                    f"'{output_file_path}' already exists: New " "variables will be added\n"
+                )
+                # Skip properties that already exist in *formatted.h5 file.
+                existing_keys = output_session.keys()
+                # The processed HDF5 output file already exists. If metadata is already in
+                # this file, leave as is. Otherwise, append it to the file.
+                if "metadata" not in existing_keys:
+                    self.logger.info("Adding metadata to processed HDF5 file.")
+                    process_sim_model.output_metadata(files_list, output_session)
+
+                if not formatter_settings["skip_existing_properties"]:
+                    existing_keys = []
+
+            # The processed HDF5 file did not exist and was created by the session.
+            # Add metadata to it.
+            else:
                 existing_keys = []
+                process_sim_model.output_metadata(files_list, output_session)
+
+            # Manifest of the inputs each key was created from
+            manifest = self.create_manifest(
+                output_session, sim_model, plexos_block, process_subset_years
+            )
+            property_rows = self.get_property_rows(process_sim_model)
+            base_records = {}
+            for row, _, property_key_name in property_rows:
+                base_records[property_key_name] = manifest.property_record(
+                    row,
+                    [
+                        process_sim_model.input_file_path(model)
+                        for model in self.get_partition_files(
+                            row, files_list, sim_model
+                        )
+                    ],
+                )
+            expected_digests = manifest.expected_digests(
+                process_sim_model, base_records
+            )
 
-        # The processed HDF5 file does not exist.
-        # Create the file and add metadata to it.
+            # Existing keys whose inputs have changed are processed again
+            stale_keys, reprocess_keys = manifest.stale_keys(
+                expected_digests, existing_keys
+            )
+            if stale_keys:
+                self.logger.info(
+                    "Inputs have changed since these properties were formatted, "
+                    f"they will be processed again: {sorted(stale_keys)}\n"
+                )
+                existing_keys = [
+                    key
+                    for key in existing_keys
+                    if key not in stale_keys and key not in reprocess_keys
+                ]
+
+            # Properties to process, list of (row, property_key_name)
+            properties_to_process = []
+            for row, key_path, property_key_name in property_rows:
+                if property_key_name not in existing_keys:
+                    properties_to_process.append((row, property_key_name))
+                else:
+                    self.logger.info(f"{key_path} already exists in output .h5 file.")
+                    self.logger.info("PROPERTY ALREADY PROCESSED\n")
+
+            # Extra properties are created once the properties they depend on
+            # have been processed
+            scheduler = PropertyScheduler(
+                process_sim_model, extraprops_init, properties_to_process, existing_keys
+            )
+            properties_to_process = scheduler.ordered_properties()
+            process_sim_model.register_properties(
+                [row for row, _ in properties_to_process]
+            )
+
+            property_workers = formatter_settings["property_workers"]
+            partition_workers = formatter_settings["partition_workers"]
+            worker_pool = None
+            if property_workers > 1 and len(properties_to_process) > 1:
+                self.logger.info(
+                    f"Processing properties in parallel with {property_workers} workers"
+                )
+                worker_pool = PropertyPool(
+                    process_class,
+                    input_folder,
+                    output_file_path,
+                    process_kwargs,
+                    max_workers=min(property_workers, len(properties_to_process)),
+                )
+            elif partition_workers > 1 and len(files_list) > 1:
+                self.logger.info(
+                    f"Processing partitions in parallel with {partition_workers} workers"
+                )
+                worker_pool = PartitionPool(
+                    process_class,
+                    input_folder,
+                    output_file_path,
+                    process_kwargs,
+                    max_workers=min(partition_workers, len(files_list)),
+                )
+
+            start = time.time()
+            # Workers are shut down even if processing fails
+            worker_context = nullcontext() if worker_pool is None else worker_pool
+            # All data is saved to the output file through a single writer
+            with worker_context, FormattedH5Writer(
+                partial(self.save_to_h5, output_session=output_session),
+                output_file_path,
+            ) as h5_writer:
+                if isinstance(worker_pool, PropertyPool):
+                    future_properties = {}
+                    for row, property_key_name in properties_to_process:
+                        self.logger.info(f'Processing {row["group"]} {row["data_set"]}')
+                        future = worker_pool.submit_property(
+                            row["group"],
+                            row["data_set"],
+                            row["data_type"],
+                            self.get_partition_files(row, files_list, sim_model),
+                        )
+                        future_properties[future] = (row, property_key_name)
+                    # Save properties in the order they complete
+                    for future in concurrent.futures.as_completed(future_properties):
+                        row, property_key_name = future_properties.pop(future)
+                        self.logger.info(f'Processed {row["group"]} {row["data_set"]}')
+                        self.save_property(
+                            future.result(),
+                            row,
+                            property_key_name,
+                            h5_writer,
+                            scheduler,
+                            sim_model=sim_model,
+                        )
+                else:
+                    # Main loop to process each output and pass data to functions
+                    for row, property_key_name in properties_to_process:
+                        self.logger.info(f'Processing {row["group"]} {row["data_set"]}')
+                        if formatter_settings["stream_partitions"]:
+                            pyramid_builder = self.create_pyramid_builder(
+                                property_key_name
+                            )
+                            # A key left partially saved by a failed or
+                            # interrupted run is processed again by the next run
+                            manifest.mark_in_progress(property_key_name)
+                            saved_rows = self.stream_property_data(
+                                process_sim_model,
+                                row,
+                                files_list,
+                                property_key_name,
+                                h5_writer,
+                                sim_model=sim_model,
+                                partition_pool=worker_pool,
+                                pyramid_builder=pyramid_builder,
+                            )
+                            if saved_rows == 0:
+                                manifest.remove(property_key_name)
+                            if saved_rows > 0 and pyramid_builder is not None:
+                                # The pyramid is built from each partition as
+                                # it is saved, the property is not read back
+                                pyramid = pyramid_builder.create()
+                                for pyramid_name, resampled in pyramid.items():
+                                    h5_writer.write(resampled, key=pyramid_name)
+                            del pyramid_builder
+                            Processed_Data_Out = None
+                            if saved_rows > 0 and scheduler.needs_data(
+                                property_key_name
+                            ):
+                                # Extra properties require the whole property,
+                                # read it back once all partitions are saved
+                                h5_writer.flush()
+                                Processed_Data_Out = output_session.get(
+                                    property_key_name
+                                )
+                            self.save_extra_properties(
+                                property_key_name,
+                                Processed_Data_Out,
+                                h5_writer,
+                                scheduler,
+                            )
+                            del Processed_Data_Out
+                            continue
+                        data_chunks = self.get_partition_data(
+                            process_sim_model,
+                            row,
+                            files_list,
+                            sim_model=sim_model,
+                            partition_pool=worker_pool,
+                        )
+                        # Combine models
+                        Processed_Data_Out = process_sim_model.combine_models(data_chunks)
+                        self.save_property(
+                            Processed_Data_Out,
+                            row,
+                            property_key_name,
+                            h5_writer,
+                            scheduler,
+                            sim_model=sim_model,
+                        )
+                        del Processed_Data_Out
+
+            for key in h5_writer.saved_keys:
+                if key in expected_digests:
+                    manifest.update(key, *expected_digests[key])
+            # Existing keys without a record were saved before the manifest
+            # was added, these are assumed to be current
+            for key in existing_keys:
+                if key in expected_digests and key not in manifest.records:
+                    manifest.update(key, *expected_digests[key])
+            manifest.save()
+
+        end = time.time()
+        elapsed = end - start
+        self.logger.info("Main loop took %s minutes", round(elapsed / 60, 2))
+        self.logger.info(f"Formatting COMPLETED for {scen_name}")
+
+    def watch_formatter(
+        self,
+        sim_model: str = "PLEXOS",
+        plexos_block: str = "ST",
+        append_block_name: bool = False,
+        poll_interval: float = 60,
+        settle_time: float = 120,
+        idle_timeout: float = None,
+    ) -> None:
+        """Formats the partitions of a running simulation as they are written.
+
+        The scenario folder is checked for new partitions every poll_interval
+        seconds. Once a partition file has not been modified for settle_time
+        seconds, each property is processed for that partition and appended to
+        its table format key in the formatted h5 file, after removing any
+        overlap with the previous partition. Partitions are added in
+        alpha numeric order, so a partition is not added until all partitions
+        before it have been added.
+
+        The formatted h5 file is only open while partitions are being added, so
+        completed partitions can be plotted while the simulation is running.
+
+        Watching stops once no new partitions have been found for idle_timeout
+        seconds, or when interrupted with Ctrl+C. Extra properties,
+        e.g generator_Curtailment, are then created from the complete properties.
+
+        Args:
+            sim_model (str, optional): Name of simulation model to
+                process data for.
+                Defaults to 'PLEXOS'.
+            plexos_block (str, optional): PLEXOS results type.
+                Defaults to 'ST'.
+            append_block_name (bool, optional): Append block type to
+                scenario name.
+                Defaults to False.
+            poll_interval (float, optional): Seconds to wait between checks for
+                new partitions.
+                Defaults to 60.
+            settle_time (float, optional): Seconds since a partition file was last
+                modified before it is read.
+                Defaults to 120.
+            idle_timeout (float, optional): Stop watching once no new partitions
+                have been found for this many seconds.
+                Defaults to None, which watches until interrupted.
+        """
+        if append_block_name:
+            scen_name = f"{self.Scenario_name} {plexos_block}"
         else:
-            existing_keys = []
-            # Create empty hdf5 file
-            f = h5py.File(output_file_path, "w")
-            f.close()
-            process_sim_model.output_metadata(files_list)
+            scen_name = self.Scenario_name
 
-        process_properties = self.Properties_File.loc[
-            self.Properties_File["collect_data"] == True
-        ]
+        process_class = self.get_process_class(sim_model)
 
-        start = time.time()
-        # Main loop to process each output and pass data to functions
-        for index, row in process_properties.iterrows():
-            Processed_Data_Out = pd.DataFrame()
-            data_chunks = []
+        self.logger.info(f"#### Watching {scen_name} {sim_model} " "Results ####")
 
-            self.logger.info(f'Processing {row["group"]} {row["data_set"]}')
+        input_folder = self.Model_Solutions_folder.joinpath(str(self.Scenario_name))
+        output_folder = self.Marmot_Solutions_folder.joinpath("Processed_HDF5_folder")
+        output_folder.mkdir(exist_ok=True)
+        output_file_path = output_folder.joinpath(f"{scen_name}_formatted.h5")
 
-            prop_underscore = row["data_set"].replace(" ", "_")
-            key_path = row["group"] + "_" + prop_underscore
-            # Get name to save property as in formatted h5 file
-            property_key_name = process_sim_model.PROPERTY_MAPPING.get(
-                key_path, key_path
+        process_kwargs = dict(
+            plexos_block=plexos_block,
+            Region_Mapping=self.Region_Mapping,
+            emit_names=self.emit_names,
+            processed_data_cache=self.processed_data_cache,
+        )
+        process_sim_model = process_class(
+            input_folder, output_file_path, **process_kwargs
+        )
+        # Separate instance used to list input files, so only settled
+        # partitions are opened by process_sim_model
+        file_lister = process_class(input_folder, output_file_path, **process_kwargs)
+        property_rows = self.get_property_rows(process_sim_model)
+
+        # Partitions added to each key, continues from a previous watch or run
+        added_partitions: Dict[str, list] = {
+            property_key_name: [] for _, _, property_key_name in property_rows
+        }
+        if output_file_path.is_file():
+            with open_formatted_session(
+                output_file_path, formatter_settings["storage_backend"]
+            ) as output_session:
+                manifest = self.create_manifest(output_session, sim_model, plexos_block)
+                for property_key_name in added_partitions:
+                    saved = manifest.records.get(property_key_name)
+                    if saved is None or property_key_name not in output_session:
+                        continue
+                    if saved["digest"] == manifest.IN_PROGRESS:
+                        # Partially saved by an interrupted run, the key is
+                        # saved again from the first partition
+                        output_session.remove(property_key_name)
+                        continue
+                    added_partitions[property_key_name] = [
+                        Path(file["path"]).name for file in saved["record"]["files"]
+                    ]
+        last_timestamps = {}
+        pyramid_builders: Dict[str, PyramidBuilder] = {}
+
+        settled_files = []
+        last_added = time.time()
+        try:
+            while True:
+                file_lister.refresh_input_files()
+                now = time.time()
+                settled_files = []
+                for filename in file_lister.get_input_files:
+                    modified = file_lister.input_file_path(filename).stat().st_mtime
+                    if now - modified < settle_time:
+                        break
+                    settled_files.append(filename)
+
+                new_partitions = {
+                    key: [model for model in settled_files if model not in added]
+                    for key, added in added_partitions.items()
+                }
+                if any(new_partitions.values()):
+                    if process_sim_model.get_input_files != settled_files:
+                        process_sim_model.refresh_input_files(settled_files)
+                    self.add_partitions(
+                        process_sim_model,
+                        property_rows,
+                        new_partitions,
+                        added_partitions,
+                        last_timestamps,
+                        pyramid_builders,
+                        output_file_path,
+                        sim_model=sim_model,
+                        plexos_block=plexos_block,
+                    )
+                    last_added = time.time()
+                elif idle_timeout is not None and now - last_added > idle_timeout:
+                    self.logger.info(
+                        f"No new partitions found in {idle_timeout} seconds"
+                    )
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.logger.info("Watching stopped")
+
+        if settled_files:
+            process_sim_model.refresh_input_files(settled_files)
+            self.create_extra_properties(
+                process_sim_model,
+                property_rows,
+                output_file_path,
+                sim_model=sim_model,
+                plexos_block=plexos_block,
             )
+        self.logger.info(f"Formatting COMPLETED for {scen_name}")
 
-            if property_key_name not in existing_keys:
-                for model in files_list:
-                    processed_data = process_sim_model.get_processed_data(
-                        row["group"], row["data_set"], row["data_type"], model
-                    )
-                    if processed_data.empty is True:
-                        data_chunks.append(processed_data)
-                        break
+    def add_partitions(
+        self,
+        process_sim_model: Process,
+        property_rows: list,
+        new_partitions: Dict[str, list],
+        added_partitions: Dict[str, list],
+        last_timestamps: dict,
+        pyramid_builders: Dict[str, PyramidBuilder],
+        output_file_path: Path,
+        sim_model: str = "PLEXOS",
+        plexos_block: str = "ST",
+    ) -> None:
+        """Processes new partitions and appends them to the formatted h5 file.
+
+        Used by watch_formatter. Existing keys which were not saved in table
+        format are converted to table format so they can be appended to.
 
-                    # Check if data is for year interval and of type capacity
-                    if (
-                        row["data_type"] == "year"
-                        and sim_model == "PLEXOS"
-                        and (
-                            (row["data_set"] == "Installed Capacity")
-                            | (row["data_set"] == "Export Limit")
-                            | (row["data_set"] == "Import Limit")
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            property_rows (list): list of (row, key_path, property_key_name),
+                as returned by get_property_rows.
+            new_partitions (Dict[str, list]): New partitions to add to each key.
+            added_partitions (Dict[str, list]): Partitions already added to each
+                key, updated with the new partitions.
+            last_timestamps (dict): Last timestamp saved to each key, updated
+                with the new partitions.
+            pyramid_builders (Dict[str, PyramidBuilder]): Temporal pyramid
+                builder of each key, updated with the new partitions.
+            output_file_path (Path): Path to formatted h5 output file.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+            plexos_block (str, optional): PLEXOS results type.
+                Defaults to 'ST'.
+        """
+        with open_formatted_session(
+            output_file_path,
+            formatter_settings["storage_backend"],
+            **get_compression(formatter_settings["compression"]),
+        ) as output_session:
+            for model in process_sim_model.get_input_files:
+                if not output_session.has_node(f"metadata/{model}"):
+                    self.logger.info(f"Adding {model} metadata to processed HDF5 file.")
+                    process_sim_model.output_metadata([model], output_session)
+
+            manifest = self.create_manifest(output_session, sim_model, plexos_block)
+            for row, _, property_key_name in property_rows:
+                partition_files = self.get_partition_files(
+                    row, process_sim_model.get_input_files, sim_model
+                )
+                models = [
+                    model
+                    for model in new_partitions[property_key_name]
+                    if model in partition_files
+                ]
+                # Partitions the property is not reported from are never added
+                added_partitions[property_key_name].extend(
+                    model
+                    for model in new_partitions[property_key_name]
+                    if model not in partition_files
+                )
+                if not models:
+                    continue
+                self.logger.info(f'Processing {row["group"]} {row["data_set"]}')
+                existing_data = None
+                if (
+                    property_key_name in output_session
+                    and property_key_name not in last_timestamps
+                ):
+                    if not output_session.is_table(property_key_name):
+                        existing_data = output_session.get(property_key_name)
+                        self.save_to_h5(
+                            existing_data,
+                            output_file_path,
+                            key=property_key_name,
+                            format="table",
+                            min_itemsize=self.table_min_itemsize(existing_data),
+                            output_session=output_session,
                         )
+                    last_timestamps[property_key_name] = output_session.select_column(
+                        property_key_name, "timestamp"
+                    ).max()
+                pyramid_builder = pyramid_builders.get(property_key_name)
+                if pyramid_builder is None and formatter_settings["temporal_pyramid"]:
+                    pyramid_builder = self.create_pyramid_builder(property_key_name)
+                    if property_key_name in output_session:
+                        # Data saved before watching started is added once
+                        if existing_data is None:
+                            existing_data = output_session.get(property_key_name)
+                        pyramid_builder.add(existing_data)
+                    pyramid_builders[property_key_name] = pyramid_builder
+                del existing_data
+
+                for model in models:
+                    for processed_data in process_sim_model.iter_partition_chunks(
+                        row["group"], row["data_set"], row["data_type"], model
                     ):
-                        data_chunks.append(processed_data)
-                        self.logger.info(
-                            f"{row['data_set']} Year property reported "
-                            "from only the first partition"
+                        processed_data = process_sim_model.trim_partition_overlap(
+                            processed_data, last_timestamps.get(property_key_name)
                         )
-                        break
-                    else:
-                        data_chunks.append(processed_data)
-
-                # Combine models
-                Processed_Data_Out = process_sim_model.combine_models(data_chunks)
-                if Processed_Data_Out.empty is False:
-                    if row["data_type"] == "year" and sim_model == "PLEXOS":
-                        self.logger.info(PLEXOS_YEAR_WARNING)
-                    save_attempt = 1
-                    while save_attempt <= 3:
-                        try:
+                        if processed_data.empty is True:
+                            continue
+                        if property_key_name in output_session:
                             self.save_to_h5(
-                                Processed_Data_Out,
+                                processed_data,
                                 output_file_path,
                                 key=property_key_name,
+                                format="table",
+                                append=True,
+                                output_session=output_session,
                             )
-                            save_attempt = 4
-                        except OSError:
-                            self.logger.warning(
-                                "h5 File is probably in use, "
-                                "waiting to attempt to save again"
+                        else:
+                            self.save_to_h5(
+                                processed_data,
+                                output_file_path,
+                                key=property_key_name,
+                                format="table",
+                                min_itemsize=self.table_min_itemsize(processed_data),
+                                output_session=output_session,
                             )
-                            time.sleep(60)
-                            save_attempt += 1
+                        last_timestamps[
+                            property_key_name
+                        ] = processed_data.index.get_level_values("timestamp").max()
+                        if pyramid_builder is not None:
+                            pyramid_builder.add(processed_data)
+                        del processed_data
+                    added_partitions[property_key_name].append(model)
+
+                if property_key_name in output_session and pyramid_builder is not None:
+                    # The pyramid is updated with the new partitions, without
+                    # reading back the partitions added before
+                    for pyramid_name, resampled in pyramid_builder.create().items():
+                        self.save_to_h5(
+                            resampled,
+                            output_file_path,
+                            key=pyramid_name,
+                            output_session=output_session,
+                        )
 
-                    # Calculate any extra properties
-                    if property_key_name in process_sim_model.EXTRA_MARMOT_PROPERTIES:
+                if property_key_name in output_session:
+                    record = manifest.property_record(
+                        row,
+                        [
+                            process_sim_model.input_file_path(model)
+                            for model in added_partitions[property_key_name]
+                            if model in partition_files
+                        ],
+                    )
+                    manifest.update(
+                        property_key_name, manifest.record_digest(record), record
+                    )
+            manifest.save()
 
-                        extra_prop_functions = (
-                            process_sim_model.EXTRA_MARMOT_PROPERTIES[property_key_name]
-                        )
-                        for prop_function_tup in extra_prop_functions:
-                            prop_name, prop_function = prop_function_tup
+    def create_extra_properties(
+        self,
+        process_sim_model: Process,
+        property_rows: list,
+        output_file_path: Path,
+        sim_model: str = "PLEXOS",
+        plexos_block: str = "ST",
+    ) -> None:
+        """Creates the extra properties of properties saved in the formatted h5 file.
 
-                            if (
-                                prop_name not in h5py.File(output_file_path, "r")
-                                or not formatter_settings["skip_existing_properties"]
-                            ):
+        Used by watch_formatter once all partitions have been added. Extra
+        properties which are missing, or whose inputs have changed since they
+        were saved, are created.
 
-                                self.logger.info(f"Processing {prop_name}")
-                                prop = prop_function(
-                                    extraprops_init,
-                                    Processed_Data_Out,
-                                    timescale=row["data_type"],
-                                )
+        Args:
+            process_sim_model (Process): model specific instance of a Process class,
+                e.g ProcessPLEXOS, ProcessReEDS
+            property_rows (list): list of (row, key_path, property_key_name),
+                as returned by get_property_rows.
+            output_file_path (Path): Path to formatted h5 output file.
+            sim_model (str, optional): Name of simulation model.
+                Defaults to 'PLEXOS'.
+            plexos_block (str, optional): PLEXOS results type.
+                Defaults to 'ST'.
+        """
+        extraprops_init = ExtraProperties(
+            process_sim_model, process_sim_model.get_input_files
+        )
+        with open_formatted_session(
+            output_file_path,
+            formatter_settings["storage_backend"],
+            **get_compression(formatter_settings["compression"]),
+        ) as output_session:
+            existing_keys = output_session.keys()
+            manifest = self.create_manifest(output_session, sim_model, plexos_block)
+            saved_properties = [
+                (row, property_key_name)
+                for row, _, property_key_name in property_rows
+                if property_key_name in existing_keys
+            ]
+            expected_digests = manifest.expected_digests(
+                process_sim_model,
+                {
+                    property_key_name: manifest.records[property_key_name]["record"]
+                    for _, property_key_name in saved_properties
+                    if property_key_name in manifest.records
+                },
+            )
+            stale_keys, _ = manifest.stale_keys(expected_digests, existing_keys)
+            existing_keys = [key for key in existing_keys if key not in stale_keys]
+            scheduler = PropertyScheduler(
+                process_sim_model, extraprops_init, saved_properties, existing_keys
+            )
+            with FormattedH5Writer(
+                partial(self.save_to_h5, output_session=output_session),
+                output_file_path,
+            ) as h5_writer:
+                for _, property_key_name in saved_properties:
+                    Processed_Data_Out = None
+                    if scheduler.needs_data(property_key_name):
+                        Processed_Data_Out = output_session.get(property_key_name)
+                    self.save_extra_properties(
+                        property_key_name, Processed_Data_Out, h5_writer, scheduler
+                    )
+                    del Processed_Data_Out
 
-                                if prop.empty is False:
-                                    self.save_to_h5(
-                                        prop, output_file_path, key=prop_name
-                                    )
-                                else:
-                                    self.logger.warning(f"{prop_name} was not saved")
-                            # Run again to check for properties based of new properties
-                            if prop_name in process_sim_model.EXTRA_MARMOT_PROPERTIES:
-
-                                extra2_prop_functions = (
-                                    process_sim_model.EXTRA_MARMOT_PROPERTIES[prop_name]
-                                )
-                                for prop_function_tup2 in extra2_prop_functions:
-                                    prop_name2, prop_function2 = prop_function_tup2
-
-                                    if (
-                                        prop_name2
-                                        not in h5py.File(output_file_path, "r")
-                                        or not formatter_settings[
-                                            "skip_existing_properties"
-                                        ]
-                                    ):
-
-                                        self.logger.info(f"Processing {prop_name2}")
-                                        prop2 = prop_function2(
-                                            extraprops_init,
-                                            prop,
-                                            timescale=row["data_type"],
-                                        )
-
-                                        if prop2.empty is False:
-                                            self.save_to_h5(
-                                                prop2, output_file_path, key=prop_name2
-                                            )
-                                        else:
-                                            self.logger.warning(
-                                                f"{prop_name2} was not saved"
-                                            )
+            for key in h5_writer.saved_keys:
+                if key in expected_digests:
+                    manifest.update(key, *expected_digests[key])
+            manifest.save()
 
-                else:
-                    continue
 
+def _run_batch_job(
+    Scenario_name: str,
+    format_kwargs: dict,
+    run_kwargs_list: List[dict],
+) -> List[dict]:
+    """Formats a single scenario, used by MarmotBatchFormat worker processes.
+
+    Each job logs to its own log file. Parallel processing within the job is
+    disabled, as the job is already running in a shared worker pool.
+
+    Args:
+        Scenario_name (str): Name of scenario to process.
+        format_kwargs (dict): Keyword arguments passed to MarmotFormat.
+        run_kwargs_list (List[dict]): List of keyword arguments passed to
+            MarmotFormat.run_formatter, each is run in order.
+
+    Returns:
+        List[dict]: Result summary for each run_formatter call.
+    """
+    formatter_settings["partition_workers"] = 1
+    formatter_settings["property_workers"] = 1
+
+    results = []
+    for run_kwargs in run_kwargs_list:
+        block = run_kwargs.get("plexos_block")
+        log_suffix = re.sub(r"\W+", "_", f"{Scenario_name} {block or ''}").strip("_")
+        result = {
+            "Scenario": Scenario_name,
+            "Block": block,
+            "Status": "COMPLETED",
+            "Minutes": None,
+            "Error": "",
+        }
+        start = time.time()
+        try:
+            initiate = MarmotFormat(
+                Scenario_name, log_suffix=log_suffix, **format_kwargs
+            )
+            initiate.run_formatter(**run_kwargs)
+        except (Exception, SystemExit) as e:
+            result["Status"] = "FAILED"
+            result["Error"] = repr(e)
+        result["Minutes"] = round((time.time() - start) / 60, 2)
+        results.append(result)
+    return results
+
+
+class MarmotBatchFormat(SetupLogger):
+    """Format many scenarios at once using a shared pool of worker processes.
+
+    Every scenario and PLEXOS block combination is scheduled as a job on a
+    single process pool, so the time taken to format a set of scenarios is
+    bounded by the number of available cores rather than the number of
+    scenarios. Each job logs to its own log file, named with the scenario
+    and block, and a summary of all jobs is logged once they are complete.
+
+    Blocks which are saved to the same formatted h5 file (append_block_name=False)
+    are run one after the other in the same job, so a formatted h5 file is
+    never written by more than one process.
+    """
+
+    def __init__(
+        self,
+        Scenario_List: List[str],
+        Model_Solutions_folder: Union[str, Path],
+        Properties_File: Union[str, Path, pd.DataFrame],
+        max_workers: int = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            Scenario_List (List[str]): Names of scenarios to process.
+            Model_Solutions_folder (Union[str, Path]): Folder containing model simulation
+                results subfolders and their files.
+            Properties_File (Union[str, Path, pd.DataFrame]): Properties
+                to process, must follow format seen in Marmot directory.
+            max_workers (int, optional): Number of worker processes.
+                Defaults to None, which uses the number of processors on the machine.
+            **kwargs
+                These parameters will be passed to the MarmotFormat class,
+                e.g Marmot_Solutions_folder, Region_Mapping, emit_names.
+        """
+        super().__init__("formatter", log_suffix="batch")
+        self.Scenario_List = Scenario_List
+        self.max_workers = max_workers
+        self.format_kwargs = dict(
+            Model_Solutions_folder=Model_Solutions_folder,
+            Properties_File=Properties_File,
+            **kwargs,
+        )
+
+    def run_formatter(
+        self,
+        sim_model: str = "PLEXOS",
+        plexos_blocks: List[str] = None,
+        append_block_name: bool = False,
+        process_subset_years: list = None,
+    ) -> pd.DataFrame:
+        """Format all scenarios in Scenario_List.
+
+        Args:
+            sim_model (str, optional): Name of simulation model to
+                process data for.
+                Defaults to 'PLEXOS'.
+            plexos_blocks (List[str], optional): PLEXOS results types.
+                Only used for sim_model = PLEXOS.
+                Defaults to None, which processes the ST block.
+            append_block_name (bool, optional): Append block type to
+                scenario name.
+                Defaults to False.
+            process_subset_years (list, optional): If provided only process
+                years specified. (Only used for sim_model = ReEDS)
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: Summary of all jobs.
+        """
+        if plexos_blocks is None:
+            plexos_blocks = ["ST"]
+        if sim_model == "PLEXOS":
+            run_kwargs_list = [
+                dict(plexos_block=block, append_block_name=append_block_name)
+                for block in plexos_blocks
+            ]
+        else:
+            run_kwargs_list = [
+                dict(sim_model=sim_model, process_subset_years=process_subset_years)
+            ]
+
+        jobs = []
+        for Scenario_name in self.Scenario_List:
+            if append_block_name:
+                # Each block is saved to its own file, so can be run separately
+                jobs.extend(
+                    [(Scenario_name, [run_kwargs]) for run_kwargs in run_kwargs_list]
+                )
             else:
-                self.logger.info(f"{key_path} already exists in output .h5 file.")
-                self.logger.info("PROPERTY ALREADY PROCESSED\n")
-                continue
+                jobs.append((Scenario_name, run_kwargs_list))
 
-        end = time.time()
-        elapsed = end - start
-        self.logger.info("Main loop took %s minutes", round(elapsed / 60, 2))
-        self.logger.info(f"Formatting COMPLETED for {scen_name}")
+        self.logger.info(
+            f"#### Batch formatting {len(self.Scenario_List)} scenarios, "
+            f"{len(jobs)} jobs ####"
+        )
+        start = time.time()
+        results = []
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor:
+            future_jobs = {
+                executor.submit(
+                    _run_batch_job, Scenario_name, self.format_kwargs, job_kwargs
+                ): Scenario_name
+                for Scenario_name, job_kwargs in jobs
+            }
+            for future in concurrent.futures.as_completed(future_jobs):
+                Scenario_name = future_jobs[future]
+                try:
+                    job_results = future.result()
+                except Exception as e:
+                    job_results = [
+                        {
+                            "Scenario": Scenario_name,
+                            "Block": None,
+                            "Status": "FAILED",
+                            "Minutes": None,
+                            "Error": repr(e),
+                        }
+                    ]
+                for result in job_results:
+                    self.logger.info(
+                        f"{result['Scenario']} {result['Block'] or ''} "
+                        f"{result['Status']}"
+                    )
+                results.extend(job_results)
+
+        summary = pd.DataFrame(
+            results, columns=["Scenario", "Block", "Status", "Minutes", "Error"]
+        ).sort_values(["Scenario", "Block"], na_position="first")
+        elapsed = time.time() - start
+        self.logger.info(
+            f"Batch formatting took {round(elapsed / 60, 2)} minutes, "
+            f"{(summary['Status'] == 'COMPLETED').sum()} of {len(summary)} "
+            f"jobs completed\n{summary.to_string(index=False)}"
+        )
+        if (summary["Status"] == "FAILED").any():
+            self.logger.warning(
+                "Some jobs failed, see the job log files for details: "
+                f"{list(summary.loc[summary['Status'] == 'FAILED', 'Scenario'])}"
+            )
+        return summary
 
 
 def main():
@@ -561,6 +1664,26 @@ def main():
     # Loop through scenarios in list
     # ===================================================================================
 
+    batch_workers = formatter_settings["batch_workers"]
+    if batch_workers > 1 and len(Scenario_List) > 1:
+        batch_format = MarmotBatchFormat(
+            Scenario_List,
+            Model_Solutions_folder,
+            Properties_File,
+            max_workers=batch_workers,
+            Marmot_Solutions_folder=Marmot_Solutions_folder,
+            mapping_folder=Mapping_folder,
+            Region_Mapping=Region_Mapping,
+            emit_names=emit_names,
+        )
+        batch_format.run_formatter(
+            sim_model=simulation_model,
+            plexos_blocks=plexos_data_blocks,
+            append_block_name=formatter_settings["append_plexos_block_name"],
+            process_subset_years=process_subset_years,
+        )
+        return
+
     for Scenario_name in Scenario_List:
 
         initiate = MarmotFormat(
@@ -8,22 +8,24 @@ Database can be either a h5plexos file or a formatted Marmot hdf5 file.
 
 import sys
 import h5py
+import threading
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from collections import OrderedDict
+from typing import Tuple
 import logging
 
 logger = logging.getLogger("formatter." + __name__)
 
 class MetaData:
     """Handle the retrieval of metadata from the formatted or original solution h5 files.
-    """
 
-    filename: str = None
-    """The name of the h5 file to retrieve data from."""
-    h5_filepath: Path = None
-    """The path to the h5 file"""
-    h5_data: h5py.File = None
-    """h5 file loaded in memory."""
+    Metadata tables are read once per file and partition, decoded and held in
+    an instance level least recently used cache. The cache is protected by a
+    lock, so a MetaData instance can be shared between threads and used with
+    many files at once.
+    """
 
     def __init__(
         self,
@@ -31,6 +33,7 @@ class MetaData:
         read_from_formatted_h5: bool = True,
         Region_Mapping: pd.DataFrame = pd.DataFrame(),
         partition_number: int = 0,
+        cache_size: int = 1024,
     ):
         """
         Args:
@@ -42,45 +45,62 @@ class MetaData:
                 Defaults to pd.DataFrame().
             partition_number (int, optional): Which temporal partition of h5 data to retrieve
                 metadata from in the formatted h5 file. Defaults to 0.
+            cache_size (int, optional): Max number of metadata tables held in the cache.
+                Defaults to 1024.
         """
         self.HDF5_folder_in = HDF5_folder_in
         self.Region_Mapping = Region_Mapping
         self.read_from_formatted_h5 = read_from_formatted_h5
         self.partition_number = partition_number
-        self.start_index = None
-
-    @classmethod
-    def _check_if_existing_filename(cls, filename: str) -> bool:
-        """Check if the passed filename is the same or different from previous calls.
-
-        If file is different replaces the filename with new value
-        and closes old file
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        # Location of each file's metadata, {filename: (h5_filepath, start_index)}
+        self._file_locations: dict = {}
+        # Decoded metadata tables, {(h5_filepath, start_index, table): df}
+        self._table_cache: OrderedDict = OrderedDict()
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled, worker processes start with an empty cache
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_table_cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def close_h5(self) -> None:
+        """Clears all cached metadata."""
+        with self._lock:
+            self._file_locations.clear()
+            self._table_cache.clear()
+
+    def _get_file_location(self, filename: str) -> Tuple[Path, str]:
+        """Gets the path to the h5 file and the location of its metadata.
 
         Args:
-            filename (str): The name of the h5 file to retreive data from.
+            filename (str): The name of the h5 file to retreive
+                data from.
 
         Returns:
-            bool: False if new file, True if existing
+            Tuple[Path, str]: h5_filepath and start_index of metadata,
+            (None, None) if the formatted h5 file could not be found.
         """
-        if cls.filename != filename:
-            cls.filename = filename
-            cls.close_h5()
-            return False
-        elif cls.filename == filename:
-            return True
+        with self._lock:
+            if filename not in self._file_locations:
+                self._file_locations[filename] = self._read_data(filename)
+            return self._file_locations[filename]
 
-    @classmethod
-    def close_h5(cls) -> None:
-        """Closes h5 file open in memory."""
-        if cls.h5_data:
-            cls.h5_data.close()
-
-    def _read_data(self, filename: str) -> None:
-        """Reads h5 file into memory.
+    def _read_data(self, filename: str) -> Tuple[Path, str]:
+        """Finds the location of the metadata in a h5 file.
 
         Args:
             filename (str): The name of the h5 file to retreive
                 data from.
+
+        Returns:
+            Tuple[Path, str]: h5_filepath and start_index of metadata.
         """
         logger.debug(f"Reading New h5 file: {filename}")
         processed_file_format = "{}_formatted.h5"
@@ -89,10 +109,9 @@ class MetaData:
             if self.read_from_formatted_h5:
 
                 filename = processed_file_format.format(filename)
-                self.h5_filepath = self.HDF5_folder_in.joinpath(filename)
-                with h5py.File(self.HDF5_folder_in.joinpath(filename), "r") as f:
-                    self.h5_data = f
-                    partitions = [key for key in self.h5_data["metadata"].keys()]
+                h5_filepath = self.HDF5_folder_in.joinpath(filename)
+                with h5py.File(h5_filepath, "r") as f:
+                    partitions = [key for key in f["metadata"].keys()]
                 if self.partition_number > len(partitions):
                     logger.warning(
                         "\nYou have chosen to use metadata partition_number "
@@ -102,12 +121,13 @@ class MetaData:
                     )
                     self.partition_number = 0
 
-                self.start_index = f"metadata/{partitions[self.partition_number]}/"
+                start_index = f"metadata/{partitions[self.partition_number]}/"
             else:
-                self.h5_filepath = self.HDF5_folder_in.joinpath(filename)
-                with h5py.File(self.HDF5_folder_in.joinpath(filename), "r") as f:
-                    self.h5_data = f
-                self.start_index = "metadata/"
+                h5_filepath = self.HDF5_folder_in.joinpath(filename)
+                with h5py.File(h5_filepath, "r"):
+                    pass
+                start_index = "metadata/"
+            return h5_filepath, start_index
 
         except OSError:
             if self.read_from_formatted_h5:
@@ -115,7 +135,7 @@ class MetaData:
                     "Unable to find processed HDF5 file to retrieve metadata.\n"
                     "Check scenario name."
                 )
-                return
+                return None, None
             else:
                 logger.info(
                     "\nIn order to initialize your database's metadata, "
@@ -129,6 +149,80 @@ class MetaData:
                 )
                 sys.exit()
 
+    def _read_table(self, filename: str, table: str) -> pd.DataFrame:
+        """Reads a metadata table, e.g objects/generators, from the cache or h5 file.
+
+        Byte string columns are decoded to str before the table is cached.
+
+        Args:
+            filename (str): The name of the h5 file to retreive data from.
+                If retreiving from fromatted h5 file, just pass scenario name.
+            table (str): Name of metadata table, e.g objects/generators
+
+        Raises:
+            KeyError: If the table does not exist in the h5 file.
+
+        Returns:
+            pd.DataFrame: Copy of the decoded table.
+        """
+        with self._lock:
+            h5_filepath, start_index = self._get_file_location(filename)
+            cache_key = (h5_filepath, start_index, table)
+            if cache_key in self._table_cache:
+                self._table_cache.move_to_end(cache_key)
+                df = self._table_cache[cache_key]
+            else:
+                df = None
+                if h5_filepath is not None:
+                    try:
+                        df = pd.read_hdf(h5_filepath, key=f"{start_index}{table}")
+                    except KeyError:
+                        pass
+                if df is not None:
+                    for col in df.columns:
+                        if df[col].dtype.kind == "S":
+                            df[col] = np.char.decode(
+                                df[col].to_numpy(), "utf-8"
+                            ).astype(object)
+                        elif df[col].dtype == object:
+                            values = df[col].to_numpy()
+                            # Columns can mix str and bytes, every cell is checked
+                            is_bytes = np.fromiter(
+                                (isinstance(x, bytes) for x in values),
+                                dtype=bool,
+                                count=len(values),
+                            )
+                            if is_bytes.any():
+                                values = values.copy()
+                                values[is_bytes] = np.char.decode(
+                                    values[is_bytes].astype(bytes), "utf-8"
+                                )
+                                df[col] = values
+                # Missing tables are also cached, to avoid searching the file again
+                self._table_cache[cache_key] = df
+                while len(self._table_cache) > self.cache_size:
+                    self._table_cache.popitem(last=False)
+        if df is None:
+            raise KeyError(f"{table} not found in {filename} metadata")
+        return df.copy()
+
+    def objects(self, filename: str, object_class: str) -> pd.DataFrame:
+        """Objects of a class, in the order of the rows of their h5plexos data.
+
+        Args:
+            filename (str): The name of the h5 file to retreive data from.
+                If retreiving from fromatted h5 file, just pass scenario name.
+            object_class (str): Name of the object class in the h5 file,
+                e.g generator or generators.
+        """
+        try:
+            objects = self._read_table(filename, f"objects/{object_class}")
+            objects.reset_index(drop=True, inplace=True)
+        except KeyError:
+            objects = pd.DataFrame()
+
+        return objects
+
     def generator_category(self, filename: str) -> pd.DataFrame:
         """Generator categories mapping.
 
@@ -136,24 +230,14 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
-
         try:
             try:
-                gen_category = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/generator"
-                )
+                gen_category = self._read_table(filename, "objects/generator")
             except KeyError:
-                gen_category = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/generators"
-                )
+                gen_category = self._read_table(filename, "objects/generators")
             gen_category.rename(
                 columns={"name": "gen_name", "category": "tech"}, inplace=True
             )
-            gen_category = gen_category.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
         except KeyError:
             gen_category = pd.DataFrame()
 
@@ -166,26 +250,14 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
-
         try:
             try:
-                region_gen = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/regions_generators",
-                )
+                region_gen = self._read_table(filename, "relations/regions_generators")
             except KeyError:
-                region_gen = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_generators",
-                )
+                region_gen = self._read_table(filename, "relations/region_generators")
             region_gen.rename(
                 columns={"child": "gen_name", "parent": "region"}, inplace=True
             )
-            region_gen = region_gen.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             region_gen.drop_duplicates(
                 subset=["gen_name"], keep="first", inplace=True
             )  # For generators which belong to more than 1 region, drop duplicates.
@@ -221,25 +293,14 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zone_gen = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zones_generators",
-                )
+                zone_gen = self._read_table(filename, "relations/zones_generators")
             except KeyError:
-                zone_gen = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_generators",
-                )
+                zone_gen = self._read_table(filename, "relations/zone_generators")
             zone_gen.rename(
                 columns={"child": "gen_name", "parent": "zone"}, inplace=True
             )
-            zone_gen = zone_gen.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             zone_gen.drop_duplicates(
                 subset=["gen_name"], keep="first", inplace=True
             )  # For generators which belong to more than 1 region, drop duplicates.
@@ -278,57 +339,37 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         head_tail = [0, 0]
         try:
             generator_headstorage = pd.DataFrame()
             generator_tailstorage = pd.DataFrame()
             try:
-                generator_headstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generators_headstorage",
-                )
+                generator_headstorage = self._read_table(filename, "relations/generators_headstorage")
                 head_tail[0] = 1
             except KeyError:
                 pass
             try:
-                generator_headstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generator_headstorage",
-                )
+                generator_headstorage = self._read_table(filename, "relations/generator_headstorage")
                 head_tail[0] = 1
             except KeyError:
                 pass
             try:
-                generator_headstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/exportinggenerators_headstorage",
-                )
+                generator_headstorage = self._read_table(filename, "relations/exportinggenerators_headstorage")
                 head_tail[0] = 1
             except KeyError:
                 pass
             try:
-                generator_tailstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generators_tailstorage",
-                )
+                generator_tailstorage = self._read_table(filename, "relations/generators_tailstorage")
                 head_tail[1] = 1
             except KeyError:
                 pass
             try:
-                generator_tailstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generator_tailstorage",
-                )
+                generator_tailstorage = self._read_table(filename, "relations/generator_tailstorage")
                 head_tail[1] = 1
             except KeyError:
                 pass
             try:
-                generator_tailstorage = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/importinggenerators_tailstorage",
-                )
+                generator_tailstorage = self._read_table(filename, "relations/importinggenerators_tailstorage")
                 head_tail[1] = 1
             except KeyError:
                 pass
@@ -344,9 +385,6 @@ class MetaData:
             gen_storage.rename(
                 columns={"child": "name", "parent": "gen_name"}, inplace=True
             )
-            gen_storage = gen_storage.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
         except:
             gen_storage = pd.DataFrame()
 
@@ -359,23 +397,14 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                node_region = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/relations/nodes_region"
-                )
+                node_region = self._read_table(filename, "relations/nodes_region")
             except KeyError:
-                node_region = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/relations/node_region"
-                )
+                node_region = self._read_table(filename, "relations/node_region")
             node_region.rename(
                 columns={"child": "region", "parent": "node"}, inplace=True
             )
-            node_region = node_region.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             node_region = node_region.sort_values(by=["node"]).set_index("region")
         except:
             node_region = pd.DataFrame()
@@ -389,21 +418,12 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                node_zone = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/relations/nodes_zone"
-                )
+                node_zone = self._read_table(filename, "relations/nodes_zone")
             except KeyError:
-                node_zone = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/relations/node_zone"
-                )
+                node_zone = self._read_table(filename, "relations/node_zone")
             node_zone.rename(columns={"child": "zone", "parent": "node"}, inplace=True)
-            node_zone = node_zone.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             node_zone = node_zone.sort_values(by=["node"]).set_index("zone")
         except:
             node_zone = pd.DataFrame()
@@ -417,25 +437,14 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                generator_node = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generators_nodes",
-                )
+                generator_node = self._read_table(filename, "relations/generators_nodes")
             except KeyError:
-                generator_node = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/generator_nodes",
-                )
+                generator_node = self._read_table(filename, "relations/generator_nodes")
             generator_node.rename(
                 columns={"child": "node", "parent": "gen_name"}, inplace=True
             )
-            generator_node = generator_node.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             # generators_nodes = generators_nodes.sort_values(by=['generator'
         except:
             generator_node = pd.DataFrame()
@@ -449,21 +458,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
-
         try:
             try:
-                regions = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/regions"
-                )
+                regions = self._read_table(filename, "objects/regions")
             except KeyError:
-                regions = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/region"
-                )
-            regions = regions.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                regions = self._read_table(filename, "objects/region")
             regions.rename(columns={"name": "region"}, inplace=True)
             regions.sort_values(["category", "region"], inplace=True)
         except KeyError:
@@ -479,20 +478,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zones = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/zones"
-                )
+                zones = self._read_table(filename, "objects/zones")
             except KeyError:
-                zones = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/zone"
-                )
-            zones = zones.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                zones = self._read_table(filename, "objects/zone")
         except KeyError:
             logger.warning("Zonal data not included in h5plexos results")
             zones = pd.DataFrame()
@@ -506,20 +496,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                lines = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/lines"
-                )
+                lines = self._read_table(filename, "objects/lines")
             except KeyError:
-                lines = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/line"
-                )
-            lines = lines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                lines = self._read_table(filename, "objects/line")
             lines.rename(columns={"name": "line_name"}, inplace=True)
         except KeyError:
             logger.warning("Line data not included in h5plexos results")
@@ -533,15 +514,8 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
-            region_regions = pd.read_hdf(
-                self.h5_filepath, key=f"{self.start_index}/relations/region_regions"
-            )
-            region_regions = region_regions.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+            region_regions = self._read_table(filename, "relations/region_regions")
         except KeyError:
             logger.warning("region_regions data not included in h5plexos results")
 
@@ -554,23 +528,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                region_interregionallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_interregionallines",
-                )
+                region_interregionallines = self._read_table(filename, "relations/region_interregionallines")
             except KeyError:
-                region_interregionallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_interregionalline",
-                )
-
-            region_interregionallines = region_interregionallines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                region_interregionallines = self._read_table(filename, "relations/region_interregionalline")
             region_interregionallines.rename(
                 columns={"parent": "region", "child": "line_name"}, inplace=True
             )
@@ -597,36 +559,19 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                region_intraregionallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_intraregionallines",
-                )
+                region_intraregionallines = self._read_table(filename, "relations/region_intraregionallines")
             except KeyError:
                 try:
-                    region_intraregionallines = pd.read_hdf(
-                        self.h5_filepath,
-                        key=f"{self.start_index}/relations/region_intraregionalline",
-                    )
+                    region_intraregionallines = self._read_table(filename, "relations/region_intraregionalline")
                 except KeyError:
                     region_intraregionallines = pd.concat(
                         [
-                            pd.read_hdf(
-                                self.h5_filepath,
-                                key=f"{self.start_index}/relations/region_importinglines",
-                            ),
-                            pd.read_hdf(
-                                self.h5_filepath,
-                                key=f"{self.start_index}/relations/region_exportinglines",
-                            ),
+                            self._read_table(filename, "relations/region_importinglines"),
+                            self._read_table(filename, "relations/region_exportinglines"),
                         ]
                     ).drop_duplicates()
-            region_intraregionallines = region_intraregionallines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
             region_intraregionallines.rename(
                 columns={"parent": "region", "child": "line_name"}, inplace=True
             )
@@ -653,22 +598,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                region_exportinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_exportinglines",
-                )
+                region_exportinglines = self._read_table(filename, "relations/region_exportinglines")
             except KeyError:
-                region_exportinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_exportingline",
-                )
-            region_exportinglines = region_exportinglines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                region_exportinglines = self._read_table(filename, "relations/region_exportingline")
             region_exportinglines = region_exportinglines.rename(
                 columns={"parent": "region", "child": "line_name"}
             )
@@ -691,22 +625,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                region_importinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_importinglines",
-                )
+                region_importinglines = self._read_table(filename, "relations/region_importinglines")
             except KeyError:
-                region_importinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/region_importingline",
-                )
-            region_importinglines = region_importinglines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                region_importinglines = self._read_table(filename, "relations/region_importingline")
             region_importinglines = region_importinglines.rename(
                 columns={"parent": "region", "child": "line_name"}
             )
@@ -729,23 +652,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zone_interzonallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_interzonallines",
-                )
+                zone_interzonallines = self._read_table(filename, "relations/zone_interzonallines")
             except KeyError:
-                zone_interzonallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_interzonalline",
-                )
-
-            zone_interzonallines = zone_interzonallines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                zone_interzonallines = self._read_table(filename, "relations/zone_interzonalline")
             zone_interzonallines.rename(
                 columns={"parent": "region", "child": "line_name"}, inplace=True
             )
@@ -762,22 +673,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zone_intrazonallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_intrazonallines",
-                )
+                zone_intrazonallines = self._read_table(filename, "relations/zone_intrazonallines")
             except KeyError:
-                zone_intrazonallines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_intrazonalline",
-                )
-            zone_intrazonallines = zone_intrazonallines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                zone_intrazonallines = self._read_table(filename, "relations/zone_intrazonalline")
             zone_intrazonallines.rename(
                 columns={"parent": "region", "child": "line_name"}, inplace=True
             )
@@ -796,22 +696,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zone_exportinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_exportinglines",
-                )
+                zone_exportinglines = self._read_table(filename, "relations/zone_exportinglines")
             except KeyError:
-                zone_exportinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_exportingline",
-                )
-            zone_exportinglines = zone_exportinglines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                zone_exportinglines = self._read_table(filename, "relations/zone_exportingline")
             zone_exportinglines = zone_exportinglines.rename(
                 columns={"parent": "region", "child": "line_name"}
             )
@@ -828,22 +717,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                zone_importinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_importinglines",
-                )
+                zone_importinglines = self._read_table(filename, "relations/zone_importinglines")
             except KeyError:
-                zone_importinglines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/zone_importingline",
-                )
-            zone_importinglines = zone_importinglines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                zone_importinglines = self._read_table(filename, "relations/zone_importingline")
             zone_importinglines = zone_importinglines.rename(
                 columns={"parent": "region", "child": "line_name"}
             )
@@ -860,22 +738,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                interface_lines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/interface_lines",
-                )
+                interface_lines = self._read_table(filename, "relations/interface_lines")
             except KeyError:
-                interface_lines = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/interfaces_lines",
-                )
-            interface_lines = interface_lines.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                interface_lines = self._read_table(filename, "relations/interfaces_lines")
             interface_lines = interface_lines.rename(
                 columns={"parent": "interface", "child": "line"}
             )
@@ -916,20 +783,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                reserves = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/reserves"
-                )
+                reserves = self._read_table(filename, "objects/reserves")
             except KeyError:
-                reserves = pd.read_hdf(
-                    self.h5_filepath, key=f"{self.start_index}/objects/reserve"
-                )
-            reserves = reserves.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                reserves = self._read_table(filename, "objects/reserve")
         except KeyError:
             logger.warning("Reserves data not included in h5plexos results")
 
@@ -942,22 +800,11 @@ class MetaData:
             filename (str): The name of the h5 file to retreive data from.
                 If retreiving from fromatted h5 file, just pass scenario name.
         """
-        if not self._check_if_existing_filename(filename):
-            self._read_data(filename)
         try:
             try:
-                reserves_generators = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/reserves_generators",
-                )
+                reserves_generators = self._read_table(filename, "relations/reserves_generators")
             except KeyError:
-                reserves_generators = pd.read_hdf(
-                    self.h5_filepath,
-                    key=f"{self.start_index}/relations/reserve_generators",
-                )
-            reserves_generators = reserves_generators.applymap(
-                lambda x: x.decode("utf-8") if isinstance(x, bytes) else x
-            )
+                reserves_generators = self._read_table(filename, "relations/reserve_generators")
             reserves_generators = reserves_generators.rename(
                 columns={"child": "gen_name"}
             )
@@ -250,9 +250,11 @@ class CapacityFactor(MPlotDataHelper):
         # List of properties needed by the plot, properties are a set of tuples and 
         # contain 3 parts: required True/False, property name and scenarios required, 
         # scenarios must be a list.
+        # by_tech is True as only the timestamp, tech and AGG_BY levels are used,
+        # so spatial rollups are read if they exist.
         properties = [
-            (True, "generator_Generation", self.Scenarios),
-            (True, "generator_Installed_Capacity", self.Scenarios),
+            (True, "generator_Generation", self.Scenarios, True),
+            (True, "generator_Installed_Capacity", self.Scenarios, True),
         ]
 
         # Runs get_formatted_data within MPlotDataHelper to populate MPlotDataHelper 
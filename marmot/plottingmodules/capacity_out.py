@@ -15,6 +15,7 @@ import matplotlib.dates as mdates
 
 import marmot.utils.mconfig as mconfig
 
+from marmot.formatters.formatstorage import read_formatted_property
 from marmot.plottingmodules.plotutils.plot_library import PlotLibrary
 from marmot.plottingmodules.plotutils.plot_data_helper import MPlotDataHelper
 from marmot.plottingmodules.plotutils.plot_exceptions import (
@@ -267,7 +268,7 @@ class CapacityOut(MPlotDataHelper):
                 overall_avg = sum_ts.mean()
 
                 # Subset to match dispatch time horizon.
-                Gen = pd.read_hdf(
+                Gen = read_formatted_property(
                     os.path.join(
                         self.Marmot_Solutions_folder,
                         scenario,
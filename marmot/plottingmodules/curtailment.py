@@ -549,9 +549,20 @@ class Curtailment(MPlotDataHelper):
         # List of properties needed by the plot, properties are a set of tuples and 
         # contain 3 parts: required True/False, property name and scenarios required, 
         # scenarios must be a list.
+        # by_tech is True as only the timestamp, tech and AGG_BY levels are used,
+        # so spatial rollups are read if they exist.
+        # Only annual sums are used unless a date range is selected, so the
+        # annual temporal pyramid is read if it exists.
+        resolution = "annual" if pd.isna(start_date_range) else None
         properties = [
-            (True, f"generator_{self.curtailment_prop}", self.Scenarios),
-            (False, "generator_Available_Capacity", self.Scenarios),
+            (
+                True,
+                f"generator_{self.curtailment_prop}",
+                self.Scenarios,
+                True,
+                resolution,
+            ),
+            (False, "generator_Available_Capacity", self.Scenarios, True, resolution),
         ]
 
         # Runs get_formatted_data within MPlotDataHelper to populate MPlotDataHelper dictionary
@@ -309,12 +309,15 @@ class GenerationStack(MPlotDataHelper):
         # List of properties needed by the plot, properties are a set of tuples and 
         # contain 3 parts: required True/False, property name and scenarios required, 
         # scenarios must be a list.
+        # by_tech is True as only the timestamp, tech and AGG_BY levels are used,
+        # so spatial rollups are read if they exist.
         properties = [
-            (True, f"generator_Generation{data_resolution}", self.Scenarios),
+            (True, f"generator_Generation{data_resolution}", self.Scenarios, True),
             (
                 False,
                 f"generator_{self.curtailment_prop}{data_resolution}",
                 self.Scenarios,
+                True,
             ),
             (False, f"{agg}_Load{data_resolution}", self.Scenarios),
             (False, f"{agg}_Demand{data_resolution}", self.Scenarios),
@@ -13,11 +13,18 @@ import numpy as np
 import functools
 import concurrent.futures
 from pathlib import Path
-from typing import Tuple, Union, List
+from typing import Dict, Tuple, Union, List
 import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 
 import marmot.utils.mconfig as mconfig
+from marmot.formatters.formatstorage import (
+    read_formatted_property,
+    read_formatted_wide,
+)
+from marmot.formatters.formatpyramid import pyramid_key
+from marmot.formatters.formatrollup import rollup_key
+from marmot.formatters.formatwide import WideProperty
 
 logger = logging.getLogger("plotter." + __name__)
 
@@ -179,12 +186,26 @@ class MPlotDataHelper(dict):
         self.custom_xticklabels = custom_xticklabels
         self.Region_Mapping = Region_Mapping
         self.TECH_SUBSET = TECH_SUBSET
+        self.loaded_keys: Dict[str, Dict[str, str]] = {}
+        """Formatted key read for each scenario of each property"""
 
     def get_formatted_data(self, properties: List[tuple]) -> list:
         """Get data from formatted h5 file.
 
         Adds data to dictionary with scenario name as key
 
+        A property tuple can include a fourth value, by_tech. If True the plot
+        only uses the timestamp, tech and AGG_BY levels of the property, so the
+        spatial rollup for AGG_BY is read instead of the full property when
+        it exists, e.g generator_Generation@zone_tech.
+
+        A property tuple can include a fifth value, resolution, e.g 'monthly'.
+        If set the plot only uses sums or means of the property at this
+        resolution, so the temporal pyramid is read instead of the interval
+        data when it exists, e.g generator_Generation@monthly. If the pyramid
+        does not exist for every property of a scenario, all properties of the
+        scenario are read at full resolution, so they can be compared.
+
         Args:
             properties (List[tuple]): list of tuples containing required
                 plexos property information
@@ -195,25 +216,33 @@ class MPlotDataHelper(dict):
         check_input_data = []
 
         for prop in properties:
-            required, plx_prop_name, scenario_list = prop
+            required, plx_prop_name, scenario_list = prop[:3]
+            by_tech = len(prop) > 3 and prop[3]
+            resolution = prop[4] if len(prop) > 4 else None
             if f"{plx_prop_name}" not in self:
                 self[f"{plx_prop_name}"] = {}
+            loaded_keys = self.loaded_keys.setdefault(plx_prop_name, {})
+            keys = self.formatted_keys(plx_prop_name, by_tech, resolution)
 
-            # Create new set of scenarios that are not yet in dictionary
-            scen_list = set(scenario_list) - set(self[f"{plx_prop_name}"].keys())
+            # Create new set of scenarios that are not yet in dictionary,
+            # or were read from a rollup or resolution this plot cannot use
+            scen_list = {
+                scenario
+                for scenario in scenario_list
+                if loaded_keys.get(scenario) not in keys
+            }
 
             # If set is not empty add data to dict
             if scen_list:
                 # Read data in with multi threading
-                executor_func_setup = functools.partial(
-                    self.read_processed_h5file, plx_prop_name
-                )
+                executor_func_setup = functools.partial(self.read_processed_keys, keys)
                 with concurrent.futures.ThreadPoolExecutor(
                     max_workers=mconfig.parser("multithreading_workers")
                 ) as executor:
                     data_files = executor.map(executor_func_setup, scen_list)
                 # Save data to dict
-                for scenario, df in zip(scen_list, data_files):
+                for scenario, (df, key) in zip(scen_list, data_files):
+                    loaded_keys[scenario] = key
                     self[f"{plx_prop_name}"][scenario] = df
 
             # If any of the dataframes are empty for given property log warning
@@ -223,11 +252,68 @@ class MPlotDataHelper(dict):
                 )
                 if required == True:
                     check_input_data.append(1)
+
+        # Scenarios with a property which has no pyramid at the requested
+        # resolution are read again at full resolution for every property
+        mixed_scenarios = set()
+        for prop in properties:
+            if len(prop) > 4 and prop[4]:
+                mixed_scenarios |= {
+                    scenario
+                    for scenario in prop[2]
+                    if not self[prop[1]][scenario].empty
+                    and not self.loaded_keys[prop[1]][scenario].endswith(
+                        pyramid_key("", prop[4])
+                    )
+                }
+        if mixed_scenarios:
+            check_input_data = self.get_formatted_data(
+                [
+                    (
+                        prop[0],
+                        prop[1],
+                        [
+                            scenario
+                            for scenario in prop[2]
+                            if scenario in mixed_scenarios
+                        ],
+                        *prop[3:4],
+                    )
+                    for prop in properties
+                ]
+            )
         return check_input_data
 
+    def formatted_keys(
+        self, plx_prop_name: str, by_tech: bool = False, resolution: str = None
+    ) -> List[str]:
+        """Gets the formatted keys a property can be read from, in order of
+        preference.
+
+        Args:
+            plx_prop_name (str): Name of property, e.g generator_Generation
+            by_tech (bool, optional): Spatial rollups for AGG_BY can be read.
+                Defaults to False.
+            resolution (str, optional): Temporal pyramid resolution which
+                can be read, e.g monthly.
+                Defaults to None.
+
+        Returns:
+            List[str]: keys, the last key is always the full property.
+        """
+        keys = [plx_prop_name]
+        if by_tech:
+            keys.insert(0, rollup_key(plx_prop_name, self.AGG_BY))
+        if resolution:
+            keys = [pyramid_key(key, resolution) for key in keys] + keys
+        return keys
+
     def read_processed_h5file(self, plx_prop_name: str, scenario: str) -> pd.DataFrame:
         """Reads Data from processed h5file.
 
+        Properties saved with the parquet storage backend are read from the
+        Parquet dataset of the processed h5file.
+
         Args:
             plx_prop_name (str): Name of property, e.g generator_Generation
             scenario (str): Name of scenario.
@@ -236,13 +322,59 @@ class MPlotDataHelper(dict):
             pd.DataFrame: Requested dataframe.
         """
         try:
-            with pd.HDFStore(
-                self.processed_hdf5_folder.joinpath(f"{scenario}_formatted.h5"), "r"
-            ) as file:
-                return file[plx_prop_name]
+            return read_formatted_property(
+                self.processed_hdf5_folder.joinpath(f"{scenario}_formatted.h5"),
+                plx_prop_name,
+            )
         except KeyError:
             return pd.DataFrame()
 
+    def read_processed_keys(
+        self, keys: List[str], scenario: str
+    ) -> Tuple[pd.DataFrame, str]:
+        """Reads the first of a list of keys which exists in processed h5file.
+
+        Spatial rollups and the temporal pyramid are saved by the formatter
+        when the spatial_rollups and temporal_pyramid settings are enabled.
+
+        Args:
+            keys (List[str]): keys to read in order of preference,
+                as returned by formatted_keys.
+            scenario (str): Name of scenario.
+
+        Returns:
+            Tuple[pd.DataFrame, str]: Requested dataframe, and the key it
+            was read from.
+        """
+        for key in keys:
+            df = self.read_processed_h5file(key, scenario)
+            if not df.empty:
+                return df, key
+        return df, key
+
+    def read_processed_wide(self, plx_prop_name: str, scenario: str) -> WideProperty:
+        """Reads a property from processed h5file as a timestamps x objects matrix.
+
+        Properties saved with the wide_layout formatter setting are read without
+        rebuilding the long dataframe. Use WideProperty.to_frame to get the matrix
+        as a dataframe with the object attributes as columns.
+
+        Args:
+            plx_prop_name (str): Name of property, e.g generator_Generation
+            scenario (str): Name of scenario.
+
+        Returns:
+            WideProperty: Requested property, None if it does not exist or
+            has no fixed frequency timestamp.
+        """
+        try:
+            return read_formatted_wide(
+                self.processed_hdf5_folder.joinpath(f"{scenario}_formatted.h5"),
+                plx_prop_name,
+            )
+        except KeyError:
+            return None
+
     def rename_gen_techs(self, df: pd.DataFrame) -> pd.DataFrame:
         """Renames generator technologies based on the gen_names.csv file.
 
@@ -730,6 +862,9 @@ class MPlotDataHelper(dict):
             int: Number of intervals per 60 minutes.
         """
         timestamps = df.index.get_level_values("timestamp").unique()
+        # Single timestamps, e.g annual sums, are not sub-hourly
+        if len(timestamps) < 2:
+            return 1
         time_delta = timestamps[1] - timestamps[0]
         # Finds intervals in 60 minute period
         intervals_per_hour = 60 / (time_delta / np.timedelta64(1, "m"))
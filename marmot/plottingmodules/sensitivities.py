@@ -11,6 +11,7 @@ import matplotlib.pyplot as plt
 
 import marmot.utils.mconfig as mconfig
 
+from marmot.formatters.formatstorage import read_formatted_property
 from marmot.plottingmodules.plotutils.plot_data_helper import MPlotDataHelper
 from marmot.plottingmodules.plotutils.plot_exceptions import (
     MissingInputData,
@@ -174,7 +175,7 @@ class Sensitivities(MPlotDataHelper):
         )
 
         # Add net interchange difference to icing plot.
-        bc_int = pd.read_hdf(
+        bc_int = read_formatted_property(
             self.processed_hdf5_folder.joinpath(
                 self.Scenario_Diff[0] + "_formatted.h5"
             ),
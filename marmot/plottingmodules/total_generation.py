@@ -86,12 +86,23 @@ class TotalGeneration(MPlotDataHelper):
         # List of properties needed by the plot, properties are a set of tuples and 
         # contain 3 parts: required True/False, property name and scenarios required, 
         # scenarios must be a list.
+        # by_tech is True as only the timestamp, tech and AGG_BY levels are used,
+        # so spatial rollups are read if they exist.
+        # Only annual sums are used unless a date range is selected, so the
+        # annual temporal pyramid is read if it exists.
+        resolution = "annual" if pd.isna(start_date_range) else None
         properties = [
-            (True, "generator_Generation", self.Scenarios),
-            (False, f"generator_{self.curtailment_prop}", self.Scenarios),
-            (False, f"{agg}_Load", self.Scenarios),
-            (False, f"{agg}_Demand", self.Scenarios),
-            (False, f"{agg}_Unserved_Energy", self.Scenarios),
+            (True, "generator_Generation", self.Scenarios, True, resolution),
+            (
+                False,
+                f"generator_{self.curtailment_prop}",
+                self.Scenarios,
+                True,
+                resolution,
+            ),
+            (False, f"{agg}_Load", self.Scenarios, False, resolution),
+            (False, f"{agg}_Demand", self.Scenarios, False, resolution),
+            (False, f"{agg}_Unserved_Energy", self.Scenarios, False, resolution),
         ]
 
         # Runs get_formatted_data within MPlotDataHelper to populate MPlotDataHelper dictionary
@@ -618,11 +629,22 @@ class TotalGeneration(MPlotDataHelper):
         # List of properties needed by the plot, properties are a set of tuples and 
         # contain 3 parts: required True/False, property name and scenarios required, 
         # scenarios must be a list.
+        # by_tech is True as only the timestamp, tech and AGG_BY levels are used,
+        # so spatial rollups are read if they exist.
+        # Only monthly sums are used unless a date range is selected, so the
+        # monthly temporal pyramid is read if it exists.
+        resolution = "monthly" if pd.isna(start_date_range) else None
         properties = [
-            (True, "generator_Generation", self.Scenarios),
-            (False, f"generator_{self.curtailment_prop}", self.Scenarios),
-            (False, f"{agg}_Load", self.Scenarios),
-            (False, f"{agg}_Demand", self.Scenarios),
+            (True, "generator_Generation", self.Scenarios, True, resolution),
+            (
+                False,
+                f"generator_{self.curtailment_prop}",
+                self.Scenarios,
+                True,
+                resolution,
+            ),
+            (False, f"{agg}_Load", self.Scenarios, False, resolution),
+            (False, f"{agg}_Demand", self.Scenarios, False, resolution),
         ]
 
         # Runs get_formatted_data within MPlotDataHelper to populate MPlotDataHelper dictionary
@@ -116,12 +116,115 @@ def createConfig(configfile_path: Path):
         `append_plexos_block_name` Toggles whether to append PLEXOS block name to formatted 
         results e.g ST, MT, LT, PASA. Defaults to False.
         `exclude_pumping_from_reeds_storage_gen` toggles whether to exclude pumping 
-        (negative gen) from ReEDS storage generation. Defaults to True*
+        (negative gen) from ReEDS storage generation. Defaults to True.
+        `partition_workers` sets the number of worker processes used to process 
+        the temporal partitions of a property in parallel. A value of 1 processes
+        partitions one at a time. Defaults to 1.
+        `property_workers` sets the number of worker processes used to process 
+        several properties at once. Each worker processes all partitions of a 
+        property, processed data is saved by the main process. Takes priority over 
+        partition_workers if greater than 1. Defaults to 1.
+        `batch_workers` sets the number of worker processes used to format several 
+        scenarios at once. Each scenario is logged to its own log file. 
+        Defaults to 1.
+        `stream_partitions` If True, each partition is appended to the formatted h5 
+        file as soon as it is processed (table format), removing any overlap with 
+        the previous partition by timestamp. This limits memory use to a single 
+        partition. Properties which extra properties are created from, e.g 
+        generator_Generation and generator_Available_Capacity for 
+        generator_Curtailment, are still read back whole once saved, so these 
+        still need the full property in memory. Not used when property_workers 
+        is greater than 1. Defaults to False.
+        `validate_partition_duplicates` If True, after removing the overlap between 
+        partitions by timestamp, the full index of each combined property is also 
+        checked for duplicates. Defaults to False.
+        `processed_data_cache_mb` sets the size in MB of the in memory cache of 
+        processed partition data, repeated requests for the same property and 
+        partition are then read from the cache instead of the simulation model 
+        files. A value of 0 disables the cache. Defaults to 0.
+        `processed_data_cache_dir` If set, data evicted from the processed data 
+        cache is saved to this directory instead of being discarded. 
+        Defaults to None.
+        `hash_input_files` If True, the contents of model input files are hashed 
+        and recorded in the manifest of the formatted h5 file. On later runs, 
+        properties are processed again if the contents of their input files have 
+        changed. If False, only the size and modification time of input files are 
+        compared. Hashing reads every input file once per run, which is slow for 
+        large solution files, it is only worth enabling if input files are often 
+        touched or copied without being changed. Defaults to False.
+        `compression` sets the compression of formatted properties. Settings under 
+        `default` apply to all properties, and can be overridden for a property class, 
+        e.g `generator`, or a single property, e.g `generator_Generation`, by adding 
+        an entry with the same settings. `complib` can be any PyTables compression 
+        library, e.g blosc:lz4, blosc:zstd, blosc:zlib, `complevel` is 0-9 and `shuffle` 
+        toggles byte shuffling before compression. Use 
+        bin/run_compression_calibration.py to find the best settings for your 
+        machine. Defaults to blosc:zlib level 9 with shuffle.
+        `storage_backend` sets how formatted properties are saved, `hdf5` saves them 
+        in the formatted h5 file, `parquet` saves them to a Parquet dataset next to 
+        the formatted h5 file, partitioned by year. The parquet backend requires 
+        pyarrow. Metadata is always saved in the formatted h5 file. 
+        Defaults to hdf5.
+        `wide_layout` If True, timeseries properties are saved in the formatted h5 
+        file as a matrix of timestamps x objects, with a table of object 
+        attributes and a fixed frequency time axis, instead of a long table 
+        repeating the object attributes on every row. Properties are read back in 
+        the long layout by the plotter. Values keep the dtype of the property. 
+        Only properties with fixed frequency 
+        timestamps which are not saved one partition at a time are saved in this 
+        layout. Wide properties are saved as groups, so pd.HDFStore.keys() lists 
+        keys such as /generator_Generation/objects and 
+        pd.read_hdf(file, "generator_Generation") fails, read them with 
+        marmot.formatters.formatstorage.read_formatted_property instead. 
+        Not used by the parquet storage_backend. Defaults to False.
+        `spatial_rollups` If True, properties with a tech level are also saved summed 
+        to timestamp and tech for each region, zone and Region_Mapping column, e.g 
+        generator_Generation@zone_tech. Plots which only need data by technology read 
+        these instead of the full generator level property. Properties which do not 
+        add across objects, e.g prices, are not rolled up. Defaults to False.
+        `temporal_pyramid` If True, interval properties are also saved summed (or averaged 
+        for prices and other properties which do not add over time) to hourly, daily, 
+        monthly and annual resolution, e.g generator_Generation@monthly. Plots which 
+        do not need interval data read the coarsest resolution they can use. 
+        Defaults to False.
+        `plexos_direct_read` If True, ST generator, region and node properties are 
+        read from h5plexos files directly with h5py and formatted from the raw value 
+        array, instead of through the h5plexos query methods. Other properties, and 
+        datasets with more than one band, always use the h5plexos query methods. 
+        Defaults to True.
+        `stream_chunk_mb` sets the memory in MB used to format each chunk of a 
+        partition when stream_partitions is True. Properties read directly from 
+        h5plexos files which need more memory than this are read and appended to 
+        the formatted h5 file in slabs of time. If null, a quarter of the available 
+        memory is used. Defaults to None.
+        `max_open_solution_files` sets the maximum number of h5plexos solution files 
+        each process holds open at once. Files are opened when first used, the least 
+        recently used file is closed once the limit is reached. Defaults to 64*
 
         - VoLL: 10000
         - skip_existing_properties: true
         - append_plexos_block_name: false
         - exclude_pumping_from_reeds_storage_gen: true
+        - partition_workers: 1
+        - property_workers: 1
+        - batch_workers: 1
+        - stream_partitions: false
+        - validate_partition_duplicates: false
+        - processed_data_cache_mb: 0
+        - processed_data_cache_dir: null
+        - hash_input_files: false
+        - compression:
+            - default:
+                - complib: blosc:zlib
+                - complevel: 9
+                - shuffle: true
+        - storage_backend: hdf5
+        - wide_layout: false
+        - spatial_rollups: false
+        - temporal_pyramid: false
+        - plexos_direct_read: true
+        - stream_chunk_mb: null
+        - max_open_solution_files: 64
 
         .. versionadded:: 0.10.0
             exclude_pumping_from_reeds_storage_gen setting
@@ -200,6 +303,24 @@ def createConfig(configfile_path: Path):
             skip_existing_properties=True,
             append_plexos_block_name=False,
             exclude_pumping_from_reeds_storage_gen=True,
+            partition_workers=1,
+            property_workers=1,
+            batch_workers=1,
+            stream_partitions=False,
+            validate_partition_duplicates=False,
+            processed_data_cache_mb=0,
+            processed_data_cache_dir=None,
+            hash_input_files=False,
+            compression=dict(
+                default=dict(complib="blosc:zlib", complevel=9, shuffle=True),
+            ),
+            storage_backend="hdf5",
+            wide_layout=False,
+            spatial_rollups=False,
+            temporal_pyramid=False,
+            plexos_direct_read=True,
+            stream_chunk_mb=None,
+            max_open_solution_files=64,
         ),
         multithreading_workers=16,
         figure_file_format="svg",